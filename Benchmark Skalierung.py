@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark für die einzelnen Schritte der Bibliothek ilias_bewertung bei
+wachsender Anzahl teilnehmer, mit synthetischen Daten aus "Erzeuge Testdaten.py".
+
+Gemessen werden getrennt: Einlesen der Ergebnisdatei, Einlesen des
+Fragenpools, Verknüpfen mit dem Pool, Bewertung, Export, IRT-Antwortmatrix und
+IRT-Schätzung. Der Parse-Cache wird dabei nicht benutzt. Die Testdaten werden
+einmal im Verzeichnis --verzeichnis erzeugt und bei weiteren Läufen
+wiederverwendet.
+
+Aufruf z.B.:
+  python "Benchmark Skalierung.py" --teilnehmer 100 1000 10000 --layout ein_blatt pro_teilnehmer --csv benchmark.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+GENERATOR = os.path.join(VERZEICHNIS, "Erzeuge Testdaten.py")
+SCHRITTE = ["Einlesen", "Fragenpool", "Verknüpfen", "Bewertung", "Export", "IRT-Matrix", "IRT-Schätzung"]
+
+
+def lade_modul(name, dateiname):
+    """Lädt ein Skript als Modul, ohne sein Hauptprogramm zu starten."""
+    spec = importlib.util.spec_from_file_location(name, dateiname)
+    modul = importlib.util.module_from_spec(spec)
+    sys.modules[name] = modul
+    spec.loader.exec_module(modul)
+    return modul
+
+
+def testdaten(g, verzeichnis, anz_teilnehmer, layout, anz_fragen, fragen_pro_test, anz_res, seed):
+    """Liefert die Dateinamen von Ergebnisdatei und Fragenpool und erzeugt
+    sie, falls sie noch nicht existieren.
+    """
+    basis = f"{anz_teilnehmer}_{layout}_{anz_fragen}_{fragen_pro_test}_{anz_res}_{seed}"
+    ergebnis_datei = os.path.join(verzeichnis, f"ILIAS_Testergebnisse_{basis}.xlsx")
+    fragen_datei = os.path.join(verzeichnis, f"ILIAS_Fragenpool_{basis}.xlsx")
+    if not (os.path.exists(ergebnis_datei) and os.path.exists(fragen_datei)):
+        print(f"Erzeuge Testdaten für {anz_teilnehmer} teilnehmer ({layout})...")
+        g.erzeuge_testdaten(ergebnis_datei, fragen_datei, anz_teilnehmer, anz_fragen, fragen_pro_test,
+                            anz_res=anz_res, layout=layout, seed=seed)
+    return ergebnis_datei, fragen_datei
+
+
+def miss_schritte(b, ergebnis_datei, fragen_datei, ausgabe_verzeichnis):
+    """Führt alle Schritte einmal aus und liefert die Zeiten in Sekunden."""
+    zeiten = {}
+
+    def stoppe(schritt, funktion, *parameter):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ergebnis = funktion(*parameter)
+        zeiten[schritt] = time.perf_counter() - start
+        return ergebnis
+
+    def bewerte(speicher, fragenpool):
+        b.gleiche_breite_an(speicher, fragenpool)
+        speicher["res_ref"], speicher["pkt"], speicher["folgefehler"] = b.bewerte_gruppen(
+            speicher["var"], speicher["res"], speicher["pool_index"], fragenpool, {})
+        b.waehle_durchlauf(speicher)
+        speicher["noten"] = b.notenberechnung_vektor(speicher["ges_pkt"], b.max_pkt, b.schema_proz, b.schema_note)
+
+    def exportiere(speicher, fragenpool):
+        b.schreibe_export(b.erstelle_export_spalten(speicher, fragenpool),
+                          os.path.join(ausgabe_verzeichnis, "Export.xlsx"))
+
+    def irt_matrix(speicher, fragenpool):
+        matrix = b.erstelle_irt_matrix(speicher, fragenpool)
+        b.schreibe_irt_tabelle(matrix, os.path.join(ausgabe_verzeichnis, "IRT.xlsx"))
+        return matrix
+
+    speicher = stoppe("Einlesen", b.lade_testergebnisse, ergebnis_datei, b.name_marker, b.fragentitel_marker, b.anz_res)
+    fragenpool = stoppe("Fragenpool", b.lade_fragenpool, fragen_datei, True, b.anz_res)
+    stoppe("Verknüpfen", b.verknuepfe_fragenpool, speicher, fragenpool)
+    stoppe("Bewertung", bewerte, speicher, fragenpool)
+    stoppe("Export", exportiere, speicher, fragenpool)
+    matrix = stoppe("IRT-Matrix", irt_matrix, speicher, fragenpool)
+    stoppe("IRT-Schätzung", b.schaetze_irt, matrix, "rasch")
+    return zeiten, len(speicher["teilnehmer"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teilnehmer", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--layout", nargs="+", choices=["ein_blatt", "pro_teilnehmer"], default=["ein_blatt"])
+    parser.add_argument("--fragen", type=int, default=60, help="Anzahl Fragen im Pool")
+    parser.add_argument("--fragen-pro-test", type=int, default=14)
+    parser.add_argument("--ergebnisse", type=int, default=5,
+                        help="maximale Anzahl Ergebnisse pro frage in den Testdaten")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--wiederholungen", type=int, default=1, help="Bestzeit aus so vielen Läufen")
+    parser.add_argument("--verzeichnis", default=os.path.join(tempfile.gettempdir(), "ilias_benchmark"),
+                        help="Verzeichnis für die Testdaten")
+    parser.add_argument("--csv", help="Ergebnisse zusätzlich in diese CSV-Datei schreiben")
+    args = parser.parse_args()
+
+    from ilias_bewertung import bewertung as b
+    g = lade_modul("testdaten", GENERATOR)
+    os.makedirs(args.verzeichnis, exist_ok=True)
+    ergebnisse = []
+    for layout in args.layout:
+        for anz_teilnehmer in args.teilnehmer:
+            ergebnis_datei, fragen_datei = testdaten(g, args.verzeichnis, anz_teilnehmer, layout, args.fragen,
+                                                     args.fragen_pro_test, args.ergebnisse, args.seed)
+            beste = {}
+            for _ in range(args.wiederholungen):
+                with tempfile.TemporaryDirectory() as ausgabe_verzeichnis:
+                    zeiten, anz_versuche = miss_schritte(b, ergebnis_datei, fragen_datei, ausgabe_verzeichnis)
+                for schritt, zeit in zeiten.items():
+                    beste[schritt] = min(beste.get(schritt, float("inf")), zeit)
+            ergebnisse.append({"Layout": layout, "Teilnehmer": anz_teilnehmer, "Versuche": anz_versuche,
+                               **{schritt: round(beste[schritt], 4) for schritt in SCHRITTE},
+                               "Gesamt": round(sum(beste.values()), 4)})
+
+    spalten = ["Layout", "Teilnehmer", "Versuche"] + SCHRITTE + ["Gesamt"]
+    breite = {s: max([len(s)] + [len(str(zeile[s])) for zeile in ergebnisse]) for s in spalten}
+    print("Zeiten in Sekunden")
+    print(" ".join(f"{s:>{breite[s]}}" for s in spalten))
+    for zeile in ergebnisse:
+        print(" ".join(f"{zeile[s]:>{breite[s]}}" for s in spalten))
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as datei:
+            writer = csv.DictWriter(datei, fieldnames=spalten, delimiter=";")
+            writer.writeheader()
+            writer.writerows(ergebnisse)
+        print("Geschrieben:", args.csv)
+
+
+if __name__ == "__main__":
+    main()
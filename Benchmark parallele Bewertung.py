@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark für die parallele Bewertung (anz_prozesse) der Bibliothek
+ilias_bewertung.
+
+Liest eine ILIAS-Ergebnisdatei und einen Fragenpool ein (über den Parse-Cache
+der Bibliothek), vervielfacht die teilnehmer auf Wunsch und misst die
+Zeit für bewerte_versuche() mit 1, 2, 4, ... Prozessen. Zusätzlich wird
+geprüft, ob die Gesamtpunkte aller Läufe mit dem seriellen Lauf übereinstimmen.
+
+Aufruf z.B.:
+  python "Benchmark parallele Bewertung.py" ILIAS_TestergebnisseGE2.xlsx ILIAS_FragenpoolGE2.xlsx --faktor 50 --prozesse 1 2 4 8 16
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import os
+import time
+
+import numpy as np
+
+
+def vervielfache(speicher, faktor):
+    """Hängt die teilnehmer faktor-mal hintereinander, damit auch kleine
+    Exporte eine messbare Laufzeit haben.
+    """
+    if faktor == 1:
+        return speicher
+    anz_teilnehmer = len(speicher["name"])
+    anz_versuche = len(speicher["teilnehmer"])
+    neu = {schluessel: wert * faktor if isinstance(wert, list) else np.concatenate([wert] * faktor)
+           for schluessel, wert in speicher.items()}
+    versatz = np.repeat(np.arange(faktor) * anz_teilnehmer, anz_versuche)
+    neu["teilnehmer"] = neu["teilnehmer"] + versatz.astype(neu["teilnehmer"].dtype)
+    neu["nr"] = np.arange(1, anz_teilnehmer * faktor + 1)
+    return neu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ergebnis_datei", nargs="?", help="ILIAS-Ergebnisdatei (Default wie in der Bibliothek)")
+    parser.add_argument("fragen_datei", nargs="?", help="Fragenpool (Default wie in der Bibliothek)")
+    parser.add_argument("--faktor", type=int, default=1, help="teilnehmer so oft vervielfachen")
+    parser.add_argument("--prozesse", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--wiederholungen", type=int, default=3, help="Bestzeit aus so vielen Läufen")
+    args = parser.parse_args()
+
+    from ilias_bewertung import bewertung as b
+    ergebnis_datei = args.ergebnis_datei or b.ergebnis_datei
+    fragen_datei = args.fragen_datei or b.fragen_datei
+    with contextlib.redirect_stdout(io.StringIO()):
+        speicher = b.lade_mit_cache(b.lade_testergebnisse, ergebnis_datei,
+                                    b.name_marker, b.fragentitel_marker, b.anz_res)
+        fragenpool = b.lade_mit_cache(b.lade_fragenpool, fragen_datei, True, b.anz_res)
+    speicher = vervielfache(speicher, args.faktor)
+    print(f"{len(speicher['name'])} teilnehmer, {len(speicher['teilnehmer'])} Versuche, "
+          f"{os.cpu_count()} Prozessorkerne")
+    print(f"{'Prozesse':>8} {'Zeit [s]':>10} {'Speedup':>8}  Ergebnis")
+
+    referenz = None
+    zeit_seriell = None
+    for anz_prozesse in args.prozesse:
+        beste = float("inf")
+        for _ in range(args.wiederholungen):
+            kopie = copy.deepcopy(speicher)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                b.bewerte_versuche(kopie, fragenpool, anz_prozesse)
+            beste = min(beste, time.perf_counter() - start)
+        if referenz is None:
+            referenz, zeit_seriell = kopie["ges_pkt"], beste
+        gleich = np.array_equal(referenz, kopie["ges_pkt"])
+        print(f"{anz_prozesse:>8} {beste:>10.3f} {zeit_seriell / beste:>8.2f}  "
+              f"{'identisch' if gleich else 'ABWEICHUNG!'}")
+
+
+if __name__ == "__main__":
+    main()
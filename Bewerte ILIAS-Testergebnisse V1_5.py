@@ -19,9 +19,7 @@ nicht unterstützt. Es wird dann nur die erste Antwort ausgewertet.
 
 Wichtige Parameter können (und müssen) als Konstanten diekt am Anfang des Codes 
 festgelegt werden. Dazu gehören:
-  Anzahl Fragen, 
-  Anzahl Variablen pro frage,
-  Anzahl Ergebnisse pro frage (hier fest auf 1, bitte nicht ändern)
+  Anzahl Ergebnisse pro frage
   Max. Punktzahl im Test
   Notenschema
   Filename zum Excel-Export
@@ -121,6 +119,91 @@ Default ist "Testergebnisse.xlsx"
 ##############################################################################
 # HISTORY ####################################################################
 ##############################################################################
+Vers.1.6, in Arbeit:
+  - Formeln aus dem Fragenpool werden nur einmal übersetzt, geprüft und
+    kompiliert und in einem Cache abgelegt (kompiliere_ilias_formel).
+    "ln" wird dabei korrekt zum natürlichen Logarithmus.
+  - Vektorisierte Bewertung: Alle Versuche zur selben frage im Pool werden
+    gemeinsam mit NumPy berechnet und bewertet (bewerte_fragengruppe).
+  - Unteraufgaben werden in der Reihenfolge ihrer $r-Abhängigkeiten in einem
+    Durchlauf berechnet (ordne_unteraufgaben). Fehlerhafte Formeln,
+    fehlende Bezüge und Zirkelbezüge werden einmal pro frage gemeldet.
+  - Index über den Fragenpool (erstelle_fragenpool_index): finde_fragenindex
+    sucht per dict statt linear, doppelte Titel werden gemeldet, optional
+    Suche mit normiertem titel (titel_normiert_suchen, aus per Default);
+    so gefundene Fragen werden gemeldet.
+  - Die Testergebnisse werden in einem Durchlauf mit einem regulären Ausdruck
+    pro zeile eingelesen (parse_ilias_ergebnisse).
+  - Die Ergebnisdatei wird mit openpyxl im read-only-Modus zeilenweise gelesen,
+    auch bei Exporten mit einem Blatt pro Student (lies_ilias_zeilen).
+  - Alle Daten der Versuche liegen spaltenweise in NumPy-Arrays
+    (erstelle_versuchsspeicher), deren Größe sich aus den Daten ergibt.
+    Die Konstanten anz_fragen und anz_var und die init_..-Funktionen entfallen.
+  - Die Export-Tabelle wird in einem Schritt aufgebaut (erstelle_export_spalten)
+    und zeilenweise geschrieben, wahlweise auch als CSV oder Parquet (export_formate).
+  - Die eingelesenen Daten werden in einem Cache abgelegt (lade_mit_cache).
+    Bei unveränderten EXCEL-Dateien entfällt das Einlesen.
+  - Bewertung optional parallel auf mehreren Prozessorkernen (anz_prozesse).
+  - Stapel-Auswertung mehrerer Klausuren über ein Manifest (stapel_manifest),
+    gemeinsam genutzte Fragenpools werden nur einmal eingelesen.
+  - Nachbewertung: Die Bewertung wird mit Fingerabdrücken der Poolzeilen
+    gespeichert (bewertung_datei). Nach einer Korrektur im Fragenpool werden
+    nur die Versuche zu geänderten Fragen neu bewertet (nachbewerten).
+  - noten werden für alle teilnehmer auf einmal mit searchsorted berechnet
+    (notenberechnung_vektor). notenverteilung_varianten liefert die
+    Notenverteilung für viele Varianten des Notenschemas (bestehensgrenzen).
+  - IRT: Die Antwortmatrix wird dünn besetzt aufgebaut (erstelle_irt_matrix)
+    mit festen Codes für richtig (1), falsch (-1) und nicht gestellt (0).
+    Unteraufgaben ohne Formel und die Indexspalte entfallen in irtf_name.
+    Eingebaute Schätzung von Rasch- oder 2PL-Modell (irt_modell, schaetze_irt).
+  - Laufbericht: Zeiten und Zähler pro Schritt (EXCEL lesen, Parsen, Formeln
+    kompilieren, Formelberechnung, Toleranzprüfung, Export, IRT ...) werden
+    am Ende als Tabelle ausgegeben und in laufbericht_datei geschrieben.
+  - Alle Funktionen liegen jetzt in der Bibliothek ilias_bewertung (Verzeichnis
+    neben diesem Skript) und lassen sich aus anderen Programmen importieren.
+    Dieses Skript enthält nur noch die Einstellungen und startet die Auswertung.
+    Kommandozeile: python -m ilias_bewertung --help. pandas wird erst bei
+    Bedarf geladen, "from math import *" entfällt.
+  - "Erzeuge Testdaten.py" schreibt synthetische Ergebnisdateien (beide Layouts)
+    mit passendem Fragenpool, "Benchmark Skalierung.py" misst damit die
+    einzelnen Schritte bei 100, 1.000 und 10.000 Teilnehmern.
+  - Eingaben der Studierenden werden ohne eval gelesen (lies_eingabe):
+    Dezimalkomma, Exponent, Bruch und Einheit sind erlaubt. Unlesbare Eingaben
+    bekommen den Status EINGABE_UNLESBAR (res_status), werden als fehlend
+    bewertet und am Ende der Bewertung gemeldet.
+  - Itemanalyse pro frage im Pool (itemanalyse_datei): Lösungsquote,
+    Trennschärfeindex, punktbiseriale Korrelation mit den Gesamtpunkten,
+    Anteil unbeantwortet, nicht geöffnet und Formelfehler. In der
+    Stapel-Auswertung auch zusammengefasst über alle Klausuren.
+  - Abschreibverdacht (verdacht_datei): Falsche Eingaben, die innerhalb der
+    toleranz zur Musterlösung eines anderen Teilnehmers passen, werden über
+    sortierte Musterlösungen pro frage gesucht (finde_abschreibverdacht) und
+    als Rangliste der Paare ausgegeben.
+  - Folgefehler (folgefehler_bewerten): Unteraufgaben, die Ergebnisse anderer
+    Unteraufgaben verwenden, werden zusätzlich mit den eigenen Eingaben
+    berechnet, vektorisiert über alle Versuche (eval_ilias_folgefehler).
+    Die bessere Bewertung zählt, markiert in versuche["folgefehler"].
+  - Mehrere Testdurchläufe ("Ergebnisse von Testdurchlauf N für ...") werden
+    in einem Durchgang eingelesen und gemeinsam bewertet. Welcher zählt,
+    legt durchlauf_wertung fest (waehle_durchlauf). Export, IRT und
+    Itemanalyse verwenden den gewerteten Durchlauf. Testdaten dazu:
+    "Erzeuge Testdaten.py" --durchlaeufe N.
+  - anz_res muss nicht mehr eingestellt werden (None): Die Anzahl der
+    Unteraufgaben ergibt sich aus den Spalten resN_formula des Fragenpools und
+    den $rN in der Ergebnisdatei, die der Variablen aus den $vN
+    (gleiche_breite_an). Damit läuft jede Klausur ohne Anpassung.
+  - Prüfung des Fragenpools vor der Klausur (pool_pruefen, poolpruefung):
+    Jede Formel wird mit pool_stichproben zufälligen Variablensätzen aus
+    varN_min ... varN_max vektorisiert berechnet (pruefe_fragenpool).
+    Gemeldet werden Syntaxfehler, Division durch Null, Verletzung des
+    Definitionsbereichs (sqrt, ln negativer Zahlen), Überlauf, fehlende
+    Wertebereiche und fehlerhafte $r-Bezüge, als Bericht in poolpruefung_datei.
+    Kommandozeile: python -m ilias_bewertung --pruefe-pool FRAGENPOOL.
+  - Der Fragenpool kann direkt aus dem QTI-Export von ILIAS gelesen werden
+    (fragen_datei mit Endung .zip oder .xml, lade_qti_fragenpool), ohne den
+    Umweg über EXCEL. Die XML-Datei wird mit iterparse frage für frage aus dem
+    Archiv gelesen. "Erzeuge Testdaten.py" schreibt solche Archive bei
+    --fragen-datei ....zip.
 Vers.1.5, 4.9.2020, E. Waffenschmidt:
     - Berücksichtigt ein Notenschema
     - Doku zu Dateiformaten
@@ -160,615 +243,47 @@ Vers.1.1, 2.9.2020, E. Waffenschmidt:
 """
 
 # Konstanten ###############################################################
-anz_fragen = 14  # Anzahl Fragen pro teilnehmer
-anz_var = 15     # Maximale Anzahl von frage-Variablen pro frage
-anz_res = 5      # Maximale Anzahl von frage-Ergebnissen pro frage.
+anz_res = None   # Maximale Anzahl von frage-Ergebnissen pro frage, None = aus Fragenpool und Ergebnisdatei ermitteln
 max_pkt = 58     # Maximale Anzahl von Punkten im Test
 schema_note = ["5,0", "4,0", "3,7", "3,3", "3,0", "2,7", "2,3", "2,0", "1,7", "1,3", "1,0"]
 # Mindestprozentzahl an Punkten für die korrespondierende Note
 schema_proz = [0, 50, 54, 58, 62, 66, 70, 74, 78, 82, 86]
 filename_export = "TestergebnisseGE2.xlsx"
+export_formate = ["xlsx"]  # zusätzlich möglich: "csv", "parquet"
 ergebnis_datei = 'ILIAS_TestergebnisseGE2.xlsx'
-fragen_datei = 'ILIAS_FragenpoolGE2.xlsx'
+fragen_datei = 'ILIAS_FragenpoolGE2.xlsx'  # EXCEL oder der QTI-Export des Pools aus ILIAS (.zip, .xml)
 irtf_name = "irt_frame_ge2.xlsx"
+irt_modell = "rasch"  # IRT-Schätzung: "rasch", "2pl" oder None = nur die Antwortmatrix schreiben
+irt_parameter_datei = "irt_parameter_ge2.xlsx"
+itemanalyse_datei = "Itemanalyse_GE2.xlsx"  # Kennzahlen pro frage, .xlsx oder .csv, None = nicht schreiben
+verdacht_datei = "Abschreibverdacht_GE2.xlsx"  # falsche Eingaben, die zur Musterlösung anderer passen, None = nicht suchen
+laufbericht_datei = "Laufbericht_GE2.json"  # Zeiten und Zähler des Laufs, .json oder .csv, None = nicht schreiben
+cache_verwenden = True   # False: EXCEL-Dateien immer neu einlesen, den Cache nicht benutzen
+cache_leeren = False     # True: Cache vor dem Einlesen löschen
+cache_verzeichnis = ".ilias_cache"
+anz_prozesse = 1  # Anzahl Prozesse für die Bewertung, 1 = seriell, None = alle Prozessorkerne
+bewertung_datei = "BewertungGE2.pickle"  # gespeicherte Bewertung für die Nachbewertung, None = immer komplett neu bewerten
+bestehensgrenzen = []  # z.B. [45, 48, 50]: zusätzlich die Notenverteilung für diese Bestehensgrenzen in % ausgeben
+stapel_manifest = None  # Manifest (JSON) für die Auswertung mehrerer Klausuren in einem Lauf, None = nur die Klausur oben
+durchlauf_wertung = "bester"  # bei mehreren Testdurchläufen zählt der "bester", "letzter" oder "erster"
+folgefehler_bewerten = False  # True: abhängige Unteraufgaben auch mit den eigenen Ergebnissen bewerten, die bessere Bewertung zählt
+pool_pruefen = False  # True: nur den Fragenpool vor der Klausur prüfen (poolpruefung), ohne Ergebnisdatei
+poolpruefung_datei = "Poolpruefung_GE2.xlsx"  # Bericht der Pool-Prüfung, .xlsx oder .csv, None = nur auf der Console
+pool_stichproben = 2000  # Anzahl zufälliger Variablensätze pro frage bei der Pool-Prüfung
+titel_normiert_suchen = False  # True: Fragen auch finden, wenn sich der titel nur in Leerzeichen oder Groß-/Kleinschreibung unterscheidet (wird gemeldet)
 ############################################################################
 
-import pandas as pd
-import numpy as np
-from math import *
-from copy import deepcopy
-
-
-def notenberechnung (pkt, max_pkt, schema_proz, schema_note):
-    """ E.Waffenschmidt, 4.9.2020
-    Berechnet für eine erzielte Punktzahl einer Prüfung 
-    anhand eines Notenschemas die Note
-    """
-    note = "n.v."  # Default Note, wenn nichts gefunden wird. Eigentlich unmöglich.
-    for i in range(len(schema_note)):
-        if (pkt / max_pkt * 100) >= schema_proz[i]:
-            note = schema_note[i]
-    return note
-
-def init_2d_none (m, n):
-    """ E. Waffenschmidt, 3.9.2020
-    initialisiert ein 2D-Array mit "None" als Inhalt
-    Zugriff mit x = a[m][n]
-    """
-    a = []
-    for i in range(m):
-        a.append([None] * n)
-    return a
-
-def init_2d_no_str (m, n):
-    """ E. Waffenschmidt, 3.9.2020
-    initialisiert ein 2D-Array mit Leerstring als Inhalt
-    Zugriff mit x = a[m][n]
-    """
-    a = []
-    for i in range(m):
-        a.append([""] * n)
-    return a
-
-def init_3d_none (m, n, o):
-    """ E. Waffenschmidt, 3.9.2020
-    initialisiert ein 3D-Array mit "None" als Inhalt
-    Zugriff mit x = a[m][n][o]
-    """
-    a = []
-    for k in range(m):
-        a.append(init_2d_none(n, o))
-    return a
-
-def init_3d_no_str (m, n, o):
-    """ E. Waffenschmidt, 3.9.2020
-    initialisiert ein 3D-Array mit Leerstring als Inhalt
-    Zugriff mit x = a[m][n][o]
-    """
-    a = []
-    for k in range(m):
-        a.append(init_2d_no_str(n, o))
-    return a
-
-#def Get_Frage_ID (titel):
-#    """ E. Waffenschmidt, 3.9.2020
-#    Extrahiert die Fragen-ID (Die "Nummer" der frage) aus dem gesamten titel.
-#    Konkret sind das alle Zeichen bis zum ersten Leerzeichen.
-#    """
-#    return titel[0:titel.find(" ")] #Übernimmt den Text in titel bis zum ersten Leerzeichen
-
-def finde_fragenindex (fragen_id, fragen_id_pool):
-    """ E. Waffenschmidt, 3.9.2020
-    Ermittelt den Index einer frage in einem Fragebpool anhand der Fragen-ID
-    Wenn die gesuchet ID nicht im Pool ist, wird "None" zurück geliefert.
-    """
-    index = None
-    fragen_anz = len(fragen_id_pool)
-    for id_nr in range(0, fragen_anz):
-        if fragen_id == fragen_id_pool[id_nr]:
-            index = id_nr
-    return index
-
-def eval_ilias_single(gleichung_ilias, v, r):
-    """E. Waffenschmidt, 3.9.2020
-       Evaluiert (d.h. nutzt die Gleichung zur Berechnung) 
-       eine Formel im ILIAS-Format 
-       Die Variablenwerte werden in Form einer Liste in der Variablen v übergeben.
-       Die Anzahl der Variablen in der Liste ist beliebig 
-       und ergibt sich aus der Länge der List-Variablen v.   
-       ACHTUNG: Die erste variable $v1 wird zu v[0].
-       Die Funktion nutzt den eval() Befehl in Python. 
-       Fehler bei der Berechnung werden abgefangen, damit das Programm nicht abbricht. 
-       Bei einem Fehler in der Formel wird eine Meldung auf der Console 
-       ausgegeben und das Ergebnis ist None.
-       Sicherheits-Limitierungen von eval müssen noch eingebaut werden.
-       Erste vergebliche dazu Versuche siehe "Lade Exceltab Aufgabenpool V1_2.py"
-       Zum berechnen wird die Gleichung vom ILIAS-Format an das Format für Python angepasst.
-       Dabei werden alle Großbuchstaben in Kleinbuchstaben umgewandelt,
-       weil die Fuktionen sonst nicht richtig sind.
-       Ersetzungstabelle:
-       ILIAS        Python
-       $v1          v[1] etc.
-       ^            **
-                    pi
-                    e
-                    sin
-                    sinh
-       arcsin       asin
-       arcsinh      asinh
-                    cos
-                    cosh
-       arccos       acos
-       arccosh      acosh
-                    tan
-                    tanh
-       arctan       atan
-       arctanh      atanh
-                    sqrt
-                    abs
-       ln           log
-       log          log10
-
-    ILIAS kennt folgende Begriffe bei der Definition von Formeln:
-    "Erlaubt ist die Verwendung von bereits definierten Variablen ($v1 bis $vn), 
-    von bereits definierten Ergebnissen (z.B. $r1), 
-    das beliebige Klammern von Ausdrücken, 
-    die mathematischen Operatoren + (Addition), - (Subtraktion),
-    * (Multiplikation), / (Division), ^ (Potenzieren), 
-    die Verwendung der Konstanten 'pi' für die Zahl Pi und 'e‘ für die Eulersche Zahl, 
-    sowie die mathematischen Funktionen 
-    'sin', 'sinh', 'arcsin', 'asin', 'arcsinh', 'asinh', 'cos', 'cosh', 
-    'arccos', 'acos', 'arccosh', 'acosh', 'tan', 'tanh', 'arctan', 'atan', 
-    'arctanh', 'atanh', 'sqrt', 'abs', 'ln', 'log'."
-    """
-    anz_var = len(v)  # Anzahl der möglichen variable $v1, $v2 usw. in der ILIAS-Formel
-    # Gleichung für Python-Format anpassen:
-    gleichung_py = gleichung_ilias.lower()
-    # Variablenbezeichnung umändern:
-    for i in reversed(range(1, anz_var + 1)):
-        var_ilias = "$v" + str(i)
-        var_py = "v[" + str(i - 1) + "]"
-        gleichung_py = gleichung_py.replace(var_ilias, var_py)
-    for j in reversed(range(1, anz_var + 1)):
-        res_ilias = "$r" + str(j)
-        res_py = "r[" + str(j - 1) + "]"
-        gleichung_py = gleichung_py.replace(res_ilias, res_py)
-    # Mathematische Funktionen anpassen:
-    gleichung_py = gleichung_py.replace("^", "**")
-    gleichung_py = gleichung_py.replace("arcsin", "asin")
-    gleichung_py = gleichung_py.replace("arcsinh", "asinh")
-    gleichung_py = gleichung_py.replace("arccos", "acos")
-    gleichung_py = gleichung_py.replace("arccosh", "acosh")
-    gleichung_py = gleichung_py.replace("arctan", "atan")
-    gleichung_py = gleichung_py.replace("arctanh", "atanh")
-    gleichung_py = gleichung_py.replace("ln", "log")
-    gleichung_py = gleichung_py.replace("log", "log10")
-
-    # Gleichung checken und berechnen
-    try:  # Testet, ob eine Fehler auftritt
-        eval(gleichung_py)
-    except:  # Wenn ein Fehler auftritt, Fehlermeldung
-        result = None
-        print("Gleichung ", gleichung_ilias, " enthält einen Fehler:")
-        print("Python-Format:", gleichung_py)
-        print("Variablen:", v)
-        print("Ergebnisse:", r)
-    else:  # sonst is alles OK, und die Gleichung wird berechnet.
-        result = eval(gleichung_py)
-    return result
-
-
-def eval_ilias_batch(gleichungen, variablen, res):
-    # Für den Fall, dass eine Unteraufgabe eine Lösung aus einer späteren Unteraufgabe benötigt,
-    # werden
-    k = 0
-    while k < anz_res + 1:
-        for id, gleichung_ilias in enumerate(gleichungen):
-            if not res[id] is None or gleichung_ilias == " ":
-                continue
-
-            anz_var = len(variablen)  # Anzahl der möglichen variable $v1, $v2 usw. in der ILIAS-Formel
-            # Gleichung für Python-Format anpassen:
-            gleichung_py = gleichung_ilias.lower()
-            # Variablenbezeichnung umändern:
-            for i in reversed(range(1, anz_var + 1)):
-                var_ilias = "$v" + str(i)
-                var_py = "v[" + str(i - 1) + "]"
-                gleichung_py = gleichung_py.replace(var_ilias, var_py)
-            for j in reversed(range(1, anz_var + 1)):
-                res_ilias = "$r" + str(j)
-                res_py = "r[" + str(j - 1) + "]"
-                gleichung_py = gleichung_py.replace(res_ilias, res_py)
-            # Mathematische Funktionen anpassen:
-            gleichung_py = gleichung_py.replace("^", "**")
-            gleichung_py = gleichung_py.replace("arcsin", "asin")
-            gleichung_py = gleichung_py.replace("arcsinh", "asinh")
-            gleichung_py = gleichung_py.replace("arccos", "acos")
-            gleichung_py = gleichung_py.replace("arccosh", "acosh")
-            gleichung_py = gleichung_py.replace("arctan", "atan")
-            gleichung_py = gleichung_py.replace("arctanh", "atanh")
-            gleichung_py = gleichung_py.replace("ln", "log")
-            gleichung_py = gleichung_py.replace("log", "log10")
-
-            # Gleichung checken und berechnen
-            try:  # Testet, ob ein Fehler auftritt
-                result = eval(gleichung_py)
-            except:  # Wenn ein Fehler auftritt, Fehlermeldung
-                result = None
-                print("Gleichung ", gleichung_ilias, " enthält einen Fehler:")
-                print("Python-Format:", gleichung_py)
-                print("Variablen:", variablen)
-                print("Ergebnisse:", res)
-            r[id] = result
-        k += 1
-    return r
-
-
-########################################################################
-## HAUPTPROGRAMM ##############################################################
-########################################################################
-
-print("Tool zur externen Bewertung von ILIAS Formelfragen-Tests")
-print("Version 1.5, 4.9.2020")
-print("(c) by Eberhard Waffenschmidt, TH-Köln")
-
-# weitere Konstanten
-name_marker = "Ergebnisse von Testdurchlauf 1 für "
-fragentitel_marker = "Formelfrage"
-
-dummytext = "xyz"
-
-# Daten aus EXCEL-File einlesen:
-# Vor dem Filename in '' muss ein "r" gesetzt werden.
-# Das Blatt im EXCEL-File wird nochmal mit sheet_name benannt
-# header=None wird gesetzt, wenn keine Spaltenüberschriften existieren.
-# skiprows=5 überspringt die ersten 5 Zeilen 
-
-# Testergebnisse einlesen:
-#df1 = pd.read_excel (r'C:\Users\Ebi\Documents\python\ILIAS Prüfungs-Auswertung\ETAT-Probe-Klausur_results kurz.xlsx', sheet_name='Auswertung für alle Benutzer')
-#df1 = pd.read_excel (r'C:\Users\Ebi\Documents\python\ILIAS Prüfungs-Auswertung\ETAT-Probe-Klausur_results mit Titelzeile.xlsx', sheet_name='Auswertung für alle Benutzer', header=None)
-
-# Manche ILIAS-Exporte haben je einen Reiter pro Student. Die folgende Funktion überprüft
-# die Beschaffenheit der Tabelle und formt sie entsprechend um
-
-try:
-    df1 = pd.read_excel(ergebnis_datei, sheet_name='Auswertung für alle Benutzer', header=None)
-except:
-    df_dict = pd.read_excel(ergebnis_datei, sheet_name=None, header=None)
-    df1 = df_dict[list(df_dict.keys())[1]]
-    for id in list(df_dict.keys())[2:]:
-        new_student = df_dict[id]
-        df1 = pd.concat([df1, new_student], ignore_index=True)
-
-# Fragenpool aus Excel-Tabelle einlesen
-FRAGEN_AUS_ILIAS_EXPORT = True
-if FRAGEN_AUS_ILIAS_EXPORT:
-    df2 = pd.read_excel(fragen_datei, sheet_name='SQL - Database')
-else:
-    df2 = pd.read_excel(fragen_datei, sheet_name='Tabelle1', skiprows=5)
-#df2 = pd.read_excel (r'C:\Users\Ebi\Documents\python\ILIAS Prüfungs-Auswertung\EGT-ILIAS-Klausuraufgaben  edEW-FK4_1.xlsx', sheet_name='Tabelle1', skiprows=5)
-########################################################################
-### Testergebnisse verarbeiten: ########################################
-########################################################################
-# Daten in 2D-Array umwandeln, damit der Zugriff einfacher zu indexieren ist
-i_d = df1.values #i_d steht für ILIAS-Daten
-anz_zeilen = len(i_d)
-
-# Anzahl teilnehmer ermitteln
-anz_teilnehmer = 0
-for zeile in range(anz_zeilen):
-   txt = i_d[zeile, 0]
-   if (txt.__class__ == dummytext.__class__):
-      if txt.startswith(name_marker):
-         anz_teilnehmer = anz_teilnehmer + 1
-
-# variable initialisieren
-nr_teilnehmer = [None] * anz_teilnehmer # Fortlaufende Nummer
-namen = [""] * anz_teilnehmer
-vornamen = [""] * anz_teilnehmer
-familiennamen = [""] * anz_teilnehmer
-mat_nr = [""] * anz_teilnehmer
-noten = [""] * anz_teilnehmer
-fragentitel = init_3d_no_str(anz_teilnehmer, anz_fragen, anz_res)  # fragentitel = [[""]*anz_fragen]*anz_teilnehmer fuktioniert nicht!
-fragen_id = init_3d_no_str(anz_teilnehmer, anz_fragen, anz_res)
-fragen_formel = init_3d_no_str(anz_teilnehmer, anz_fragen, anz_res)
-fragen_tol = init_3d_none(anz_teilnehmer, anz_fragen, anz_res)
-var = init_3d_none(anz_teilnehmer, anz_fragen, anz_var)  # Zugriff mit: V = var[teilnehmer][frage][variable]
-res = init_3d_none(anz_teilnehmer, anz_fragen, anz_res)
-res_ref = init_3d_none(anz_teilnehmer, anz_fragen, anz_res)  # Richtiges Ergebnis als Referenz
-pkt = init_3d_none(anz_teilnehmer, anz_fragen, anz_res)     # Vergebene punkte für die Aufgabe
-ges_pkt = [None] * anz_teilnehmer
-
-# Daten der teilnehmer analysieren
-print("Testergebnisse werden analysiert...")
-teilnehmer = 0
-frage_nr = 0
-for zeile in range(anz_zeilen):
-   txt = i_d[zeile, 0]
-   if (txt.__class__ == dummytext.__class__):
-      if txt.startswith(name_marker):
-         teilnehmer = teilnehmer + 1
-         nr_teilnehmer[teilnehmer - 1] = teilnehmer
-         name = txt.replace(name_marker, "")  # Der Text vor dem namen wird entfernt
-         namen[teilnehmer - 1] = name
-         familiennamen[teilnehmer - 1] = name[0:name.find(",")] #Übernimmt den Text in titel bis zum ersten Komma.
-         vornamen[teilnehmer - 1] = name[name.find(",") + 2:]     #Übernimmt den Text in titel 2 Stellen nach dem ersten Komma.
-         # print ("teilnehmer Nr.: ",teilnehmer, " : ",name," Vorname: ",vornamen[teilnehmer-1], " Familienname: ",familiennamen[teilnehmer-1] )
-         frage_nr = 0
-      if txt.startswith(fragentitel_marker):
-         frage_nr = frage_nr + 1
-         titel = i_d[zeile, 1]
-         fragentitel[teilnehmer - 1][frage_nr - 1] = titel
-         fragen_id[teilnehmer - 1][frage_nr - 1] = titel  # Get_Frage_ID (titel)
-#         print ("teilnehmer Nr.: ",teilnehmer, " Fragenummer: ",frage_nr, " ID: ",fragen_id[teilnehmer-1][frage_nr-1])
-      for var_nr in range(1, anz_var + 1):
-          var_marker = "$v" + str(var_nr)
-          if txt == var_marker:
-             x = i_d[zeile, 1]
-             var[teilnehmer - 1][frage_nr - 1][var_nr - 1] = x
-#             print ("var[",var_nr,"] = ",x)
-      for res_nr in range(1, anz_res + 1):
-          res_marker = "$r" + str(res_nr)
-          if txt.startswith(res_marker):
-             y = i_d[zeile, 1]
-             res[teilnehmer - 1][frage_nr - 1][res_nr - 1] = y
-#             print ("res[",res_nr,"] = ",y," - ",res[teilnehmer-1][frage_nr-1], "Vorh.r=",res[teilnehmer-1][frage_nr-2],)
-      
-########################################################################
-### Fragenpool verarbeiten #############################################
-########################################################################
-# relevante Spalten in 1D-Arrays (Lists) kopieren
-if FRAGEN_AUS_ILIAS_EXPORT:
-    titels_pool = df2['question_title']
-    gleichungen_pool = {x: df2[f'res{x + 1}_formula'] for x in range(anz_res)}
-    toleranzen_pool = {x: df2[f'res{x + 1}_tol'] for x in range(anz_res)}
-    punkte_pool = {x: df2[f'res{x + 1}_points'] for x in range(anz_res)}
-else:
-    titels_pool = df2['Question Title']
-    gleichungen1_pool = df2['Formula 1']
-    toleranzen1_pool = df2['res1 tol']
-    punkte1_pool = df2['res1 pts']
- # Nur Formel 1 wird ausgewertet
-
-anz_fragen_pool = len(titels_pool)
-
-#fragen_id_pool = [""] * anz_fragen_pool
-# Fragen IDs aus den Titeln extrahieren:
-#for i in range(0, anz_fragen_pool):
-#    fragen_id_pool[i] = Get_Frage_ID(titels_pool[i])
-
-fragen_id_pool = list(titels_pool)
-    
-########################################################################
-### Testergebnisse und Fragenpool verknüpfen ###########################
-########################################################################
-
-# Formeln zu den Ergebnissen der teilnehmer zuordnen,
-# Richtiges Ergebnis berechnen 
-# Mit den Ergebnis des Studenten vergleichen 
-# und punkte vergeben
-print("Testergebnisse werden mit Fragenpool verknüpft...")
-for std_id, std_aufgaben in enumerate(fragen_id):
-    ges_punkte = 0
-    for afg_id, aufgabe in enumerate(std_aufgaben):
-        fid = finde_fragenindex(fragen_id[std_id][afg_id], fragen_id_pool)
-        fragen_punkte_student = [0 for _ in range(anz_res)]
-        musterloesung = [None for _ in range(anz_res)]
-        formeln = [gleichungen_pool[x][fid] for x in range(anz_res)]
-        toleranzen = [toleranzen_pool[x][fid] for x in range(anz_res)]
-        punkte = [punkte_pool[x][fid] for x in range(anz_res)]
-        std_variablen = var[std_id][afg_id]
-        std_ergebnisse = res[std_id][afg_id]
-        if not std_variablen[0] == None:  # Wenn der Student die Aufgabe gar nicht angeschaut hat, sind alle Variablen None, insbesondere die erste.
-            musterloesung = eval_ilias_batch(formeln, std_variablen, musterloesung)
-            # Maximale und minimale Grenze mit toleranz bestimmen.
-            # ACHTUNG: Bei negativem Vorzeichen drehen sich min und max rum,
-            # das gibt dann Ärger beim nachfolgenden Vergleich
-            # Daher hier die Verwendung von "min" und "max"
-            for uid, (r_student, r, toleranz, punkte) in enumerate(zip(std_ergebnisse,
-                                                                       musterloesung,
-                                                                       toleranzen,
-                                                                       punkte)):
-                if r_student is not None:  # Wenn der Student keine Lösung angegeben hat ist r_student = None
-                    # Dann kann es noch sein, dass die Lösung als Bruch, z.B. 1/300 angegebn ist.
-                    # Dann muss der Bruch mit eval ausgerechnet werden
-                    if r is None:  # Überprüfung ob Berechnung eines Ergebnisses nicht geklappt hat
-                        print(f"Fehler in Berechnung der Formel: {aufgabe}\nUnteraufgabe: {uid + 1}")
-                    r_min = min(r * (1 + toleranz / 100), r * (1 - toleranz / 100))
-                    r_max = max(r * (1 + toleranz / 100), r * (1 - toleranz / 100))
-                    if type(r_student) == str:
-                        r_student = eval(r_student)
-                    if (r_student >= r_min) and (r_student <= r_max):
-                        fragen_punkte_student[uid] = punkte
-                        ges_punkte = ges_punkte + punkte
-                    for i, gleichung in enumerate(formeln): #Überprufung ob es überhaupt eine Fragen Unterteil gab
-                        if gleichung == " ":
-                            fragen_punkte_student[i] = None
-
-            fragen_formel[std_id][afg_id] = formeln
-            fragen_tol[std_id][afg_id] = toleranzen
-            res_ref[std_id][afg_id] = musterloesung
-            pkt[std_id][afg_id] = fragen_punkte_student
-    ges_pkt[std_id] = ges_punkte
-    noten[std_id] = notenberechnung(ges_punkte, max_pkt, schema_proz, schema_note)
-
-
-"""
-for teilnehmer in range(0,anz_teilnehmer):
-    # print ("Nr.",teilnehmer,namen[teilnehmer],":")
-    ges_punkte = 0
-    for frage in range(0,anz_fragen):
-#        print("Teiln.",teilnehmer,"frage:",frage,"ID:",fragen_id[teilnehmer][frage])
-#        print("Variablen:",var[teilnehmer][frage])
-#        print("Stud.res.:",res[teilnehmer][frage])
-
-        # print("")
-        fragen_punkte_student = 0
-        # print ("Teiln.",teilnehmer,", frage",frage,",",fragen_id[teilnehmer][frage])
-        # Index der frage im Fragenpool finden
-        i = finde_fragenindex(fragen_id[teilnehmer][frage], fragen_id_pool)
-        Musterlösung = [None for _ in range(anz_res)]
-        for res_range in range(anz_res):
-
-            print(fragen_id_pool[i])
-
-            if i==None: #Falls frage nicht im Pool gefunden wird
-                r = -999999
-                Formel = "Formel Nicht gefunden"
-                toleranz = None
-                print("!!! Teiln.",teilnehmer,", frage",frage,",",fragen_id[teilnehmer][frage]," existiert nicht im Pool!")
-            else:
-                # print ("Fragenindex i =",i)
-                # Passende Formel usw. aus dem Fragenpool auslesen
-                # Derzeit wird nur Ergebnis 1 ausgewertet
-                Formel = gleichungen_pool[res_range][i]
-                toleranz = toleranzen_pool[res_range][i]
-                punkte = punkte_pool[res_range][i]
-                if Formel == " " or Formel is np.nan:
-                    continue
-                # Formel mit den Variablen des Studenten anwenden:
-                v = var[teilnehmer][frage]
-
-                # Ergebnisse der Studierenden für Folgefehler-Berechnung auskommentieren
-                # r = res[teilnehmer][frage]
-                if v[0] == None: # Wenn der Student die Aufgabe gar nicht angeschaut hat, sind alle Variablen None, insbesondere die erste.
-                    r = None
-                else:  # Der Student hat wenigstens die frage angeschaut und Werte bekommen
-                    r = eval_ilias_single(Formel, v, Musterlösung)
-                    if r is None:
-                        apa = {"T": toleranz}
-                    Musterlösung[res_range] = r
-                    # print ("Formel =",Formel,"=",r,"toleranz:",toleranz,"%")
-                    # print ("Typ von r = ",type(r))
-
-                    # Maximale und minimale Grenze mit toleranz bestimmen.
-                    # ACHTUNG: Bei negativem Vorzeichen drehen sich min und max rum,
-                    # das gibt dann Ärger beim nachfolgenden Vergleich
-                    # Daher hier die Verwendung von "min" und "max"
-                    r_min = min(r*(1+toleranz/100), r*(1-toleranz/100))
-                    r_max = max(r*(1+toleranz/100), r*(1-toleranz/100))
-                    # print("Min =",r_min,", Max =",r_max)
-
-                    # Ergebnis des Studierenden:
-                    r_student = res[teilnehmer][frage][res_range]  # Es wird in dieser version nur ein Ergebnis, das erste, ausgewertet
-                    # print("Stud. Ergebnis: Teiln.",teilnehmer,"frage:",frage,"R_stud =",r_student)
-
-                    # Ist das Ergebnis vorhanden und innerhalb der toleranz?
-                    # Dann gibt's die punkte für die Aufgabe, sonst 0 pkt.
-                    if r_student != None: #Wenn der Student keine Lösung angegeben hat ist r_student = None
-                        # Dann kann es noch sein, dass die Lösung als Bruch, z.B. 1/300 angegebn ist.
-                        # Dann muss der Bruch mit eval ausgerechnet werden
-                        if type(r_student)==str:
-                            r_student = eval(r_student)
-                        if (r_student >= r_min) and (r_student <= r_max):
-                            fragen_punkte_student += punkte
-                            ges_punkte = ges_punkte + punkte
-                            # print("punkte =",Punkte_Student)
-                
-        # Jetzt noch die Ergebnisse in den Listen abspeichern:
-        # print ("frage",frage,",",fragen_id[teilnehmer][frage],"pkt =",fragen_punkte_student)
-        fragen_formel[teilnehmer][frage] = Formel
-        fragen_tol[teilnehmer][frage] = toleranz
-        res_ref[teilnehmer][frage][0] = r
-        pkt[teilnehmer][frage][0] = fragen_punkte_student
-    ges_pkt[teilnehmer] = ges_punkte
-    noten[teilnehmer] = notenberechnung (ges_punkte, max_pkt, schema_proz, schema_note)
-    print ("Nr.",nr_teilnehmer[teilnehmer],namen[teilnehmer],", Ges.pkt =",ges_pkt[teilnehmer],", Note =",noten[teilnehmer])
-"""
-print("Anzahl Teilnehmer = ", anz_teilnehmer)
-
-########################################################################
-### Daten in EXCEL-Sheet exportieren  ##################################
-########################################################################
-# Dazu passenden Pandas-Dataframe zusammenbauen:
-# Zeilentitel generieren:
-#  Nr name Vorname Familienname mat_nr Note GesPkt A1Pkt ... A40Pkt ...
-#  ... A1_ID A01_Formel A01_Tol A1_ResRef A1_Res  A1_v1 A1_v2...A1_v10 ...
-#  ...
-#  ... A40_ID A01_Formel A40_Tol A40_ResRef A40_Res  A40_v1 A40_v2...A40_v10
-    
-print('Daten werden nach EXCEL exportiert...')
-
-df_ex = pd.DataFrame() # leeren DataFrame zum Export erzeugen
-# Übersichtsdaten
-df_ex['Nr'] = nr_teilnehmer  # erzeugt eine neue Spalte mit dem titel 'Nr' und Daten in nr_teilnehmer
-df_ex['name'] = namen  # erzeugt eine neue Spalte mit dem titel 'name' und den Daten in namen
-df_ex['Vorname'] = vornamen
-df_ex['Familienname'] = familiennamen
-df_ex['mat_nr'] = mat_nr
-df_ex['Note'] = noten
-df_ex['GesPkt'] = ges_pkt
-
-# Gesamtpunkte bei den einzelnen Fragen
-for frage in range(anz_fragen):
-    for untertitel in range(anz_res):
-        spaltentitel = "A" + str(frage + 1) + f".{untertitel + 1}_Pkt"
-        x = [None] * anz_teilnehmer  # Spaltendaten initialisieren
-        for teilnehmer in range(anz_teilnehmer):
-            x[teilnehmer] = pkt[teilnehmer][frage][untertitel]
-        df_ex[spaltentitel] = x
-
-for frage in range(anz_fragen):
-    spaltentitel = "A" + str(frage + 1) + f".{untertitel + 1}_Pkt_Gesamt"
-    x = [None] * anz_teilnehmer  # Spaltendaten initialisieren
-    for teilnehmer in range(anz_teilnehmer):
-        x[teilnehmer] = sum(filter(None, pkt[teilnehmer][frage]))
-    df_ex[spaltentitel] = x
-
-df_ex[''] = [""] * anz_teilnehmer  # Leerspalte an dieser Stelle einfügen
-
-# Details zu den einzelnen Fragen 
-for frage in range (anz_fragen):
-    spaltentitel = f"A" + str(frage + 1) + f"_ID"
-    x = [""] * anz_teilnehmer  # Spaltendaten initialisieren
-    for teilnehmer in range(anz_teilnehmer):
-        x[teilnehmer] = fragen_id[teilnehmer][frage]
-    df_ex[spaltentitel] = x
-    for untertitel in range(anz_res):
-        spaltentitel = "A" + str(frage + 1) + f".{untertitel}_Formel"
-        x = [""] * anz_teilnehmer  # Spaltendaten initialisieren
-        for teilnehmer in range(anz_teilnehmer):
-            x[teilnehmer] = fragen_formel[teilnehmer][frage][untertitel]
-        df_ex[spaltentitel] = x
-
-    spaltentitel = "A" + str(frage + 1) + "_Tol"
-    x = [""] * anz_teilnehmer  # Spaltendaten initialisieren
-    for teilnehmer in range(anz_teilnehmer):
-        x[teilnehmer] = fragen_tol[teilnehmer][frage]
-    df_ex[spaltentitel] = x
-
-    for untertitel in range(anz_res):
-        spaltentitel = "A" + str(frage + 1) + f".{untertitel}_Res_Ref"
-        x = [""] * anz_teilnehmer  # Spaltendaten initialisieren
-        for teilnehmer in range(anz_teilnehmer):
-            x[teilnehmer] = res_ref[teilnehmer][frage][untertitel]
-        df_ex[spaltentitel] = x
-
-    for untertitel in range(anz_res):
-        spaltentitel = "A" + str(frage + 1) + f".{untertitel}_Res"
-        x = [""] * anz_teilnehmer # Spaltendaten initialisieren
-        for teilnehmer in range(anz_teilnehmer):
-            x[teilnehmer] = res[teilnehmer][frage][untertitel]
-        df_ex[spaltentitel] = x
-    
-    # Variablen der einzelnen Fragen
-    for variable in range(anz_var):
-        spaltentitel = "A" + str(frage + 1) + "_v" + str(variable + 1)
-        x = [""] * anz_teilnehmer  # Spaltendaten initialisieren
-        for teilnehmer in range(anz_teilnehmer):
-            x[teilnehmer] = var[teilnehmer][frage][variable]
-        df_ex[spaltentitel] = x
-    
-# Datenframe in EXCEL-File schreiben   
-df_ex.to_excel(filename_export, index=False) # Index = False sorgt dafür, dass die erste Spalte nicht den Zeilenidex von 0..Ende enthält
-
-print('Fertig!')
-
-# Hier folgen die Vorbereitungen für ein DataFrame, was mithilfe des IRT-Tools ausgewertet werden kann
-#res_dict = {res_id: None for res_id in range(anz_res)}
-#FragenID_dict = {fid: deepcopy(res_dict) for fid in fragen_id_pool}  # Jede Fragen ID erhält eine Spalte im späteren DataFrame
-#irtf = {uid: deepcopy(FragenID_dict) for uid in range(anz_teilnehmer)}  # Jedem teilnehmer wird jede frage zugeordnet
-
-#Im folgenden werden die punkte den entsprechenden Fragen pro teilnehmer zugeordnet
-pkt_per_frage = {}
-for uid, fids, pkte in zip(range(anz_teilnehmer), fragen_id, pkt):
-    pkt_per_frage[uid] = {}
-
-    for fid, pkt in zip(fids, pkte):
-        for pid, p in enumerate(pkt):
-            if p == 0:  # Abfrage ob Frage richtig berechnet wurde. Für IRT wäre -1: "Falsche Antwort" und 0: "frage nicht gestellt"
-                p = -1
-            if p is None:
-                p = 0
-            pkt_per_frage[uid][f"{fid}.{pid}"] = p
-
-irtf = {}
-for uid, frg_pool in enumerate(pkt_per_frage.values()):
-    irtf[uid] = {}
-    for frg in frg_pool:
-        irtf[uid][frg] = frg_pool[frg]
-        #print(uid, frg)
-        #print(irtf[uid])
-
-pd.DataFrame(irtf).T.fillna(0).to_excel(irtf_name)
-# Leider müssen jetzt noch von Hand die Formatierung und die erste sowie letzte Spalte aus der Excel gelöscht werden
\ No newline at end of file
+# Alle Funktionen stehen in der Bibliothek ilias_bewertung (Verzeichnis neben
+# diesem Skript). Sie lassen sich auch aus anderen Programmen importieren oder
+# über die Kommandozeile aufrufen: python -m ilias_bewertung --help
+if __name__ == "__main__":
+    from ilias_bewertung import bewertung
+
+    bewertung.konfiguriere(**{name: wert for name, wert in globals().items() if name in bewertung.EINSTELLUNGEN})
+    if pool_pruefen:
+        bericht = bewertung.poolpruefung()
+    elif stapel_manifest:
+        bewertung.bewerte_stapel(stapel_manifest, anz_prozesse)
+    else:
+        # versuche und fragenpool bleiben z.B. in Spyder zur Ansicht erhalten
+        versuche, fragenpool = bewertung.hauptprogramm()
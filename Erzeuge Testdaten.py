@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Erzeugt synthetische ILIAS-Daten zum Testen und Messen von
+"Bewerte ILIAS-Testergebnisse V1_5.py", ohne echte Daten von Studierenden.
+
+Geschrieben werden
+  - ein Fragenpool im Format des ILIAS-Exports (Blatt "SQL - Database")
+    mit Formelfragen aus einfachen Formel-Bausteinen, auch mit Bezügen
+    auf vorherige Ergebnisse ($r1, $r2, ...). Endet --fragen-datei auf .zip,
+    wird der Pool wie der QTI-Export von ILIAS geschrieben,
+  - eine Ergebnisdatei "Auswertung für alle Benutzer", entweder alle
+    teilnehmer in einem Blatt (layout="ein_blatt") oder wie bei manchen
+    ILIAS-Exporten ein Blatt pro teilnehmer hinter einer Übersicht
+    (layout="pro_teilnehmer").
+Die Antworten der teilnehmer sind teils richtig, teils knapp oder deutlich
+daneben, teils als Bruch eingegeben oder leer. Einige Fragen wurden gar nicht
+geöffnet. Mit --durchlaeufe N machen die teilnehmer bis zu N Testdurchläufe
+mit jeweils neu gezogenen Fragen. Mit demselben seed entstehen immer dieselben Dateien.
+
+Aufruf z.B.:
+  python "Erzeuge Testdaten.py" --teilnehmer 1000 --fragen 60 --fragen-pro-test 14 --layout pro_teilnehmer
+"""
+
+import argparse
+import math
+import os
+import random
+import xml.etree.ElementTree as ET
+import zipfile
+
+from openpyxl import Workbook
+
+# Formel-Bausteine: (ILIAS-Formel, Berechnung in Python, benötigte Variablen).
+# v und r sind Listen mit den Variablen bzw. den vorherigen Ergebnissen der frage.
+FORMEL_BAUSTEINE_ERSTES = [
+    ("$v1*$v2", lambda v, r: v[0] * v[1], 2),
+    ("$v1+$v2*$v3", lambda v, r: v[0] + v[1] * v[2], 3),
+    ("sqrt($v1^2+$v2^2)", lambda v, r: math.sqrt(v[0] ** 2 + v[1] ** 2), 2),
+    ("$v1/($v2+$v3)", lambda v, r: v[0] / (v[1] + v[2]), 3),
+    ("2*pi*$v1*$v2", lambda v, r: 2 * math.pi * v[0] * v[1], 2),
+    ("ln($v1)*$v2", lambda v, r: math.log(v[0]) * v[1], 2),
+    ("$v1*sin($v2)", lambda v, r: v[0] * math.sin(v[1]), 2),
+    ("$v1^2/$v2", lambda v, r: v[0] ** 2 / v[1], 2),
+]
+FORMEL_BAUSTEINE_FOLGE = [
+    ("$r1/$v1", lambda v, r: r[0] / v[0], 1),
+    ("$r1*$v2", lambda v, r: r[0] * v[1], 2),
+    ("sqrt(abs($r1))", lambda v, r: math.sqrt(abs(r[0])), 0),
+    ("$r1+$v1", lambda v, r: r[0] + v[0], 1),
+    ("$r2-$r1", lambda v, r: r[1] - r[0], 0),
+    ("$r2*$v1", lambda v, r: r[1] * v[0], 1),
+]
+
+
+def erzeuge_fragenpool(anz_fragen, anz_var=4, anz_res=5, seed=1):
+    """Erzeugt anz_fragen Formelfragen mit bis zu anz_var Variablen und
+    anz_res Ergebnissen. Liefert eine Liste von dicts mit titel, variablen
+    (Liste von (min, max, nachkommastellen)) und ergebnisse (Liste von
+    (formel, funktion, toleranz, punkte)).
+    """
+    zufall = random.Random(seed)
+    fragen = []
+    for nr in range(anz_fragen):
+        formel, funktion, benoetigt = zufall.choice([b for b in FORMEL_BAUSTEINE_ERSTES if b[2] <= anz_var])
+        ergebnisse = [(formel, funktion, zufall.choice([1, 2, 5]), zufall.choice([1, 2, 3]))]
+        anz_ergebnisse = zufall.randint(1, max(1, anz_res))
+        while len(ergebnisse) < anz_ergebnisse:
+            bausteine = [b for b in FORMEL_BAUSTEINE_FOLGE
+                         if b[2] <= anz_var and ("$r2" not in b[0] or len(ergebnisse) >= 2)]
+            formel, funktion, anz = zufall.choice(bausteine)
+            benoetigt = max(benoetigt, anz)
+            ergebnisse.append((formel, funktion, zufall.choice([1, 2, 5]), zufall.choice([1, 2])))
+        anz_variablen = zufall.randint(benoetigt, anz_var)
+        variablen = []
+        for _ in range(anz_variablen):
+            untergrenze = zufall.choice([1, 2, 5, 10])
+            variablen.append((untergrenze, untergrenze * zufall.choice([5, 10, 20]), zufall.choice([0, 0, 1, 2])))
+        fragen.append({"titel": f"{nr + 1:02d}.1.1 Synthetische Frage {nr + 1}",
+                       "variablen": variablen, "ergebnisse": ergebnisse})
+    return fragen
+
+
+def schreibe_fragenpool(fragen, dateiname, anz_var=4, anz_res=5):
+    """Schreibt den Fragenpool im Format des ILIAS-Exports (Blatt "SQL - Database")
+    mit Spalten für anz_var Variablen und anz_res Ergebnisse.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("SQL - Database")
+    kopf = ["question_type", "question_title", "question_description_main"]
+    for k in range(1, anz_var + 1):
+        kopf += [f"var{k}_name", f"var{k}_min", f"var{k}_max", f"var{k}_prec"]
+    for k in range(1, anz_res + 1):
+        kopf += [f"res{k}_name", f"res{k}_formula", f"res{k}_tol", f"res{k}_points", f"res{k}_prec"]
+    ws.append(kopf)
+    for frage in fragen:
+        zeile = ["formula", frage["titel"], "Synthetische Frage für Tests"]
+        for k in range(anz_var):
+            if k < len(frage["variablen"]):
+                zeile += [f"$v{k + 1}", *frage["variablen"][k]]
+            else:
+                zeile += [" ", None, None, None]
+        for k in range(anz_res):
+            if k < len(frage["ergebnisse"]):
+                formel, _, toleranz, punkte = frage["ergebnisse"][k]
+                zeile += [f"$r{k + 1}", formel, toleranz, punkte, 3]
+            else:
+                zeile += [" ", " ", 0, 0, None]
+        ws.append(zeile)
+    wb.save(dateiname)
+
+
+def php_serialisiert(wert):
+    """Schreibt einen Wert wie PHP serialize(), dicts als Arrays."""
+    if wert is None:
+        return "N;"
+    if isinstance(wert, bool):
+        return f"b:{int(wert)};"
+    if isinstance(wert, int):
+        return f"i:{wert};"
+    if isinstance(wert, float):
+        return f"d:{wert!r};"
+    if isinstance(wert, dict):
+        return f"a:{len(wert)}:{{" + "".join(php_serialisiert(k) + php_serialisiert(w) for k, w in wert.items()) + "}"
+    text = str(wert)
+    return f's:{len(text.encode("utf-8"))}:"{text}";'
+
+
+def schreibe_fragenpool_qti(fragen, dateiname, anz_dateien=1):
+    """Schreibt den Fragenpool wie der QTI-Export von ILIAS: ein ZIP-Archiv mit
+    der Datei <name>/<name>_qti.xml, jede frage ein <item> vom Typ
+    assFormulaQuestion, Variablen und Ergebnisse als PHP-serialisierte Arrays.
+    Mit anz_dateien > 1 werden die Fragen auf so viele Dateien
+    <name>/<name>_1_qti.xml ... im Archiv verteilt.
+    """
+    name = os.path.splitext(os.path.basename(dateiname))[0]
+    grenzen = [len(fragen) * teil // anz_dateien for teil in range(anz_dateien + 1)]
+    with zipfile.ZipFile(dateiname, "w", zipfile.ZIP_DEFLATED) as archiv:
+        for teil in range(anz_dateien):
+            mitglied = f"{name}/{name}_qti.xml" if anz_dateien == 1 else f"{name}/{name}_{teil + 1}_qti.xml"
+            with archiv.open(mitglied, "w") as datei:
+                datei.write(b'<?xml version="1.0" encoding="utf-8"?>\n<questestinterop>\n')
+                for nr in range(grenzen[teil], grenzen[teil + 1]):
+                    frage = fragen[nr]
+                    item = ET.Element("item", ident=f"il_0_qst_{nr + 1}", title=frage["titel"], maxattempts="0")
+                    metadaten = ET.SubElement(ET.SubElement(item, "itemmetadata"), "qtimetadata")
+                    felder = [("ILIAS_VERSION", "7.0"), ("QUESTIONTYPE", "assFormulaQuestion"),
+                              ("AUTHOR", "Erzeuge Testdaten")]
+                    for k, (untergrenze, obergrenze, stellen) in enumerate(frage["variablen"]):
+                        felder.append((f"$v{k + 1}", php_serialisiert(
+                            {"precision": stellen, "intprecision": "1", "rangemin": float(untergrenze),
+                             "rangemax": float(obergrenze), "unit": "", "unitvalue": ""})))
+                    for k, (formel, _, toleranz, punkte) in enumerate(frage["ergebnisse"]):
+                        felder.append((f"$r{k + 1}", php_serialisiert(
+                            {"precision": 3, "tolerance": str(toleranz), "rangemin": "", "rangemax": "",
+                             "points": str(punkte), "formula": formel, "rating": "", "unit": "", "unitvalue": "",
+                             "resultunits": {}})))
+                    for label, eintrag in felder:
+                        feld = ET.SubElement(metadaten, "qtimetadatafield")
+                        ET.SubElement(feld, "fieldlabel").text = label
+                        ET.SubElement(feld, "fieldentry").text = eintrag
+                    material = ET.SubElement(ET.SubElement(ET.SubElement(item, "presentation", label=frage["titel"]),
+                                                           "flow"), "material")
+                    ET.SubElement(material, "mattext", texttype="text/plain").text = "Synthetische Frage für Tests"
+                    datei.write(ET.tostring(item, encoding="utf-8") + b"\n")
+                datei.write(b"</questestinterop>\n")
+
+
+def erzeuge_versuch(frage, zufall, p_richtig=0.6, p_leer=0.05, p_bruch=0.05):
+    """Zieht Variablen für eine frage und erzeugt die Antworten eines
+    teilnehmers. Liefert (variablen, antworten), leere Antworten sind None.
+    """
+    variablen = [round(zufall.uniform(untergrenze, obergrenze), stellen)
+                 for untergrenze, obergrenze, stellen in frage["variablen"]]
+    referenz, antworten = [], []
+    for _, funktion, toleranz, _ in frage["ergebnisse"]:
+        try:
+            wert = funktion(variablen, referenz)
+        except (ValueError, ZeroDivisionError, IndexError):
+            wert = float("nan")
+        referenz.append(wert)
+        if zufall.random() < p_leer or math.isnan(wert):
+            antworten.append(None)
+            continue
+        wurf = zufall.random()
+        if wurf < p_richtig:
+            antwort = wert * (1 + zufall.uniform(-0.5, 0.5) * toleranz / 100)
+        elif wurf < (1 + p_richtig) / 2:
+            antwort = wert * (1 + zufall.choice([-1, 1]) * zufall.uniform(1.5, 3) * toleranz / 100)
+        else:
+            antwort = wert * zufall.uniform(-2, 3)
+        if zufall.random() < p_bruch:
+            antwort = f"{round(antwort * 3)}/3"
+        else:
+            antwort = round(antwort, 4)
+        antworten.append(antwort)
+    return variablen, antworten
+
+
+def erzeuge_teilnehmer(fragen, anz_teilnehmer, fragen_pro_test=14, seed=1, p_nicht_geoeffnet=0.03,
+                       anz_durchlaeufe=1):
+    """Erzeugt die teilnehmer mit je fragen_pro_test zufällig gezogenen Fragen,
+    bei anz_durchlaeufe > 1 mit 1 bis anz_durchlaeufe Testdurchläufen.
+    Liefert eine Liste von dicts mit name und durchlaeufe, jeder Durchlauf ist
+    eine Liste von Versuchen (titel, variablen, antworten), variablen None
+    wenn nicht geöffnet.
+    """
+    zufall = random.Random(seed + 1)
+    fragen_pro_test = min(fragen_pro_test, len(fragen))
+    teilnehmer = []
+    for nr in range(anz_teilnehmer):
+        durchlaeufe = []
+        for _ in range(zufall.randint(1, anz_durchlaeufe) if anz_durchlaeufe > 1 else 1):
+            versuche = []
+            for frage in zufall.sample(fragen, fragen_pro_test):
+                if zufall.random() < p_nicht_geoeffnet:
+                    versuche.append((frage["titel"], None, None))
+                else:
+                    versuche.append((frage["titel"], *erzeuge_versuch(frage, zufall)))
+            durchlaeufe.append(versuche)
+        teilnehmer.append({"name": f"Muster{nr + 1}, Max{nr + 1}", "durchlaeufe": durchlaeufe})
+    return teilnehmer
+
+
+def zeilen_teilnehmer(teilnehmer, name_marker="Ergebnisse von Testdurchlauf {durchlauf} für ",
+                      fragentitel_marker="Formelfrage"):
+    """Zeilen der Ergebnisdatei für einen teilnehmer (je zwei Spalten),
+    ein Block pro Testdurchlauf.
+    """
+    for durchlauf, versuche in enumerate(teilnehmer["durchlaeufe"], start=1):
+        yield (name_marker.format(durchlauf=durchlauf) + teilnehmer["name"], None)
+        yield (None, None)
+        for titel, variablen, antworten in versuche:
+            yield (fragentitel_marker, titel)
+            if variablen is not None:
+                for k, wert in enumerate(variablen, start=1):
+                    yield (f"$v{k}", wert)
+                for k, wert in enumerate(antworten, start=1):
+                    if wert is not None:
+                        yield (f"$r{k}", wert)
+            yield (None, None)
+
+
+def schreibe_testergebnisse(teilnehmer, dateiname, layout="ein_blatt"):
+    """Schreibt die Ergebnisdatei. layout="ein_blatt": alle teilnehmer im Blatt
+    "Auswertung für alle Benutzer", layout="pro_teilnehmer": ein Blatt
+    Übersicht und dahinter ein Blatt pro teilnehmer.
+    """
+    wb = Workbook(write_only=True)
+    if layout == "ein_blatt":
+        ws = wb.create_sheet("Auswertung für alle Benutzer")
+        for t in teilnehmer:
+            for zeile in zeilen_teilnehmer(t):
+                ws.append(zeile)
+    elif layout == "pro_teilnehmer":
+        uebersicht = wb.create_sheet("Übersicht")
+        uebersicht.append(("Name", "Anzahl Fragen"))
+        for t in teilnehmer:
+            uebersicht.append((t["name"], len(t["durchlaeufe"][0])))
+        for nr, t in enumerate(teilnehmer, start=1):
+            ws = wb.create_sheet(f"{nr} {t['name']}"[:31])
+            for zeile in zeilen_teilnehmer(t):
+                ws.append(zeile)
+    else:
+        raise ValueError(f"Unbekanntes layout: {layout}")
+    wb.save(dateiname)
+
+
+def erzeuge_testdaten(ergebnis_datei, fragen_datei, anz_teilnehmer, anz_fragen=60, fragen_pro_test=14,
+                      anz_var=4, anz_res=5, layout="ein_blatt", seed=1, anz_durchlaeufe=1, anz_qti_dateien=1):
+    """Erzeugt Fragenpool und Ergebnisdatei in einem Schritt."""
+    fragen = erzeuge_fragenpool(anz_fragen, anz_var, anz_res, seed)
+    if fragen_datei.lower().endswith(".zip"):
+        schreibe_fragenpool_qti(fragen, fragen_datei, anz_qti_dateien)
+    else:
+        schreibe_fragenpool(fragen, fragen_datei, anz_var, anz_res)
+    teilnehmer = erzeuge_teilnehmer(fragen, anz_teilnehmer, fragen_pro_test, seed, anz_durchlaeufe=anz_durchlaeufe)
+    schreibe_testergebnisse(teilnehmer, ergebnis_datei, layout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ergebnis-datei", default="ILIAS_Testergebnisse_synthetisch.xlsx")
+    parser.add_argument("--fragen-datei", default="ILIAS_Fragenpool_synthetisch.xlsx",
+                        help="Fragenpool, .xlsx oder .zip (QTI-Export von ILIAS)")
+    parser.add_argument("--qti-dateien", type=int, default=1,
+                        help="Fragen im .zip auf so viele QTI-Dateien verteilen")
+    parser.add_argument("--teilnehmer", type=int, default=100)
+    parser.add_argument("--fragen", type=int, default=60, help="Anzahl Fragen im Pool")
+    parser.add_argument("--fragen-pro-test", type=int, default=14)
+    parser.add_argument("--variablen", type=int, default=4, help="maximale Anzahl Variablen pro frage")
+    parser.add_argument("--ergebnisse", type=int, default=5,
+                        help="maximale Anzahl Ergebnisse pro frage (= anz_res im Bewertungsskript)")
+    parser.add_argument("--layout", choices=["ein_blatt", "pro_teilnehmer"], default="ein_blatt")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--durchlaeufe", type=int, default=1, help="maximale Anzahl Testdurchläufe pro teilnehmer")
+    args = parser.parse_args()
+    erzeuge_testdaten(args.ergebnis_datei, args.fragen_datei, args.teilnehmer, args.fragen, args.fragen_pro_test,
+                      args.variablen, args.ergebnisse, args.layout, args.seed, args.durchlaeufe,
+                      args.qti_dateien)
+    print("Geschrieben:", args.ergebnis_datei, "und", args.fragen_datei)
+
+
+if __name__ == "__main__":
+    main()
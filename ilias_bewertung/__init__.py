@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Bewertung von ILIAS-Formelfragen-Tests als Bibliothek.
+
+Alle Funktionen stehen im Modul ilias_bewertung.bewertung und sind auch direkt
+über das Paket erreichbar, z.B. ilias_bewertung.bewerte_versuche().
+NumPy, openpyxl und pandas werden erst beim ersten Zugriff auf eine Funktion
+geladen, "import ilias_bewertung" selbst ist also schnell.
+
+Kommandozeile: python -m ilias_bewertung --help
+"""
+
+import importlib
+
+
+def __getattr__(name):
+    """Lädt das Modul bewertung erst beim ersten Zugriff auf eine Funktion."""
+    if name.startswith("__"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    bewertung = importlib.import_module(".bewertung", __name__)
+    if name == "bewertung":
+        return bewertung
+    try:
+        return getattr(bewertung, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
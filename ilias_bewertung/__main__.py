@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Aufruf als python -m ilias_bewertung"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,2696 @@
+# -*- coding: utf-8 -*-
+"""
+Bibliothek zur Bewertung von ILIAS-Formelfragen-Tests.
+
+Enthält alle Schritte von "Bewerte ILIAS-Testergebnisse V1_5.py": Einlesen der
+Testergebnisse und des Fragenpools, Verknüpfen, Bewertung, Notenberechnung,
+Export, IRT und Stapel-Auswertung. Beschreibung der Dateiformate und HISTORY
+stehen im Startskript.
+
+Die Einstellungen sind Konstanten am Anfang dieses Moduls und werden mit
+konfiguriere() gesetzt. Beispiel für die Verwendung aus einem anderen Programm:
+
+    from ilias_bewertung import bewertung
+    bewertung.konfiguriere(max_pkt=40)
+    fragenpool = bewertung.lade_fragenpool("ILIAS_Fragenpool.xlsx", True, bewertung.anz_res)
+    versuche = bewertung.lade_testergebnisse("ILIAS_Testergebnisse.xlsx", bewertung.name_marker,
+                                             bewertung.fragentitel_marker, bewertung.anz_res)
+    bewertung.bewerte_versuche(versuche, fragenpool)
+    print(versuche["ges_pkt"], versuche["noten"])
+
+pandas wird erst in den Funktionen geladen, die es brauchen.
+"""
+
+# Einstellungen ############################################################
+# Defaults, das Startskript "Bewerte ILIAS-Testergebnisse V1_5.py" und die
+# Kommandozeile setzen sie mit konfiguriere().
+anz_res = None   # Maximale Anzahl von frage-Ergebnissen pro frage, None = aus Fragenpool und Ergebnisdatei ermitteln
+max_pkt = 58     # Maximale Anzahl von Punkten im Test
+schema_note = ["5,0", "4,0", "3,7", "3,3", "3,0", "2,7", "2,3", "2,0", "1,7", "1,3", "1,0"]
+# Mindestprozentzahl an Punkten für die korrespondierende Note
+schema_proz = [0, 50, 54, 58, 62, 66, 70, 74, 78, 82, 86]
+filename_export = "TestergebnisseGE2.xlsx"
+export_formate = ["xlsx"]  # zusätzlich möglich: "csv", "parquet"
+ergebnis_datei = 'ILIAS_TestergebnisseGE2.xlsx'
+fragen_datei = 'ILIAS_FragenpoolGE2.xlsx'  # EXCEL oder der QTI-Export des Pools aus ILIAS (.zip, .xml)
+irtf_name = "irt_frame_ge2.xlsx"
+irt_modell = "rasch"  # IRT-Schätzung: "rasch", "2pl" oder None = nur die Antwortmatrix schreiben
+irt_parameter_datei = "irt_parameter_ge2.xlsx"
+itemanalyse_datei = "Itemanalyse_GE2.xlsx"  # Kennzahlen pro frage, .xlsx oder .csv, None = nicht schreiben
+verdacht_datei = "Abschreibverdacht_GE2.xlsx"  # falsche Eingaben, die zur Musterlösung anderer passen, None = nicht suchen
+laufbericht_datei = "Laufbericht_GE2.json"  # Zeiten und Zähler des Laufs, .json oder .csv, None = nicht schreiben
+cache_verwenden = True   # False: EXCEL-Dateien immer neu einlesen, den Cache nicht benutzen
+cache_leeren = False     # True: Cache vor dem Einlesen löschen
+cache_verzeichnis = ".ilias_cache"
+anz_prozesse = 1  # Anzahl Prozesse für die Bewertung, 1 = seriell, None = alle Prozessorkerne
+bewertung_datei = "BewertungGE2.pickle"  # gespeicherte Bewertung für die Nachbewertung, None = immer komplett neu bewerten
+bestehensgrenzen = []  # z.B. [45, 48, 50]: zusätzlich die Notenverteilung für diese Bestehensgrenzen in % ausgeben
+stapel_manifest = None  # Manifest (JSON) für die Auswertung mehrerer Klausuren in einem Lauf, None = nur die Klausur oben
+durchlauf_wertung = "bester"  # bei mehreren Testdurchläufen zählt der "bester", "letzter" oder "erster"
+folgefehler_bewerten = False  # True: abhängige Unteraufgaben auch mit den eigenen Ergebnissen bewerten, die bessere Bewertung zählt
+pool_pruefen = False  # True: nur den Fragenpool vor der Klausur prüfen (poolpruefung), ohne Ergebnisdatei
+poolpruefung_datei = "Poolpruefung_GE2.xlsx"  # Bericht der Pool-Prüfung, .xlsx oder .csv, None = nur auf der Console
+pool_stichproben = 2000  # Anzahl zufälliger Variablensätze pro frage bei der Pool-Prüfung
+titel_normiert_suchen = False  # True: Fragen auch finden, wenn sich der titel nur in Leerzeichen oder Groß-/Kleinschreibung unterscheidet (wird gemeldet)
+############################################################################
+
+import ast
+import contextlib
+import csv
+import functools
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import re
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from openpyxl import Workbook, load_workbook
+
+# weitere Konstanten
+name_marker = "Ergebnisse von Testdurchlauf {durchlauf} für "  # {durchlauf} steht für die Nummer des Durchlaufs
+fragentitel_marker = "Formelfrage"
+FRAGEN_AUS_ILIAS_EXPORT = True
+
+# Namen aller Einstellungen, die mit konfiguriere() gesetzt werden können
+EINSTELLUNGEN = ("anz_res", "max_pkt", "schema_note", "schema_proz", "filename_export", "export_formate",
+                 "ergebnis_datei", "fragen_datei", "irtf_name", "irt_modell", "irt_parameter_datei",
+                 "itemanalyse_datei", "verdacht_datei", "laufbericht_datei", "cache_verwenden", "cache_leeren", "cache_verzeichnis", "anz_prozesse",
+                 "bewertung_datei", "bestehensgrenzen", "stapel_manifest", "durchlauf_wertung", "folgefehler_bewerten",
+                 "pool_pruefen", "poolpruefung_datei", "pool_stichproben", "titel_normiert_suchen",
+                 "name_marker", "fragentitel_marker", "FRAGEN_AUS_ILIAS_EXPORT")
+
+
+def aktuelle_einstellungen():
+    """Liefert die aktuellen Einstellungen als dict."""
+    return {name: globals()[name] for name in EINSTELLUNGEN}
+
+
+def konfiguriere(**einstellungen):
+    """Setzt Einstellungen des Moduls, z.B. konfiguriere(max_pkt=40, anz_res=3).
+    Unbekannte Namen führen zu einem ValueError.
+    """
+    unbekannt = set(einstellungen) - set(EINSTELLUNGEN)
+    if unbekannt:
+        raise ValueError(f"Unbekannte Einstellungen: {', '.join(sorted(unbekannt))}")
+    globals().update(einstellungen)
+
+
+# Laufbericht ##############################################################
+# Zeiten und Zähler der einzelnen Schritte eines Laufs. Funktionen mit
+# @gemessen("Schritt") bzw. Blöcke mit "with messe(...)" addieren ihre Laufzeit,
+# Zähler werden mit zaehle() erhöht. In den Worker-Prozessen der parallelen
+# Bewertung wird zwar gemessen, die Werte kommen aber nicht im Hauptprozess an.
+laufbericht = {"zeiten": {}, "aufrufe": {}, "zaehler": {}}
+
+
+def leere_laufbericht():
+    """Setzt alle Zeiten und Zähler des Laufberichts zurück."""
+    for eintrag in laufbericht.values():
+        eintrag.clear()
+
+
+def addiere_zeit(schritt, dauer):
+    """Addiert die Dauer eines Aufrufs von schritt im Laufbericht."""
+    laufbericht["zeiten"][schritt] = laufbericht["zeiten"].get(schritt, 0.0) + dauer
+    laufbericht["aufrufe"][schritt] = laufbericht["aufrufe"].get(schritt, 0) + 1
+
+
+@contextlib.contextmanager
+def messe(schritt):
+    """Misst die Laufzeit des with-Blocks als schritt."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        addiere_zeit(schritt, time.perf_counter() - start)
+
+
+def gemessen(schritt):
+    """Decorator: Misst jeden Aufruf der Funktion als schritt."""
+    def decorator(funktion):
+        @functools.wraps(funktion)
+        def wrapper(*args, **kwargs):
+            with messe(schritt):
+                return funktion(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def zaehle(name, anzahl=1):
+    """Erhöht den Zähler name im Laufbericht."""
+    laufbericht["zaehler"][name] = laufbericht["zaehler"].get(name, 0) + int(anzahl)
+
+
+def gemessene_zeilen(zeilen, schritt, zaehler):
+    """Reicht die Zeilen eines Generators durch. Die Zeit für das Holen der
+    Zeilen wird als schritt gemessen, die Anzahl unter zaehler gezählt.
+    So lässt sich das Lesen der EXCEL-Datei vom Parsen trennen, obwohl beides
+    zeilenweise ineinander läuft.
+    """
+    dauer, anz = 0.0, 0
+    iterator = iter(zeilen)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                zeile = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                dauer += time.perf_counter() - start
+            anz += 1
+            yield zeile
+    finally:
+        addiere_zeit(schritt, dauer)
+        zaehle(zaehler, anz)
+
+
+def laufbericht_daten():
+    """Laufbericht als dict mit den Zeiten in Sekunden, der Anzahl Aufrufe
+    pro Schritt und allen Zählern, einschließlich des Formel-Caches.
+    """
+    zaehler = dict(laufbericht["zaehler"])
+    zaehler["Formel-Cache Treffer"] = formel_cache_zaehler["treffer"]
+    zaehler["Formel-Cache Fehltreffer"] = formel_cache_zaehler["fehltreffer"]
+    return {"zeiten": {schritt: round(zeit, 6) for schritt, zeit in laufbericht["zeiten"].items()},
+            "aufrufe": dict(laufbericht["aufrufe"]), "zaehler": zaehler}
+
+
+def drucke_laufbericht():
+    """Gibt Zeiten und Zähler des Laufs als Tabelle auf der Console aus.
+    Der Anteil bezieht sich auf den Schritt "Gesamt", falls gemessen.
+    Geschachtelte Schritte (z.B. Formelberechnung in Bewertung) sind in den
+    Zeiten der äußeren Schritte enthalten.
+    """
+    daten = laufbericht_daten()
+    gesamt = daten["zeiten"].get("Gesamt")
+    breite = max([len(s) for s in daten["zeiten"]] + [len(z) for z in daten["zaehler"]] + [7])
+    print(f"{'Schritt':<{breite}} {'Zeit [s]':>9} {'Anteil':>7} {'Aufrufe':>8}")
+    for schritt, zeit in daten["zeiten"].items():
+        anteil = f"{100 * zeit / gesamt:6.1f}%" if gesamt else ""
+        print(f"{schritt:<{breite}} {zeit:9.3f} {anteil:>7} {daten['aufrufe'][schritt]:8d}")
+    print(f"{'Zähler':<{breite}} {'Anzahl':>9}")
+    for name, wert in daten["zaehler"].items():
+        print(f"{name:<{breite}} {wert:9d}")
+
+
+def schreibe_laufbericht(dateiname):
+    """Schreibt den Laufbericht als JSON oder, bei der Endung .csv, als
+    CSV-Tabelle mit den Spalten Art;Name;Wert;Aufrufe.
+    """
+    daten = laufbericht_daten()
+    if dateiname.lower().endswith(".csv"):
+        with open(dateiname, "w", newline="", encoding="utf-8-sig") as datei:
+            writer = csv.writer(datei, delimiter=";")
+            writer.writerow(["Art", "Name", "Wert", "Aufrufe"])
+            for schritt, zeit in daten["zeiten"].items():
+                writer.writerow(["Zeit [s]", schritt, zeit, daten["aufrufe"][schritt]])
+            for name, wert in daten["zaehler"].items():
+                writer.writerow(["Zähler", name, wert, ""])
+    else:
+        with open(dateiname, "w", encoding="utf-8") as datei:
+            json.dump(daten, datei, ensure_ascii=False, indent=2)
+
+
+
+def notenberechnung (pkt, max_pkt, schema_proz, schema_note):
+    """ E.Waffenschmidt, 4.9.2020
+    Berechnet für eine erzielte Punktzahl einer Prüfung 
+    anhand eines Notenschemas die Note
+    """
+    return notenberechnung_vektor([pkt], max_pkt, schema_proz, schema_note)[0]
+
+def notenindex (ges_pkt, max_pkt, schema_proz):
+    """Index der Note im Notenschema für ein ganzes Array von Punktzahlen,
+    -1 wenn keine Mindestprozentzahl erreicht ist.
+    Gesucht wird mit searchsorted, schema_proz muss also aufsteigend sortiert sein.
+    """
+    schema = np.asarray(schema_proz, dtype=float)
+    if np.any(np.diff(schema) < 0):
+        raise ValueError(f"schema_proz muss aufsteigend sortiert sein: {schema_proz}")
+    proz = np.asarray(ges_pkt, dtype=float) / max_pkt * 100
+    return np.searchsorted(schema, proz, side="right") - 1
+
+def notenberechnung_vektor (ges_pkt, max_pkt, schema_proz, schema_note):
+    """Berechnet die noten zu allen Punktzahlen in ges_pkt auf einmal.
+    Liefert eine Liste, "n.v." wenn keine Mindestprozentzahl erreicht ist.
+    """
+    noten = np.append(np.array(schema_note, dtype=object), "n.v.")  # Index -1 -> "n.v."
+    return noten[notenindex(ges_pkt, max_pkt, schema_proz)].tolist()
+
+def verschiebe_bestehensgrenze (grenze, schema_proz=None):
+    """Verschiebt alle Mindestprozentzahlen ab der 4,0 (zweiter Eintrag im
+    Notenschema) so, dass die 4,0 bei grenze liegt. Die Abstände zwischen den
+    noten bleiben erhalten. Default für schema_proz ist die Einstellung schema_proz.
+    """
+    if schema_proz is None:
+        schema_proz = globals()["schema_proz"]
+    verschiebung = grenze - schema_proz[1]
+    return [schema_proz[0]] + [p + verschiebung for p in schema_proz[1:]]
+
+def notenverteilung_varianten (ges_pkt, varianten, schema_note=None):
+    """Was-wäre-wenn-Auswertung: Notenverteilung für viele Varianten des
+    Notenschemas auf einmal.
+    varianten: Liste von dicts mit "max_pkt" und "schema_proz", optional "name".
+    Die Punktzahlen werden einmal sortiert, pro Variante reicht dann ein
+    searchsorted über die Mindestprozentzahlen.
+    Liefert ein DataFrame mit einer zeile pro Variante und der Anzahl
+    teilnehmer pro Note.
+    """
+    import pandas as pd
+
+    if schema_note is None:
+        schema_note = globals()["schema_note"]
+    pkt_sortiert = np.sort(np.asarray(ges_pkt, dtype=float))
+    anz = len(pkt_sortiert)
+    zeilen = []
+    for nr, variante in enumerate(varianten):
+        schema = np.asarray(variante["schema_proz"], dtype=float)
+        if np.any(np.diff(schema) < 0):
+            raise ValueError(f"schema_proz muss aufsteigend sortiert sein: {variante['schema_proz']}")
+        proz = pkt_sortiert / variante["max_pkt"] * 100
+        # Anzahl teilnehmer mit mindestens der jeweiligen Mindestprozentzahl
+        anz_ab = anz - np.searchsorted(proz, schema, side="left")
+        anz_note = anz_ab - np.append(anz_ab[1:], 0)
+        zeile = {"Variante": variante.get("name", nr + 1), "max_pkt": variante["max_pkt"],
+                 "schema_proz": " ".join(f"{p:g}" for p in schema), "n.v.": int(anz - anz_ab[0]) if len(schema) else anz}
+        zeile.update({note: int(n) for note, n in zip(schema_note, anz_note)})
+        zeile["Bestanden"] = int(anz_ab[1]) if len(schema) > 1 else 0
+        zeile["Bestanden [%]"] = round(100 * zeile["Bestanden"] / anz, 1) if anz else None
+        zeilen.append(zeile)
+    return pd.DataFrame(zeilen)
+
+#def Get_Frage_ID (titel):
+#    """ E. Waffenschmidt, 3.9.2020
+#    Extrahiert die Fragen-ID (Die "Nummer" der frage) aus dem gesamten titel.
+#    Konkret sind das alle Zeichen bis zum ersten Leerzeichen.
+#    """
+#    return titel[0:titel.find(" ")] #Übernimmt den Text in titel bis zum ersten Leerzeichen
+
+def normiere_titel (titel):
+    """Normierte Form eines Fragentitels für die Suche im Fragenpool:
+    Leerzeichen am Anfang und Ende entfernt, mehrfache Leerzeichen zusammengefasst
+    und Groß-/Kleinschreibung ignoriert.
+    """
+    return " ".join(str(titel).split()).casefold()
+
+@gemessen("Fragenpool-Index")
+def erstelle_fragenpool_index (titels_pool, gleichungen_pool, toleranzen_pool, punkte_pool, anz_res=None,
+                               bereiche_pool=None):
+    """Baut einmalig den Index über den Fragenpool auf.
+    gleichungen_pool, toleranzen_pool und punkte_pool enthalten pro Unteraufgabe
+    x eine Spalte des Fragenpools. Fehlende Spalten werden als leere
+    Unteraufgabe behandelt. anz_res ist die Anzahl der Unteraufgaben,
+    bei None bis zur letzten Unteraufgabe, die in irgendeiner frage eine Formel hat.
+    bereiche_pool enthält pro variable x die Spalten (Minimum, Maximum,
+    Nachkommastellen), die Nachkommastellen dürfen None sein.
+    Ergebnis ist ein dict mit den Einträgen
+      titel:      Liste der Fragentitel (Index = zeile im Pool)
+      index:      titel -> zeile
+      normiert:   normierter titel -> zeile
+      formeln, toleranzen, punkte: pro zeile ein Tupel mit den Werten der Unteraufgaben
+      bereiche:   pro zeile ein Tupel mit (Minimum, Maximum, Nachkommastellen)
+                  pro variable, NaN wo nichts angegeben ist (für pruefe_fragenpool)
+      doppelt:    titel -> Liste der Zeilen für mehrfach vorkommende Titel
+      mehrdeutig: normierter titel -> Zeilen verschiedener Titel, die normiert
+                  gleich sind (fehlen in normiert)
+    Kommt ein titel mehrfach vor, wird, wie bisher bei finde_fragenindex,
+    die letzte zeile verwendet (Meldung mit melde_doppelte_titel).
+    """
+    titel = list(titels_pool)
+    anz = len(titel)
+    if anz_res is None:
+        benutzt = [x for x, spalte in gleichungen_pool.items() if not all(ist_leere_formel(g) for g in spalte)]
+        anz_res = max(benutzt, default=-1) + 1
+
+    def spalten (pool):
+        werte = [list(pool[x]) if x in pool else [" "] * anz for x in range(anz_res)]
+        return list(zip(*werte)) if werte else [()] * anz
+
+    fragenpool = {"titel": titel, "index": {}, "normiert": {},
+                  "formeln": spalten(gleichungen_pool),
+                  "toleranzen": spalten(toleranzen_pool),
+                  "punkte": spalten(punkte_pool)}
+    bereiche_pool = bereiche_pool or {}
+    bereiche = []
+    for x in range(max(bereiche_pool, default=-1) + 1):
+        minimum, maximum, stellen = bereiche_pool.get(x, ([None] * anz, [None] * anz, None))
+        if stellen is None:
+            stellen = [None] * anz
+        bereiche.append([(als_zahl(a), als_zahl(b), als_zahl(c)) for a, b, c in zip(minimum, maximum, stellen)])
+    fragenpool["bereiche"] = list(zip(*bereiche)) if bereiche else [()] * anz
+    zeilen = {}
+    normiert = {}  # normierter titel -> {titel: letzte zeile}
+    for zeile, t in enumerate(titel):
+        zeilen.setdefault(t, []).append(zeile)
+        fragenpool["index"][t] = zeile
+        normiert.setdefault(normiere_titel(t), {})[t] = zeile
+    fragenpool["doppelt"] = {t: z for t, z in zeilen.items() if len(z) > 1}
+    # Verschiedene Titel mit demselben normierten titel: dann ist die Suche
+    # mit normiertem titel mehrdeutig und findet keine der Fragen
+    fragenpool["mehrdeutig"] = {n: sorted(z.values()) for n, z in normiert.items() if len(z) > 1}
+    fragenpool["normiert"] = {n: next(iter(z.values())) for n, z in normiert.items() if len(z) == 1}
+    return fragenpool
+
+def melde_doppelte_titel (fragenpool):
+    """Gibt die mehrfach im Fragenpool vorkommenden Titel auf der Console aus,
+    auch verschiedene Titel, die sich nur in Leerzeichen oder Groß-/Kleinschreibung
+    unterscheiden.
+    """
+    for t, z in fragenpool["doppelt"].items():
+        print("!!! frage", t, "kommt mehrfach im Fragenpool vor (Zeilen",
+              ", ".join(str(i + 2) for i in z), "). Verwendet wird zeile", z[-1] + 2)
+    for z in fragenpool["mehrdeutig"].values():
+        print("!!! Fragen", ", ".join(repr(fragenpool["titel"][i]) for i in z), "(Zeilen",
+              ", ".join(str(i + 2) for i in z), ") unterscheiden sich nur in Leerzeichen oder "
+              "Groß-/Kleinschreibung. Gefunden werden sie nur mit genau diesem titel")
+
+def finde_fragenindex (fragen_id, fragenpool):
+    """ E. Waffenschmidt, 3.9.2020
+    Ermittelt den Index einer frage in einem Fragebpool anhand der Fragen-ID
+    Wenn die gesuchet ID nicht im Pool ist, wird "None" zurück geliefert.
+    Der Fragenpool ist der mit erstelle_fragenpool_index() aufgebaute Index,
+    die Suche erfolgt also über ein dict statt über die ganze Liste.
+    Ist titel_normiert_suchen gesetzt, werden auch Titel gefunden, die sich
+    nur in Leerzeichen oder Groß-/Kleinschreibung unterscheiden, außer wenn
+    das auf mehrere Fragen im Pool passt (fragenpool["mehrdeutig"]).
+    """
+    index = fragenpool["index"].get(fragen_id)
+    if index is None and titel_normiert_suchen:
+        index = fragenpool["normiert"].get(normiere_titel(fragen_id))
+    return index
+
+# Formel-Compiler ##########################################################
+# Jede Formel aus dem Fragenpool wird nur einmal vom ILIAS-Format in einen
+# Python-Ausdruck übersetzt, geprüft und kompiliert. Das Ergebnis wird im
+# Cache "formel_cache" unter dem Formeltext abgelegt.
+
+# ILIAS-Funktionsname -> Python-Funktionsname
+ilias_funktionen = {"sin": "sin", "sinh": "sinh", "arcsin": "asin", "asin": "asin",
+                    "arcsinh": "asinh", "asinh": "asinh",
+                    "cos": "cos", "cosh": "cosh", "arccos": "acos", "acos": "acos",
+                    "arccosh": "acosh", "acosh": "acosh",
+                    "tan": "tan", "tanh": "tanh", "arctan": "atan", "atan": "atan",
+                    "arctanh": "atanh", "atanh": "atanh",
+                    "sqrt": "sqrt", "abs": "abs", "ln": "log", "log": "log10"}
+ilias_konstanten = {"pi": "pi", "e": "e"}
+
+# Namensraum für die Berechnung einzelner Werte mit dem math-Modul
+math_namensraum = {name: getattr(math, name) for name in set(ilias_funktionen.values()) if name != "abs"}
+math_namensraum.update({"abs": abs, "pi": math.pi, "e": math.e, "__builtins__": {}})
+
+# Namensraum für die vektorisierte Berechnung über viele Teilnehmer mit NumPy
+numpy_namensraum = {"sin": np.sin, "sinh": np.sinh, "asin": np.arcsin, "asinh": np.arcsinh,
+                    "cos": np.cos, "cosh": np.cosh, "acos": np.arccos, "acosh": np.arccosh,
+                    "tan": np.tan, "tanh": np.tanh, "atan": np.arctan, "atanh": np.arctanh,
+                    "sqrt": np.sqrt, "abs": np.abs, "log": np.log, "log10": np.log10,
+                    "pi": np.pi, "e": np.e, "__builtins__": {}}
+
+# Token im ILIAS-Format: $v1, $r2 ... oder ein Bezeichner (Funktion, Konstante)
+ilias_token = re.compile(r"\$([vr])(\d+)|([a-z_][a-z_0-9]*)")
+erlaubte_operatoren = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+formel_cache = {}  # Formeltext -> kompilierte Formel
+formel_cache_zaehler = {"treffer": 0, "fehltreffer": 0}
+
+
+def ist_leere_formel(gleichung_ilias):
+    """Im Fragenpool sind nicht vorhandene Unteraufgaben entweder mit " "
+    oder als leere Zelle (NaN) eingetragen.
+    """
+    if gleichung_ilias is None:
+        return True
+    if isinstance(gleichung_ilias, float):
+        return math.isnan(gleichung_ilias)
+    return str(gleichung_ilias).strip() == ""
+
+
+def pruefe_formel_ast(baum):
+    """Prüft den Syntaxbaum einer übersetzten Formel.
+    Erlaubt sind nur Zahlen, die Operatoren + - * / **, die Funktionen und
+    Konstanten aus der Ersetzungstabelle sowie Zugriffe v[i] und r[i]
+    mit festem Index. Liefert eine Fehlermeldung oder None.
+    """
+    for knoten in ast.walk(baum):
+        if isinstance(knoten, (ast.Expression, ast.Load)) or isinstance(knoten, erlaubte_operatoren):
+            continue
+        if isinstance(knoten, (ast.BinOp, ast.UnaryOp)):
+            continue
+        if isinstance(knoten, ast.Constant):
+            if type(knoten.value) not in (int, float):
+                return f"unzulässige Konstante {knoten.value!r}"
+            continue
+        if isinstance(knoten, ast.Name):
+            if knoten.id not in math_namensraum and knoten.id not in ("v", "r"):
+                return f"unbekannter Name '{knoten.id}'"
+            continue
+        if isinstance(knoten, ast.Call):
+            if (not isinstance(knoten.func, ast.Name) or knoten.func.id not in ilias_funktionen.values()
+                    or knoten.keywords or len(knoten.args) != 1):
+                return "unzulässiger Funktionsaufruf"
+            continue
+        if isinstance(knoten, ast.Subscript):
+            if (not isinstance(knoten.value, ast.Name) or knoten.value.id not in ("v", "r")
+                    or not isinstance(knoten.slice, ast.Constant) or type(knoten.slice.value) is not int):
+                return "unzulässiger Index"
+            continue
+        return f"unzulässiger Ausdruck {type(knoten).__name__}"
+    return None
+
+
+def uebersetze_ilias_formel(gleichung_ilias):
+    """Übersetzt eine Formel vom ILIAS-Format in einen Python-Ausdruck.
+    $v1 wird zu v[0], $r1 zu r[0], ^ zu ** und die Funktionsnamen werden
+    nach der Tabelle "ilias_funktionen" umbenannt.
+    Da die Ersetzung tokenweise erfolgt, wird z.B. "ln" zu "log" und nicht,
+    wie bei der früheren Kette von replace()-Aufrufen, weiter zu "log10".
+    Liefert den Python-Ausdruck und die Mengen der verwendeten Variablen-
+    und Ergebnis-Indizes.
+    """
+    variablen = set()
+    ergebnisse = set()
+
+    def ersetze(treffer):
+        art, nummer, bezeichner = treffer.groups()
+        if art is not None:
+            index = int(nummer) - 1
+            (variablen if art == "v" else ergebnisse).add(index)
+            return f"{art}[{index}]"
+        if bezeichner in ilias_funktionen:
+            return ilias_funktionen[bezeichner]
+        return ilias_konstanten.get(bezeichner, bezeichner)
+
+    gleichung_py = ilias_token.sub(ersetze, str(gleichung_ilias).lower())
+    gleichung_py = gleichung_py.replace("^", "**")
+    return gleichung_py, variablen, ergebnisse
+
+
+def kompiliere_ilias_formel(gleichung_ilias):
+    """Liefert die kompilierte Form einer ILIAS-Formel aus dem Cache.
+    Beim ersten Aufruf für einen Formeltext wird die Formel übersetzt,
+    geprüft und kompiliert. Leere Formeln liefern None.
+    Die kompilierte Formel ist ein dict mit den Einträgen
+      formel_ilias, formel_py, code, fehler, variablen, ergebnisse
+    Bei einer fehlerhaften Formel ist code None und fehler enthält die Meldung.
+    """
+    if ist_leere_formel(gleichung_ilias):
+        return None
+    formel = formel_cache.get(gleichung_ilias)
+    if formel is not None:
+        formel_cache_zaehler["treffer"] += 1
+        return formel
+    formel_cache_zaehler["fehltreffer"] += 1
+    formel = _kompiliere_neu(gleichung_ilias)
+    formel_cache[gleichung_ilias] = formel
+    return formel
+
+
+@gemessen("Formeln kompilieren")
+def _kompiliere_neu(gleichung_ilias):
+    """Übersetzt, prüft und kompiliert eine Formel (ohne Cache)."""
+    gleichung_py, variablen, ergebnisse = uebersetze_ilias_formel(gleichung_ilias)
+    formel = {"formel_ilias": gleichung_ilias, "formel_py": gleichung_py, "code": None,
+              "fehler": None, "variablen": variablen, "ergebnisse": ergebnisse}
+    try:
+        baum = ast.parse(gleichung_py, mode="eval")
+    except SyntaxError as fehler:
+        formel["fehler"] = f"Syntaxfehler: {fehler.msg}"
+    else:
+        formel["fehler"] = pruefe_formel_ast(baum)
+        if formel["fehler"] is None:
+            formel["code"] = compile(baum, f"<ILIAS {gleichung_ilias}>", "eval")
+    return formel
+
+
+def berechne_formel(formel, v, r, namensraum=math_namensraum):
+    """Berechnet eine kompilierte Formel mit den Variablen v und Ergebnissen r.
+    Fehler bei der Berechnung (z.B. Division durch Null, fehlende Variablen)
+    werden abgefangen, das Ergebnis ist dann None.
+    """
+    if formel is None or formel["code"] is None:
+        return None
+    try:
+        return eval(formel["code"], namensraum, {"v": v, "r": r})
+    except Exception:
+        return None
+
+
+def formel_fehlermeldung(formel, v, r):
+    """Gibt die Fehlermeldung für eine Formel aus, die nicht berechnet werden konnte."""
+    print("Gleichung ", formel["formel_ilias"], " enthält einen Fehler:")
+    print("Python-Format:", formel["formel_py"])
+    if formel["fehler"] is not None:
+        print("Ursache:", formel["fehler"])
+    print("Variablen:", v)
+    print("Ergebnisse:", r)
+
+
+def eval_ilias_single(gleichung_ilias, v, r):
+    """E. Waffenschmidt, 3.9.2020
+       Evaluiert (d.h. nutzt die Gleichung zur Berechnung) 
+       eine Formel im ILIAS-Format 
+       Die Variablenwerte werden in Form einer Liste in der Variablen v übergeben.
+       Die Anzahl der Variablen in der Liste ist beliebig 
+       und ergibt sich aus der Länge der List-Variablen v.   
+       ACHTUNG: Die erste variable $v1 wird zu v[0].
+       Die Formel wird über kompiliere_ilias_formel() nur einmal übersetzt und
+       kompiliert. Vor dem Kompilieren wird der Syntaxbaum geprüft, so dass nur
+       Rechenausdrücke, aber keine beliebigen Python-Befehle ausgeführt werden.
+       Fehler bei der Berechnung werden abgefangen, damit das Programm nicht abbricht. 
+       Bei einem Fehler in der Formel wird eine Meldung auf der Console 
+       ausgegeben und das Ergebnis ist None.
+       Zum berechnen wird die Gleichung vom ILIAS-Format an das Format für Python angepasst.
+       Dabei werden alle Großbuchstaben in Kleinbuchstaben umgewandelt,
+       weil die Fuktionen sonst nicht richtig sind.
+       Ersetzungstabelle:
+       ILIAS        Python
+       $v1          v[1] etc.
+       ^            **
+                    pi
+                    e
+                    sin
+                    sinh
+       arcsin       asin
+       arcsinh      asinh
+                    cos
+                    cosh
+       arccos       acos
+       arccosh      acosh
+                    tan
+                    tanh
+       arctan       atan
+       arctanh      atanh
+                    sqrt
+                    abs
+       ln           log
+       log          log10
+
+    ILIAS kennt folgende Begriffe bei der Definition von Formeln:
+    "Erlaubt ist die Verwendung von bereits definierten Variablen ($v1 bis $vn), 
+    von bereits definierten Ergebnissen (z.B. $r1), 
+    das beliebige Klammern von Ausdrücken, 
+    die mathematischen Operatoren + (Addition), - (Subtraktion),
+    * (Multiplikation), / (Division), ^ (Potenzieren), 
+    die Verwendung der Konstanten 'pi' für die Zahl Pi und 'e‘ für die Eulersche Zahl, 
+    sowie die mathematischen Funktionen 
+    'sin', 'sinh', 'arcsin', 'asin', 'arcsinh', 'asinh', 'cos', 'cosh', 
+    'arccos', 'acos', 'arccosh', 'acosh', 'tan', 'tanh', 'arctan', 'atan', 
+    'arctanh', 'atanh', 'sqrt', 'abs', 'ln', 'log'."
+    """
+    formel = kompiliere_ilias_formel(gleichung_ilias)
+    if formel is None:
+        return None
+    result = berechne_formel(formel, v, r)
+    if result is None:
+        formel_fehlermeldung(formel, v, r)
+    return result
+
+
+reihenfolge_cache = {}  # Formeln einer frage -> (Berechnungsreihenfolge, Meldungen)
+gemeldete_fragen = set()  # Fragen, deren Formelprobleme schon gemeldet wurden
+formelprobleme_melden = True  # False in den Worker-Prozessen, dort meldet der Hauptprozess
+
+
+def ordne_unteraufgaben(gleichungen, titel=""):
+    """Ermittelt aus den $r-Bezügen der Formeln einer frage, in welcher
+    Reihenfolge die Unteraufgaben berechnet werden müssen (topologische Sortierung).
+    Unteraufgaben mit fehlerhafter Formel, mit Bezug auf ein nicht definiertes
+    Ergebnis oder mit Zirkelbezug werden nicht berechnet, ebenso alle
+    Unteraufgaben, die von diesen abhängen.
+    Das Ergebnis wird für gleiche Formeln nur einmal ermittelt und im
+    reihenfolge_cache abgelegt. Probleme werden einmal pro frage auf der
+    Console gemeldet.
+    Liefert die Liste der Indizes der berechenbaren Unteraufgaben in
+    Berechnungsreihenfolge.
+    """
+    schluessel = tuple("" if ist_leere_formel(g) else str(g) for g in gleichungen)
+    if schluessel not in reihenfolge_cache:
+        reihenfolge_cache[schluessel] = _ermittle_reihenfolge(gleichungen)
+    reihenfolge, meldungen = reihenfolge_cache[schluessel]
+    if meldungen and formelprobleme_melden and (titel, schluessel) not in gemeldete_fragen:
+        gemeldete_fragen.add((titel, schluessel))
+        print("!!! Probleme in den Formeln der frage", titel)
+        for meldung in meldungen:
+            print("   ", meldung)
+    return reihenfolge
+
+
+def _ermittle_reihenfolge(gleichungen):
+    """Topologische Sortierung der Unteraufgaben für ordne_unteraufgaben().
+    Liefert die Berechnungsreihenfolge und die Liste der Meldungen.
+    """
+    formeln = [kompiliere_ilias_formel(gleichung_ilias) for gleichung_ilias in gleichungen]
+    abhaengig = {id: formel["ergebnisse"] for id, formel in enumerate(formeln) if formel is not None}
+    meldungen = []
+    gescheitert = set()
+    for id in sorted(abhaengig):
+        if formeln[id]["fehler"] is not None:
+            meldungen.append(f"Unteraufgabe {id + 1}: Formel {formeln[id]['formel_ilias']} "
+                             f"enthält einen Fehler ({formeln[id]['fehler']})")
+            gescheitert.add(id)
+        for j in sorted(abhaengig[id] - set(abhaengig)):
+            meldungen.append(f"Unteraufgabe {id + 1} verwendet $r{j + 1}, das nicht definiert ist")
+            gescheitert.add(id)
+
+    reihenfolge = []
+    offen = set(abhaengig) - gescheitert
+    erledigt = set()
+    while offen:
+        bereit = sorted(id for id in offen if abhaengig[id] <= erledigt)
+        folgefehler = sorted(id for id in offen if abhaengig[id] & gescheitert)
+        if not bereit and not folgefehler:
+            break
+        for id in folgefehler:
+            meldungen.append(f"Unteraufgabe {id + 1} kann nicht berechnet werden, weil "
+                             f"$r{min(abhaengig[id] & gescheitert) + 1} nicht berechenbar ist")
+            gescheitert.add(id)
+        for id in bereit:
+            if id not in gescheitert:
+                reihenfolge.append(id)
+                erledigt.add(id)
+        offen -= erledigt | gescheitert
+    if offen:
+        meldungen.append("Zirkelbezug zwischen den Unteraufgaben "
+                         + ", ".join(str(id + 1) for id in sorted(offen)))
+    return reihenfolge, meldungen
+
+
+def eval_ilias_batch(gleichungen, variablen, res):
+    """Berechnet alle Unteraufgaben einer frage für einen Teilnehmer.
+    Unteraufgaben, die Ergebnisse anderer Unteraufgaben verwenden, werden
+    in der von ordne_unteraufgaben() ermittelten Reihenfolge berechnet,
+    so dass ein einziger Durchlauf genügt.
+    Die Gleichungen werden nur beim ersten Auftreten übersetzt und kompiliert,
+    danach kommen sie aus dem formel_cache.
+    """
+    formeln = [kompiliere_ilias_formel(gleichung_ilias) for gleichung_ilias in gleichungen]
+    for id in ordne_unteraufgaben(gleichungen):
+        if not res[id] is None:
+            continue
+        result = berechne_formel(formeln[id], variablen, res)
+        if result is None:  # Wenn ein Fehler auftritt, Fehlermeldung
+            formel_fehlermeldung(formeln[id], variablen, res)
+        res[id] = result
+    return res
+
+
+def berechne_formel_vektor(formel, v, r, anz):
+    """Berechnet eine kompilierte Formel gleichzeitig für viele Teilnehmer.
+    v ist ein Array der Form (Anzahl Variablen, anz), r eines der Form
+    (Anzahl Ergebnisse, anz). Damit liefert v[0] die Werte von $v1 aller
+    Teilnehmer und die Formel kann unverändert mit den NumPy-Funktionen
+    berechnet werden.
+    Ergebnis ist ein Array der Länge anz. Wo die Berechnung nicht möglich
+    war (fehlende Variable, Division durch Null, log einer negativen Zahl ...)
+    steht NaN.
+    """
+    if formel is None or formel["code"] is None:
+        return np.full(anz, np.nan)
+    try:
+        with np.errstate(all="ignore"):
+            ergebnis = eval(formel["code"], numpy_namensraum, {"v": v, "r": r})
+            ergebnis = np.broadcast_to(np.asarray(ergebnis, dtype=float), (anz,)).copy()
+    except Exception:
+        return np.full(anz, np.nan)
+    ergebnis[~np.isfinite(ergebnis)] = np.nan
+    return ergebnis
+
+
+@gemessen("Formelberechnung")
+def eval_ilias_vektor(gleichungen, v, anz, titel="", fehler=None):
+    """Vektorisierte Variante von eval_ilias_batch.
+    Berechnet alle Unteraufgaben einer frage für alle anz Teilnehmer
+    gleichzeitig in der Reihenfolge aus ordne_unteraufgaben().
+    Ergebnis ist ein Array der Form (Anzahl Gleichungen, anz)
+    mit NaN für nicht berechenbare Werte.
+    Formeln, die bei einzelnen Teilnehmern nicht berechnet werden konnten,
+    werden einmal pro Aufruf gemeldet. Wird ein dict fehler übergeben,
+    werden sie stattdessen dort gezählt (siehe melde_formelfehler).
+    """
+    formeln = [kompiliere_ilias_formel(gleichung_ilias) for gleichung_ilias in gleichungen]
+    r = np.full((len(formeln), anz), np.nan)
+    for id in ordne_unteraufgaben(gleichungen, titel):
+        r[id] = berechne_formel_vektor(formeln[id], v, r, anz)
+        anz_fehler = int(np.isnan(r[id]).sum())
+        if anz_fehler:
+            zaehler = {} if fehler is None else fehler
+            eintrag = zaehler.setdefault((titel, formeln[id]["formel_ilias"], formeln[id]["formel_py"]), [0, 0])
+            eintrag[0] += anz_fehler
+            eintrag[1] += anz
+            if fehler is None:
+                melde_formelfehler(zaehler)
+    return r
+
+
+@gemessen("Folgefehler-Berechnung")
+def eval_ilias_folgefehler(gleichungen, v, r_student, anz, titel=""):
+    """Berechnet die Unteraufgaben einer frage, die Ergebnisse anderer
+    Unteraufgaben verwenden, für alle anz Teilnehmer mit deren eigenen
+    Eingaben r_student (Array (Anzahl Ergebnisse, anz)) statt der Musterlösungen.
+    titel ist der Fragentitel, unter dem Formelprobleme schon gemeldet wurden.
+    Ergebnis ist ein Array der Form (Anzahl Gleichungen, anz), NaN für
+    unabhängige oder nicht berechenbare Unteraufgaben und fehlende Eingaben.
+    """
+    formeln = [kompiliere_ilias_formel(gleichung_ilias) for gleichung_ilias in gleichungen]
+    r = np.full((len(formeln), anz), np.nan)
+    for id in ordne_unteraufgaben(gleichungen, titel):
+        if formeln[id]["ergebnisse"]:
+            r[id] = berechne_formel_vektor(formeln[id], v, r_student, anz)
+    return r
+
+
+def melde_formelfehler(fehler):
+    """Gibt die in eval_ilias_vektor gezählten Berechnungsfehler aus,
+    eine Meldung pro frage und Formel.
+    """
+    for (titel, formel_ilias, formel_py), (anz_fehler, anz) in fehler.items():
+        zaehle("Formelfehler", anz_fehler)
+        print("Gleichung ", formel_ilias, " in frage", titel,
+              "nicht berechenbar bei", anz_fehler, "von", anz, "Teilnehmern")
+        print("Python-Format:", formel_py)
+
+
+# Eingaben der Studierenden ################################################
+# Die Eingaben $r1... stehen in der Ergebnisdatei als Zahl oder als Text.
+# Texte werden ohne eval gelesen: Dezimalkomma oder -punkt, Tausenderpunkte,
+# Exponent (1,5e-3, 1,5·10^-3), Brüche (1/300) und eine Einheit am Ende
+# (12,5 kN) sind erlaubt; die Einheit wird ignoriert. Prozent ist keine
+# Einheit, die man ignorieren darf, "0,5%" ist deshalb unlesbar. Beispiele:
+#   "12,5 kN" -> 12.5      "1.234,5" -> 1234.5     "1,234,567" -> 1234567.0
+#   "1/300"   -> 0.00333   "1,5·10^-3" -> 0.0015   "1.234" -> 1.234
+#   "1,2,3", "1.5.6", "1.234,5,6", "1,23.4", "0,5%" -> unlesbar
+# Da viele Studierende dieselben Werte eingeben, werden die gelesenen Texte
+# in "eingabe_cache" abgelegt. Zu jeder Eingabe wird ein Status gespeichert:
+EINGABE_FEHLT = 0        # keine Eingabe
+EINGABE_ZAHL = 1         # Zahl in der Datei
+EINGABE_TEXT = 2         # Text, als Zahl gelesen
+EINGABE_UNLESBAR = -1    # Text, der keine Zahl ist (wird als fehlend bewertet)
+
+_zahl_muster = r"[+-]?(?:\d[\d.,]*|[.,]\d+)(?:\s*(?:[eE][+-]?\d+|(?:[*x×·]\s*)10\s*\^\s*\(?[+-]?\d+\)?))?"
+eingabe_muster = re.compile(r"=?\s*(" + _zahl_muster + r")(?:\s*/\s*(" + _zahl_muster + r"))?"
+                            r"\s*(?:[a-zA-Zµμ°Ω][\w°Ω/·*^²³.-]*)?")
+eingabe_cache = {}  # Text -> (Zahl, Status)
+
+
+def _lies_dezimalzahl(text):
+    """Liest eine Zahl mit Dezimalkomma oder -punkt und optionalem Exponenten.
+    Kommen Komma und Punkt vor, ist das letzte Zeichen das Dezimaltrennzeichen,
+    das andere trennt Tausender. Kommt ein Zeichen mehrfach vor, trennt es Tausender.
+    Tausendertrenner gelten nur vor dem Dezimaltrennzeichen und nur vor
+    Dreiergruppen von Ziffern, sonst gibt es einen ValueError.
+    """
+    text = re.sub(r"\s+", "", text)
+    mantisse, exponent = re.match(r"([^eE*x×·]*)(?:[eE]|[*x×·]10\^)?\(?([+-]?\d+)?\)?$", text).groups()
+    if "," in mantisse and "." in mantisse:
+        tausender = "." if mantisse.rfind(",") > mantisse.rfind(".") else ","
+    elif mantisse.count(",") > 1 or mantisse.count(".") > 1:
+        tausender = "," if mantisse.count(",") > 1 else "."
+    else:
+        tausender = None
+    if tausender is not None:
+        dezimal = "." if tausender == "," else ","
+        if mantisse.count(dezimal) > 1:
+            raise ValueError(f"mehrere Dezimaltrennzeichen in {text!r}")
+        gruppen = mantisse.split(dezimal)[0].split(tausender)
+        if (not re.fullmatch(r"[+-]?\d{1,3}", gruppen[0])
+                or not all(re.fullmatch(r"\d{3}", gruppe) for gruppe in gruppen[1:])):
+            raise ValueError(f"ungültige Tausendertrennung in {text!r}")
+        mantisse = mantisse.replace(tausender, "")
+    wert = float(mantisse.replace(",", "."))
+    return wert * 10.0 ** int(exponent) if exponent else wert
+
+
+def lies_eingabe(wert):
+    """Wandelt einen Wert aus der ILIAS-Ergebnisdatei in eine Zahl um und
+    liefert (Zahl, Status) mit einem der Status EINGABE_... .
+    Fehlende und unlesbare Werte werden zu NaN.
+    """
+    if wert is None:
+        return np.nan, EINGABE_FEHLT
+    if not isinstance(wert, str):
+        try:
+            return float(wert), EINGABE_ZAHL
+        except (TypeError, ValueError):
+            return np.nan, EINGABE_UNLESBAR
+    ergebnis = eingabe_cache.get(wert)
+    if ergebnis is None:
+        ergebnis = _lies_text(wert)
+        eingabe_cache[wert] = ergebnis
+    return ergebnis
+
+
+def _lies_text(text):
+    """Liest einen Text aus der Ergebnisdatei (ohne Cache)."""
+    text = text.strip()
+    if not text:
+        return np.nan, EINGABE_FEHLT
+    treffer = eingabe_muster.fullmatch(text)
+    if treffer is None:
+        return np.nan, EINGABE_UNLESBAR
+    try:
+        zahl = _lies_dezimalzahl(treffer.group(1))
+        if treffer.group(2) is not None:
+            zahl /= _lies_dezimalzahl(treffer.group(2))
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return np.nan, EINGABE_UNLESBAR
+    if not math.isfinite(zahl):
+        return np.nan, EINGABE_UNLESBAR
+    return zahl, EINGABE_TEXT
+
+
+def als_zahl(wert):
+    """Wandelt einen Wert aus der ILIAS-Ergebnisdatei in eine Zahl um.
+    Fehlende oder unlesbare Werte (None, leere Zelle, Text) werden zu NaN.
+    """
+    return lies_eingabe(wert)[0]
+
+
+def melde_unlesbare_eingaben(speicher, anz_beispiele=10):
+    """Gibt die Eingaben aus, die nicht als Zahl gelesen werden konnten.
+    Sie werden wie fehlende Eingaben bewertet.
+    """
+    unlesbar = np.argwhere(speicher["res_status"] == EINGABE_UNLESBAR)
+    zaehle("Eingaben unlesbar", len(unlesbar))
+    if not len(unlesbar):
+        return
+    print(len(unlesbar), "Eingaben sind keine Zahl und werden als fehlend bewertet, z.B.:")
+    for n, res_nr in unlesbar[:anz_beispiele].tolist():
+        uid = speicher["teilnehmer"][n]
+        print("   ", speicher["name"][uid], "frage", speicher["titel"][n],
+              f"$r{res_nr + 1}:", repr(speicher["res_eingabe"][n, res_nr]))
+
+
+def im_toleranzbereich(r_student, r_ref, tol):
+    """True, wo r_student innerhalb von tol Prozent um r_ref liegt (Arrays)."""
+    # Maximale und minimale Grenze mit toleranz bestimmen.
+    # ACHTUNG: Bei negativem Vorzeichen drehen sich min und max rum,
+    # das gibt dann Ärger beim nachfolgenden Vergleich
+    # Daher hier die Verwendung von "minimum" und "maximum"
+    r_min = np.minimum(r_ref * (1 + tol / 100), r_ref * (1 - tol / 100))
+    r_max = np.maximum(r_ref * (1 + tol / 100), r_ref * (1 - tol / 100))
+    with np.errstate(invalid="ignore"):
+        return (r_student >= r_min) & (r_student <= r_max)
+
+
+def bewerte_fragengruppe(gleichungen, toleranzen, punkte, v, r_student, titel="", fehler=None, folgefehler=False):
+    """Bewertet alle Versuche zu einer frage aus dem Fragenpool gleichzeitig.
+    v: Variablen der Teilnehmer als Array (Anzahl Variablen, Anzahl Versuche)
+    r_student: Ergebnisse der Teilnehmer als Array (Anzahl Ergebnisse, Anzahl Versuche),
+               NaN, wenn keine Lösung angegeben wurde.
+    folgefehler: True, dann werden Unteraufgaben, die andere Ergebnisse
+               verwenden, zusätzlich mit den eigenen Eingaben der Teilnehmer
+               berechnet (eval_ilias_folgefehler). Ist die Eingabe nur damit
+               richtig, gibt es die punkte trotzdem.
+    Liefert die Musterlösungen, die vergebenen Punkte und ein bool-Array, wo
+    die punkte nur über den Folgefehler vergeben wurden, jeweils als Array
+    der Form (Anzahl Ergebnisse, Anzahl Versuche).
+    """
+    anz = v.shape[1]
+    r_ref = eval_ilias_vektor(gleichungen, v, anz, titel, fehler)
+    r_folge = eval_ilias_folgefehler(gleichungen, v, r_student, anz, titel) if folgefehler else None
+    with messe("Toleranzprüfung"):
+        tol = np.array([als_zahl(t) for t in toleranzen])[:, None]
+        pkt_max = np.array([als_zahl(p) for p in punkte])[:, None]
+        richtig = im_toleranzbereich(r_student, r_ref, tol)
+        if folgefehler:
+            folge = ~richtig & im_toleranzbereich(r_student, r_folge, tol)
+            richtig |= folge
+        else:
+            folge = np.zeros(richtig.shape, dtype=bool)
+        fragen_pkt = np.where(richtig, pkt_max, 0)
+    return r_ref, fragen_pkt, folge
+
+
+def lies_ilias_zeilen(dateiname, blattname='Auswertung für alle Benutzer'):
+    """Liest die ILIAS-Ergebnisdatei zeilenweise (Generator).
+    Normalerweise stehen alle teilnehmer im Blatt "Auswertung für alle Benutzer".
+    Manche ILIAS-Exporte haben stattdessen je einen Reiter pro Student. Dann
+    werden alle Blätter außer dem ersten (Übersicht) nacheinander gelesen.
+    Die Datei wird im read-only-Modus von openpyxl geöffnet und es werden nur
+    die ersten beiden Spalten geliefert. So wird weder die ganze Tabelle noch
+    ein zusammengesetzter DataFrame im Speicher gehalten, auch nicht bei
+    Exporten mit tausenden Blättern.
+    """
+    mappe = load_workbook(dateiname, read_only=True, data_only=True)
+    try:
+        if blattname in mappe.sheetnames:
+            blaetter = [blattname]
+        else:
+            blaetter = mappe.sheetnames[1:]
+        for blatt in blaetter:
+            yield from mappe[blatt].iter_rows(max_col=2, values_only=True)
+    finally:
+        mappe.close()
+
+
+def parse_ilias_ergebnisse(zeilen, name_marker, fragentitel_marker):
+    """Liest die Zeilen des Blatts "Auswertung für alle Benutzer" in einem Durchlauf.
+    zeilen ist eine beliebige Folge von Zeilen, von denen nur die ersten beiden
+    Spalten verwendet werden (Schlüsseltext und Wert).
+    Jede zeile wird mit einem einzigen regulären Ausdruck einer der Zeilenarten
+    zugeordnet (teilnehmer, frage, $v-Variable, $r-Ergebnis), die Laufzeit hängt
+    also nur von der Anzahl der Zeilen ab.
+    Steht im name_marker "{durchlauf}", wird dort die Nummer des Testdurchlaufs
+    gelesen. Die Durchläufe desselben Teilnehmers werden zusammengefasst.
+    Ergebnis ist eine Liste von teilnehmern, die beim Lesen ergänzt wird:
+      {"nr", "name", "vorname", "familienname", "versuche"}
+    versuche ist die Liste der Fragen des Teilnehmers aus allen Durchläufen, jede als
+      {"titel", "durchlauf", "variablen", "ergebnisse"}
+    variablen und ergebnisse sind dicts mit der ILIAS-Nummer (1 für $v1) als Schlüssel.
+    Eine frage, die der teilnehmer nicht geöffnet hat, hat keine variablen.
+    """
+    name_muster = r"(?P<durchlauf>\d+)".join(re.escape(teil) for teil in name_marker.split("{durchlauf}", 1))
+    muster = re.compile(rf"(?P<name>{name_muster})|(?P<frage>{re.escape(fragentitel_marker)})"
+                        r"|\$(?P<art>[vr])(?P<nr>\d+)")
+    teilnehmer_liste = []
+    nach_name = {}  # name -> (teilnehmer, gelesene Durchläufe)
+    teilnehmer = None
+    durchlauf = 1
+    versuch = None
+    for zeile in zeilen:
+        txt = zeile[0]
+        if not isinstance(txt, str):
+            continue
+        treffer = muster.match(txt)
+        if treffer is None:
+            continue
+        wert = zeile[1] if len(zeile) > 1 else None
+        if treffer.group("name") is not None:
+            name = txt[treffer.end():]  # Der Text vor dem namen wird entfernt
+            durchlauf = int(treffer.groupdict().get("durchlauf") or 1)
+            teilnehmer, durchlaeufe = nach_name.get(name, (None, set()))
+            if teilnehmer is None or durchlauf in durchlaeufe:  # neuer teilnehmer (auch bei gleichem namen)
+                familienname, _, vorname = name.partition(",")
+                teilnehmer = {"nr": len(teilnehmer_liste) + 1, "name": name, "vorname": vorname.strip(),
+                              "familienname": familienname.strip(), "versuche": []}
+                teilnehmer_liste.append(teilnehmer)
+                durchlaeufe = set()
+                nach_name[name] = (teilnehmer, durchlaeufe)
+            durchlaeufe.add(durchlauf)
+            versuch = None
+        elif teilnehmer is None:
+            continue  # Zeilen vor dem ersten teilnehmer
+        elif treffer.group("frage") is not None:
+            versuch = {"titel": wert, "durchlauf": durchlauf, "variablen": {}, "ergebnisse": {}}
+            teilnehmer["versuche"].append(versuch)
+        elif versuch is None:
+            continue  # Variablen ohne vorherige frage
+        elif treffer.group("art") == "v":
+            if treffer.end() == len(txt):  # Variablen müssen genau "$v1" usw. heißen
+                versuch["variablen"][int(treffer.group("nr"))] = wert
+        else:  # Ergebnisse dürfen noch einen Zusatz wie die Einheit haben
+            versuch["ergebnisse"][int(treffer.group("nr"))] = wert
+    return teilnehmer_liste
+
+
+@gemessen("Versuchsspeicher")
+def erstelle_versuchsspeicher(teilnehmer_liste, anz_res=None):
+    """Überträgt die eingelesenen teilnehmer in einen spaltenweisen Speicher.
+    Jede frage eines Teilnehmers (ein "Versuch") ist eine zeile in den Arrays,
+    die Größe richtet sich also nach den tatsächlich vorhandenen Daten: Die
+    Anzahl der Spalten für Variablen und Ergebnisse ist die größte Nummer $vN
+    bzw. $rN in der Datei (Ergebnisse höchstens anz_res, wenn angegeben).
+    Ergebnis ist ein dict mit
+      pro teilnehmer (Länge anz_teilnehmer):
+        nr, name, vorname, familienname, mat_nr, ges_pkt, noten
+        durchlauf_pkt       Punkte pro Testdurchlauf (anz_teilnehmer, Anzahl Durchläufe), NaN = nicht teilgenommen
+        durchlauf_gewertet  Nummer des Durchlaufs, der zählt (siehe waehle_durchlauf)
+      pro Versuch (Länge Anzahl Versuche):
+        teilnehmer  Index des Teilnehmers
+        durchlauf   Nummer des Testdurchlaufs (1 = erster)
+        gewertet    True, wenn der Versuch zum Durchlauf gehört, der zählt
+        slot        Nummer der frage beim teilnehmer im Durchlauf (0 = erste frage)
+        titel       Fragentitel
+        pool_index  zeile im Fragenpool, -1 wenn nicht gefunden
+        geoeffnet   True, wenn der teilnehmer die frage geöffnet hat
+        var         Variablen $v1... als float-Array (Versuche, Anzahl Variablen), NaN = fehlt
+        res_eingabe Eingaben $r1... der Studierenden, wie in der Datei (None = fehlt)
+        res         Eingaben als Zahl (Versuche, anz_res), NaN = fehlt oder unlesbar
+        res_status  Status der Eingaben (Versuche, anz_res), EINGABE_FEHLT, _ZAHL, _TEXT oder _UNLESBAR
+        res_ref     Musterlösung (Versuche, anz_res), NaN = nicht berechnet
+        pkt         Punkte (Versuche, anz_res), NaN = keine Bewertung
+        folgefehler True, wo die punkte nur über den Folgefehler vergeben wurden (Versuche, anz_res)
+    """
+    versuche = []
+    for std_id, teilnehmer in enumerate(teilnehmer_liste):
+        slots = {}  # Durchlauf -> Anzahl Fragen bisher
+        for versuch in teilnehmer["versuche"]:
+            afg_id = slots.get(versuch["durchlauf"], 0)
+            slots[versuch["durchlauf"]] = afg_id + 1
+            versuche.append((std_id, afg_id, versuch))
+    anz = len(versuche)
+    anz_durchlaeufe = max((versuch["durchlauf"] for _, _, versuch in versuche), default=1)
+    anz_var = max((max(versuch["variablen"], default=0) for _, _, versuch in versuche), default=0)
+    if anz_res is None:
+        anz_res = max((max(versuch["ergebnisse"], default=0) for _, _, versuch in versuche), default=0)
+    speicher = {"nr": np.array([t["nr"] for t in teilnehmer_liste], dtype=int),
+                "name": [t["name"] for t in teilnehmer_liste],
+                "vorname": [t["vorname"] for t in teilnehmer_liste],
+                "familienname": [t["familienname"] for t in teilnehmer_liste],
+                "mat_nr": [""] * len(teilnehmer_liste),
+                "ges_pkt": np.zeros(len(teilnehmer_liste)),
+                "noten": [""] * len(teilnehmer_liste),
+                "durchlauf_pkt": np.full((len(teilnehmer_liste), anz_durchlaeufe), np.nan),
+                "durchlauf_gewertet": np.ones(len(teilnehmer_liste), dtype=np.int32),
+                "teilnehmer": np.array([v[0] for v in versuche], dtype=np.int32),
+                "durchlauf": np.array([v[2]["durchlauf"] for v in versuche], dtype=np.int32),
+                "gewertet": np.ones(anz, dtype=bool),
+                "slot": np.array([v[1] for v in versuche], dtype=np.int32),
+                "titel": np.array([v[2]["titel"] for v in versuche], dtype=object),
+                "pool_index": np.full(anz, -1, dtype=np.int32),
+                "var": np.full((anz, anz_var), np.nan),
+                "res_eingabe": np.full((anz, anz_res), None, dtype=object),
+                "res": np.full((anz, anz_res), np.nan),
+                "res_status": np.full((anz, anz_res), EINGABE_FEHLT, dtype=np.int8),
+                "res_ref": np.full((anz, anz_res), np.nan),
+                "pkt": np.full((anz, anz_res), np.nan),
+                "folgefehler": np.zeros((anz, anz_res), dtype=bool)}
+    for n, (_, _, versuch) in enumerate(versuche):
+        for var_nr, x in versuch["variablen"].items():
+            speicher["var"][n, var_nr - 1] = als_zahl(x)
+        for res_nr, y in versuch["ergebnisse"].items():
+            if res_nr <= anz_res:
+                speicher["res_eingabe"][n, res_nr - 1] = y
+                speicher["res"][n, res_nr - 1], speicher["res_status"][n, res_nr - 1] = lies_eingabe(y)
+    # Wenn der Student die Aufgabe gar nicht angeschaut hat, sind alle Variablen None, insbesondere die erste.
+    speicher["geoeffnet"] = ~np.isnan(speicher["var"][:, 0]) if anz_var else np.zeros(anz, dtype=bool)
+    return speicher
+
+
+def slot_tabelle(speicher):
+    """Liefert ein Array (anz_teilnehmer, Anzahl Fragen pro teilnehmer) mit dem
+    Index des Versuchs in speicher, -1 wenn der teilnehmer weniger Fragen hat.
+    Damit lassen sich die Daten der Versuche als Spalten pro frage auslesen.
+    Es werden nur die Versuche aus dem gewerteten Durchlauf eingetragen.
+    """
+    gewertet = np.flatnonzero(speicher["gewertet"])
+    anz_slots = int(speicher["slot"][gewertet].max()) + 1 if len(gewertet) else 0
+    tabelle = np.full((len(speicher["name"]), anz_slots), -1, dtype=np.int64)
+    tabelle[speicher["teilnehmer"][gewertet], speicher["slot"][gewertet]] = gewertet
+    return tabelle
+
+
+# Spalten pro Unteraufgabe im Versuchsspeicher mit ihrem Füllwert
+RES_SPALTEN = {"res_eingabe": None, "res": np.nan, "res_status": EINGABE_FEHLT, "res_ref": np.nan,
+               "pkt": np.nan, "folgefehler": False}
+
+
+def gleiche_breite_an(speicher, fragenpool):
+    """Bringt Versuchsspeicher und Fragenpool auf dieselbe Anzahl Unteraufgaben,
+    die größere von beiden. Fehlende Spalten im Speicher werden mit ihrem
+    Füllwert, fehlende Unteraufgaben im Pool als leere Formel ergänzt.
+    """
+    breite_speicher = speicher["res"].shape[1]
+    breite_pool = max((len(formeln) for formeln in fragenpool["formeln"]), default=0)
+    breite = max(breite_speicher, breite_pool)
+    if breite_speicher < breite:
+        for schluessel, fuellwert in RES_SPALTEN.items():
+            alt = speicher[schluessel]
+            neu = np.full((alt.shape[0], breite), fuellwert, dtype=alt.dtype)
+            neu[:, :breite_speicher] = alt
+            speicher[schluessel] = neu
+    if breite_pool < breite:
+        for schluessel in ("formeln", "toleranzen", "punkte"):
+            fragenpool[schluessel] = [tuple(zeile) + (" ",) * (breite - len(zeile)) for zeile in fragenpool[schluessel]]
+
+
+@gemessen("Verknüpfen")
+def verknuepfe_fragenpool(speicher, fragenpool):
+    """Sucht zu jedem geöffneten Versuch die frage im Fragenpool und trägt
+    den Index in speicher["pool_index"] ein. Fehlende Fragen werden einmal
+    pro titel gemeldet, ebenso Fragen, die nur über den normierten titel
+    gefunden wurden (titel_normiert_suchen), und Probleme in den Formeln
+    einmal pro frage.
+    """
+    pool_index = {}
+    for titel in set(speicher["titel"][speicher["geoeffnet"]]):
+        pool_index[titel] = finde_fragenindex(titel, fragenpool)
+    fehlende_fragen = {}  # titel -> Liste der betroffenen teilnehmer
+    for n in np.flatnonzero(speicher["geoeffnet"]):
+        fid = pool_index[speicher["titel"][n]]
+        if fid is None:
+            fehlende_fragen.setdefault(speicher["titel"][n], []).append(int(speicher["nr"][speicher["teilnehmer"][n]]))
+        else:
+            speicher["pool_index"][n] = fid
+    zaehle("Fehlende Fragen", len(fehlende_fragen))
+    for aufgabe, teilnehmer_nr in fehlende_fragen.items():
+        print("!!! frage", aufgabe, "existiert nicht im Pool! Nicht bewertet bei",
+              len(teilnehmer_nr), "Teilnehmern (Nr.", ", ".join(str(n) for n in teilnehmer_nr), ")")
+    normiert_gefunden = sorted(t for t, fid in pool_index.items() if fid is not None and t not in fragenpool["index"])
+    zaehle("Fragen über normierten titel gefunden", len(normiert_gefunden))
+    for t in normiert_gefunden:
+        fid = pool_index[t]
+        print("!!! frage", repr(t), "nur über den normierten titel gefunden: verwendet wird",
+              repr(fragenpool["titel"][fid]), "(zeile", fid + 2, ")")
+    for fid in sorted(set(pool_index.values()) - {None}):
+        ordne_unteraufgaben(fragenpool["formeln"][fid], fragenpool["titel"][fid])
+
+
+def bewerte_gruppen(var, res, pool_index, fragenpool, fehler=None, folgefehler=False):
+    """Bewertet Versuche, deren frage im Pool schon bekannt ist.
+    Alle Versuche zur selben frage aus dem Pool werden gesammelt
+    und gemeinsam mit bewerte_fragengruppe() bewertet.
+    var, res, pool_index sind die gleichnamigen Arrays aus dem Versuchsspeicher
+    (oder ein Ausschnitt davon). Liefert die Arrays res_ref, pkt und folgefehler dazu.
+    """
+    res_ref = np.full(res.shape, np.nan)
+    pkt = np.full(res.shape, np.nan)
+    folge = np.zeros(res.shape, dtype=bool)
+    bewertet = np.flatnonzero(pool_index >= 0)
+    reihenfolge = bewertet[np.argsort(pool_index[bewertet], kind="stable")]
+    grenzen = np.flatnonzero(np.diff(pool_index[reihenfolge])) + 1
+    for versuche in np.split(reihenfolge, grenzen) if len(reihenfolge) else []:
+        fid = pool_index[versuche[0]]
+        formeln = list(fragenpool["formeln"][fid])
+        r_ref, fragen_pkt, fragen_folge = bewerte_fragengruppe(formeln, fragenpool["toleranzen"][fid],
+                                                               fragenpool["punkte"][fid], var[versuche].T,
+                                                               res[versuche].T, fragenpool["titel"][fid],
+                                                               fehler, folgefehler)
+        fragen_pkt = fragen_pkt.T
+        # Überprufung ob es überhaupt eine Fragen Unterteil gab
+        leer = np.array([ist_leere_formel(gleichung) for gleichung in formeln])
+        beantwortet = ~np.isnan(res[versuche]).all(axis=1)
+        fragen_pkt[np.ix_(beantwortet, leer)] = np.nan
+        res_ref[versuche] = r_ref.T
+        pkt[versuche] = fragen_pkt
+        folge[versuche] = fragen_folge.T
+    return res_ref, pkt, folge
+
+
+# Parallele Bewertung ######################################################
+_worker_fragenpool = None  # Fragenpool in den Worker-Prozessen
+
+
+def _starte_worker(fragenpool):
+    """Initialisiert einen Worker-Prozess: Der Fragenpool wird einmal pro
+    Prozess übergeben und alle Formeln werden einmal kompiliert.
+    """
+    global _worker_fragenpool, formelprobleme_melden
+    _worker_fragenpool = fragenpool
+    formelprobleme_melden = False
+    for formeln in fragenpool["formeln"]:
+        ordne_unteraufgaben(formeln)
+
+
+def _bewerte_teil(var, res, pool_index, folgefehler):
+    """Bewertet einen Ausschnitt des Versuchsspeichers in einem Worker-Prozess."""
+    fehler = {}
+    res_ref, pkt, folge = bewerte_gruppen(var, res, pool_index, _worker_fragenpool, fehler, folgefehler)
+    return res_ref, pkt, folge, fehler
+
+
+def bewerte_parallel(speicher, fragenpool, anz_prozesse, fehler, folgefehler=False):
+    """Teilt die teilnehmer in Blöcke auf und bewertet diese in einem
+    ProcessPoolExecutor. Da die Versuche nach teilnehmern sortiert sind, ist
+    jeder Block ein zusammenhängender Ausschnitt der Arrays. Die Ergebnisse
+    werden in der Reihenfolge der Blöcke zusammengesetzt und sind damit
+    identisch mit denen der seriellen Bewertung.
+    Wo verfügbar wird "fork" verwendet, dann erben die Worker die schon
+    kompilierten Formeln aus dem Hauptprozess.
+    """
+    anz_teilnehmer = len(speicher["name"])
+    anz_bloecke = min(anz_teilnehmer, 4 * anz_prozesse)
+    teilnehmer_grenzen = np.linspace(0, anz_teilnehmer, anz_bloecke + 1).round().astype(int)
+    grenzen = np.searchsorted(speicher["teilnehmer"], teilnehmer_grenzen)
+    bloecke = [slice(a, b) for a, b in zip(grenzen[:-1], grenzen[1:])]
+    methoden = multiprocessing.get_all_start_methods()
+    kontext = multiprocessing.get_context("fork" if "fork" in methoden else None)
+    with ProcessPoolExecutor(max_workers=anz_prozesse, mp_context=kontext,
+                             initializer=_starte_worker, initargs=(fragenpool,)) as executor:
+        teile = list(executor.map(_bewerte_teil,
+                                  [speicher["var"][b] for b in bloecke],
+                                  [speicher["res"][b] for b in bloecke],
+                                  [speicher["pool_index"][b] for b in bloecke],
+                                  [folgefehler] * len(bloecke)))
+    for block, (res_ref, pkt, folge, teil_fehler) in zip(bloecke, teile):
+        speicher["res_ref"][block] = res_ref
+        speicher["pkt"][block] = pkt
+        speicher["folgefehler"][block] = folge
+        for schluessel, (anz_fehler, anz) in teil_fehler.items():
+            eintrag = fehler.setdefault(schluessel, [0, 0])
+            eintrag[0] += anz_fehler
+            eintrag[1] += anz
+
+
+@gemessen("Bewertung")
+def bewerte_versuche(speicher, fragenpool, anz_prozesse=1, notenschema=None, folgefehler=None):
+    """Verknüpft die Versuche mit dem Fragenpool und bewertet sie.
+    Die Ergebnisse werden in speicher eingetragen
+    (pool_index, res_ref, pkt, folgefehler, ges_pkt, noten).
+    anz_prozesse: Anzahl der Prozesse für die Bewertung,
+    1 = seriell, None = alle Prozessorkerne.
+    notenschema: (max_pkt, schema_proz, schema_note), Default sind die
+    Konstanten am Anfang des Skripts.
+    folgefehler: Folgefehler berücksichtigen, Default ist folgefehler_bewerten.
+    """
+    if folgefehler is None:
+        folgefehler = folgefehler_bewerten
+    gleiche_breite_an(speicher, fragenpool)
+    verknuepfe_fragenpool(speicher, fragenpool)
+    if anz_prozesse is None:
+        anz_prozesse = os.cpu_count() or 1
+    fehler = {}
+    if anz_prozesse > 1 and len(speicher["name"]) > 1:
+        bewerte_parallel(speicher, fragenpool, anz_prozesse, fehler, folgefehler)
+    else:
+        speicher["res_ref"], speicher["pkt"], speicher["folgefehler"] = bewerte_gruppen(
+            speicher["var"], speicher["res"], speicher["pool_index"], fragenpool, fehler, folgefehler)
+    melde_formelfehler(fehler)
+    if folgefehler:
+        zaehle("Punkte über Folgefehler", np.count_nonzero(speicher["folgefehler"]))
+    melde_unlesbare_eingaben(speicher)
+    zaehle("Teilnehmer", len(speicher["name"]))
+    zaehle("Versuche", len(speicher["teilnehmer"]))
+    zaehle("Versuche bewertet", np.count_nonzero(speicher["pool_index"] >= 0))
+    zaehle("Fragen nicht geöffnet", np.count_nonzero(~speicher["geoeffnet"]))
+    zaehle("Fragen unbeantwortet", np.count_nonzero(speicher["geoeffnet"] & np.isnan(speicher["res"]).all(axis=1)))
+
+    waehle_durchlauf(speicher)
+    if notenschema is None:
+        notenschema = (max_pkt, schema_proz, schema_note)
+    speicher["noten"] = notenberechnung_vektor(speicher["ges_pkt"], *notenschema)
+    return speicher
+
+
+DURCHLAUF_REGELN = ("bester", "letzter", "erster")
+
+
+def waehle_durchlauf(speicher, regel=None):
+    """Summiert die punkte pro teilnehmer und Testdurchlauf und wählt nach
+    regel den Durchlauf, der zählt: "bester" (die meisten punkte, bei
+    Gleichstand der frühere), "letzter" oder "erster". Default ist
+    durchlauf_wertung. Trägt durchlauf_pkt, durchlauf_gewertet, gewertet und
+    ges_pkt in speicher ein. Bei nur einem Durchlauf ist ges_pkt einfach die
+    Summe der punkte.
+    """
+    if regel is None:
+        regel = durchlauf_wertung
+    if regel not in DURCHLAUF_REGELN:
+        raise ValueError(f"Unbekannte Regel für die Testdurchläufe: {regel}")
+    anz_teilnehmer = len(speicher["name"])
+    durchlauf = speicher["durchlauf"].astype(np.int64) - 1
+    anz_durchlaeufe = int(durchlauf.max()) + 1 if len(durchlauf) else 1
+    schluessel = speicher["teilnehmer"].astype(np.int64) * anz_durchlaeufe + durchlauf
+    summe = np.bincount(schluessel, weights=np.nansum(speicher["pkt"], axis=1),
+                        minlength=anz_teilnehmer * anz_durchlaeufe).reshape(anz_teilnehmer, anz_durchlaeufe)
+    vorhanden = np.bincount(schluessel, minlength=anz_teilnehmer * anz_durchlaeufe
+                            ).reshape(anz_teilnehmer, anz_durchlaeufe) > 0
+    if regel == "bester":
+        wahl = np.argmax(np.where(vorhanden, summe, -np.inf), axis=1)
+    elif regel == "letzter":
+        wahl = anz_durchlaeufe - 1 - np.argmax(vorhanden[:, ::-1], axis=1)
+    else:
+        wahl = np.argmax(vorhanden, axis=1)
+    speicher["durchlauf_pkt"] = np.where(vorhanden, summe, np.nan)
+    speicher["durchlauf_gewertet"] = (wahl + 1).astype(np.int32)
+    speicher["gewertet"] = durchlauf == wahl[speicher["teilnehmer"]]
+    speicher["ges_pkt"] = summe[np.arange(anz_teilnehmer), wahl]
+
+
+@gemessen("Export aufbauen")
+def erstelle_export_spalten(speicher, fragenpool):
+    """Baut alle Spalten der Export-Tabelle in einem Schritt aus dem
+    Versuchsspeicher auf. Ergebnis ist ein dict Spaltentitel -> Array mit
+    einem Wert pro teilnehmer, in der Reihenfolge der Export-Spalten:
+      Nr name Vorname Familienname mat_nr Note GesPkt A1.1_Pkt ... A1.5_Pkt_Gesamt ...
+      ... A1_ID A1.0_Formel A1_Tol A1.0_Res_Ref A1.0_Res  A1_v1 A1_v2 ...
+    Die Spalten pro frage werden über die slot_tabelle mit Index-Zugriffen
+    aus den Arrays der Versuche geholt. NaN steht für eine leere Zelle.
+    Bei mehreren Testdurchläufen stehen dort die Fragen des gewerteten Durchlaufs.
+    """
+    slots = slot_tabelle(speicher)
+    anz_teilnehmer, anz_fragen = slots.shape
+    anz_res = speicher["pkt"].shape[1]
+    anz_var = speicher["var"].shape[1]
+
+    def spalte(werte, frage, leer=np.nan):
+        versuch = slots[:, frage]
+        x = np.full(anz_teilnehmer, leer, dtype=werte.dtype if leer is np.nan else object)
+        x[versuch >= 0] = werte[versuch[versuch >= 0]]
+        return x
+
+    # Formeln und Toleranzen aus dem Pool pro Versuch, leer wenn nicht bewertet
+    bewertet = speicher["geoeffnet"] & (speicher["pool_index"] >= 0)
+    formeln = np.full((len(bewertet), anz_res), "", dtype=object)
+    toleranzen = np.full(len(bewertet), str([None] * anz_res), dtype=object)
+    for n in np.flatnonzero(bewertet):
+        fid = speicher["pool_index"][n]
+        formeln[n] = fragenpool["formeln"][fid]
+        toleranzen[n] = str(list(fragenpool["toleranzen"][fid]))
+
+    spalten = {"Nr": speicher["nr"], "name": np.array(speicher["name"], dtype=object),
+               "Vorname": np.array(speicher["vorname"], dtype=object),
+               "Familienname": np.array(speicher["familienname"], dtype=object),
+               "mat_nr": np.array(speicher["mat_nr"], dtype=object),
+               "Note": np.array(speicher["noten"], dtype=object), "GesPkt": speicher["ges_pkt"]}
+    # Bei mehreren Testdurchläufen: welcher zählt und die punkte aller Durchläufe
+    if speicher["durchlauf_pkt"].shape[1] > 1:
+        spalten["Durchlauf"] = speicher["durchlauf_gewertet"]
+        for durchlauf in range(speicher["durchlauf_pkt"].shape[1]):
+            spalten[f"GesPkt_Durchlauf{durchlauf + 1}"] = speicher["durchlauf_pkt"][:, durchlauf]
+    # Gesamtpunkte bei den einzelnen Fragen
+    for frage in range(anz_fragen):
+        for untertitel in range(anz_res):
+            spalten["A" + str(frage + 1) + f".{untertitel + 1}_Pkt"] = spalte(speicher["pkt"][:, untertitel], frage)
+    pkt_gesamt = np.nansum(speicher["pkt"], axis=1)
+    for frage in range(anz_fragen):
+        spalten["A" + str(frage + 1) + f".{anz_res}_Pkt_Gesamt"] = np.nan_to_num(spalte(pkt_gesamt, frage))
+    spalten[""] = np.full(anz_teilnehmer, "", dtype=object)  # Leerspalte an dieser Stelle einfügen
+
+    # Details zu den einzelnen Fragen
+    for frage in range(anz_fragen):
+        spalten["A" + str(frage + 1) + "_ID"] = spalte(speicher["titel"], frage, "")
+        for untertitel in range(anz_res):
+            spalten["A" + str(frage + 1) + f".{untertitel}_Formel"] = spalte(formeln[:, untertitel], frage, "")
+        spalten["A" + str(frage + 1) + "_Tol"] = spalte(toleranzen, frage, str([None] * anz_res))
+        for untertitel in range(anz_res):
+            spalten["A" + str(frage + 1) + f".{untertitel}_Res_Ref"] = spalte(speicher["res_ref"][:, untertitel], frage)
+        for untertitel in range(anz_res):
+            spalten["A" + str(frage + 1) + f".{untertitel}_Res"] = spalte(speicher["res_eingabe"][:, untertitel], frage, None)
+        # Variablen der einzelnen Fragen
+        for variable in range(anz_var):
+            spalten["A" + str(frage + 1) + "_v" + str(variable + 1)] = spalte(speicher["var"][:, variable], frage)
+    return spalten
+
+
+def export_zeilen(spalten):
+    """Liefert die Export-Tabelle zeilenweise (Generator), beginnend mit den
+    Spaltentiteln. NaN wird zu einer leeren Zelle, NumPy-Zahlen zu Python-Zahlen.
+    """
+    yield list(spalten)
+    werte = [x.tolist() for x in spalten.values()]
+    for zeile in zip(*werte):
+        yield [None if isinstance(x, float) and math.isnan(x) else x for x in zeile]
+
+
+@gemessen("Export schreiben")
+def schreibe_export(spalten, dateiname, formate=("xlsx",)):
+    """Schreibt die Export-Tabelle in die gewünschten Formate.
+    xlsx:    mit openpyxl im write-only-Modus, die Zeilen werden direkt in die
+             Datei geschrieben, ohne das ganze Arbeitsblatt im Speicher aufzubauen.
+    csv:     zeilenweise mit dem csv-Modul (Trennzeichen ";", wie in deutschen Excel-Versionen)
+    parquet: über pandas, benötigt pyarrow oder fastparquet.
+    Die Dateinamen ergeben sich aus dateiname mit der Endung des jeweiligen Formats.
+    """
+    basis = os.path.splitext(dateiname)[0]
+    for exportformat in formate:
+        ziel = basis + "." + exportformat
+        if exportformat == "xlsx":
+            mappe = Workbook(write_only=True)
+            blatt = mappe.create_sheet()
+            for zeile in export_zeilen(spalten):
+                blatt.append(zeile)
+            mappe.save(ziel)
+        elif exportformat == "csv":
+            with open(ziel, "w", newline="", encoding="utf-8-sig") as datei:
+                schreiber = csv.writer(datei, delimiter=";")
+                for zeile in export_zeilen(spalten):
+                    schreiber.writerow(zeile)
+        elif exportformat == "parquet":
+            import pandas as pd
+            # Spalten mit gemischtem Inhalt (z.B. Eingaben als Zahl oder Bruch) als Text speichern
+            df = pd.DataFrame({titel: [None if w is None else str(w) for w in x] if x.dtype == object else x
+                               for titel, x in spalten.items()})
+            try:
+                df.to_parquet(ziel, index=False)
+            except ImportError as fehler:
+                print("!!! Parquet-Export nicht möglich:", fehler)
+                continue
+        else:
+            print("!!! Unbekanntes Exportformat:", exportformat)
+            continue
+        print("Export geschrieben:", ziel)
+
+
+def lade_testergebnisse(dateiname, name_marker, fragentitel_marker, anz_res=None):
+    """Liest die ILIAS-Ergebnisdatei ein und liefert den Versuchsspeicher."""
+    i_d = gemessene_zeilen(lies_ilias_zeilen(dateiname), "EXCEL lesen", "Zeilen gelesen") #i_d steht für ILIAS-Daten
+    excel_vorher = laufbericht["zeiten"].get("EXCEL lesen", 0.0)
+    with messe("Parsen"):
+        teilnehmer_liste = parse_ilias_ergebnisse(i_d, name_marker, fragentitel_marker)
+    # Lesen und Parsen laufen ineinander: Die Zeit für das Lesen wieder abziehen
+    laufbericht["zeiten"]["Parsen"] -= laufbericht["zeiten"]["EXCEL lesen"] - excel_vorher
+    return erstelle_versuchsspeicher(teilnehmer_liste, anz_res)
+
+
+@gemessen("Fragenpool einlesen")
+def lade_fragenpool(dateiname, ilias_export, anz_res=None):
+    """Liest den Fragenpool aus der EXCEL-Tabelle ein und liefert den Index
+    aus erstelle_fragenpool_index().
+    ilias_export: True für das Blatt 'SQL - Database' aus dem ILIAS-Export,
+    False für eine eigene Tabelle im Blatt 'Tabelle1' (Nur Formel 1 wird ausgewertet).
+    anz_res: Anzahl der Unteraufgaben, None = aus den Spalten resN_formula ermitteln.
+    Endet dateiname auf .zip oder .xml, ist es der Export des Fragenpools aus
+    ILIAS (QTI) und wird mit lade_qti_fragenpool() ohne EXCEL gelesen.
+    """
+    if str(dateiname).lower().endswith((".zip", ".xml")):
+        return lade_qti_fragenpool(dateiname, anz_res)
+    import pandas as pd
+
+    # skiprows=5 überspringt die ersten 5 Zeilen
+    if ilias_export:
+        df2 = pd.read_excel(dateiname, sheet_name='SQL - Database')
+        titels_pool = df2['question_title']
+        nummern = []  # Unteraufgaben mit Spalte resN_formula, ab 0 gezählt
+        for spalte in df2.columns:
+            treffer = re.fullmatch(r"res(\d+)_formula", str(spalte))
+            if treffer and (anz_res is None or int(treffer.group(1)) <= anz_res):
+                nummern.append(int(treffer.group(1)) - 1)
+        gleichungen_pool = {x: df2[f'res{x + 1}_formula'] for x in nummern}
+        toleranzen_pool = {x: df2[f'res{x + 1}_tol'] for x in nummern}
+        punkte_pool = {x: df2[f'res{x + 1}_points'] for x in nummern}
+        # Wertebereiche der Variablen varN_min, varN_max und, falls vorhanden, varN_prec
+        bereiche_pool = {}
+        for spalte in df2.columns:
+            treffer = re.fullmatch(r"var(\d+)_min", str(spalte))
+            if treffer and f"var{treffer.group(1)}_max" in df2:
+                n = treffer.group(1)
+                bereiche_pool[int(n) - 1] = (df2[spalte], df2[f"var{n}_max"], df2.get(f"var{n}_prec"))
+    else:
+        df2 = pd.read_excel(dateiname, sheet_name='Tabelle1', skiprows=5)
+        titels_pool = df2['Question Title']
+        gleichungen_pool = {0: df2['Formula 1']}
+        toleranzen_pool = {0: df2['res1 tol']}
+        punkte_pool = {0: df2['res1 pts']}
+        bereiche_pool = None
+    return erstelle_fragenpool_index(titels_pool, gleichungen_pool, toleranzen_pool, punkte_pool, anz_res,
+                                     bereiche_pool)
+
+
+# Fragenpool aus dem QTI-Export ############################################
+# ILIAS exportiert einen Fragenpool als ZIP-Archiv mit der Datei ..._qti.xml.
+# Jede frage ist ein <item>, bei Formelfragen (assFormulaQuestion) stehen
+# Variablen und Ergebnisse als <qtimetadatafield> mit dem Namen ($v1, $r1 ...)
+# und einem mit PHP serialize() geschriebenen Array. Die XML-Datei wird mit
+# iterparse direkt aus dem Archiv gelesen und jedes <item> nach dem Auswerten
+# verworfen, der Speicherbedarf hängt also nicht von der Größe des Pools ab.
+
+qti_feld = re.compile(r"\$([vr])(\d+)")
+
+
+def lies_php_wert(text):
+    """Liest einen mit PHP serialize() geschriebenen Wert, Arrays werden zu dicts."""
+    wert, _ = _lies_php(text.encode("utf-8"), 0)
+    return wert
+
+
+def _lies_php(daten, pos):
+    """Liest einen Wert ab Position pos, liefert (Wert, Position danach).
+    Die Länge von Texten zählt PHP in Bytes, deshalb arbeitet der Parser auf bytes.
+    """
+    art = daten[pos:pos + 1]
+    if art == b"N":
+        return None, pos + 2
+    if art in (b"i", b"d", b"b"):
+        ende = daten.index(b";", pos)
+        roh = daten[pos + 2:ende].decode()
+        return (int(roh) if art == b"i" else float(roh) if art == b"d" else roh == "1"), ende + 1
+    trenner = daten.index(b":", pos + 2)
+    laenge = int(daten[pos + 2:trenner])
+    if art == b"s":
+        anfang = trenner + 2
+        return daten[anfang:anfang + laenge].decode("utf-8", "replace"), anfang + laenge + 2
+    if art == b"a":
+        pos = trenner + 2
+        wert = {}
+        for _ in range(laenge):
+            schluessel, pos = _lies_php(daten, pos)
+            wert[schluessel], pos = _lies_php(daten, pos)
+        return wert, pos + 1
+    raise ValueError(f"Unbekannter PHP-Typ {art!r} an Position {pos}")
+
+
+def _tag(element):
+    """Name eines XML-Elements ohne Namensraum."""
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def lies_qti_items(datei):
+    """Liest die Formelfragen aus einer QTI-XML-Datei (Dateiobjekt) mit
+    iterparse. Liefert für jede frage (titel, ergebnisse, variablen) mit
+    ergebnisse: Unteraufgabe x (ab 0) -> (Formel, toleranz, punkte) und
+    variablen: variable x (ab 0) -> (Minimum, Maximum, Nachkommastellen).
+    Fragen anderer Typen werden übersprungen und gezählt.
+    """
+    pfad = []  # offene Elemente von der Wurzel bis zum aktuellen
+    for ereignis, element in ET.iterparse(datei, events=("start", "end")):
+        if ereignis == "start":
+            pfad.append(element)
+            continue
+        pfad.pop()
+        if _tag(element) != "item":
+            continue
+        felder = {}
+        for feld in element.iter():
+            if _tag(feld) == "qtimetadatafield":
+                werte = {_tag(kind): (kind.text or "") for kind in feld}
+                felder[werte.get("fieldlabel", "").strip()] = werte.get("fieldentry", "")
+        if felder.get("QUESTIONTYPE") == "assFormulaQuestion":
+            ergebnisse, variablen = {}, {}
+            for name, eintrag in felder.items():
+                treffer = qti_feld.fullmatch(name)
+                if not treffer:
+                    continue
+                angaben = lies_php_wert(eintrag)
+                x = int(treffer.group(2)) - 1
+                if treffer.group(1) == "r":
+                    ergebnisse[x] = (angaben.get("formula", " "), als_zahl(angaben.get("tolerance")),
+                                     als_zahl(angaben.get("points")))
+                else:
+                    variablen[x] = (angaben.get("rangemin"), angaben.get("rangemax"), angaben.get("precision"))
+            yield element.get("title", ""), ergebnisse, variablen
+        else:
+            zaehle("QTI-Fragen übersprungen")
+        # Verarbeitetes item verwerfen, auch aus dem übergeordneten Element
+        element.clear()
+        if pfad:
+            pfad[-1].remove(element)
+
+
+def lade_qti_fragenpool(dateiname, anz_res=None):
+    """Liest den Fragenpool aus dem ILIAS-Export (ZIP-Archiv mit ..._qti.xml
+    oder die XML-Datei selbst) und liefert den Index aus
+    erstelle_fragenpool_index(), wie lade_fragenpool() für EXCEL.
+    anz_res: Anzahl der Unteraufgaben, None = aus den Formeln ermitteln.
+    """
+    titels_pool = []
+    spalten = {"formeln": {}, "toleranzen": {}, "punkte": {}, "minimum": {}, "maximum": {}, "stellen": {}}
+
+    def lies(datei):
+        for titel, ergebnisse, variablen in lies_qti_items(datei):
+            zeile = len(titels_pool)  # fortlaufend über alle QTI-Dateien im Archiv
+            titels_pool.append(titel)
+            for x, werte in ergebnisse.items():
+                if anz_res is None or x < anz_res:
+                    for name, wert in zip(("formeln", "toleranzen", "punkte"), werte):
+                        spalten[name].setdefault(x, {})[zeile] = wert
+            for x, werte in variablen.items():
+                for name, wert in zip(("minimum", "maximum", "stellen"), werte):
+                    spalten[name].setdefault(x, {})[zeile] = wert
+
+    if str(dateiname).lower().endswith(".zip"):
+        with zipfile.ZipFile(dateiname) as archiv:
+            namen = [name for name in archiv.namelist() if name.lower().endswith("_qti.xml")]
+            if not namen:
+                raise ValueError(f"{dateiname} enthält keinen ILIAS-Fragenpool (..._qti.xml)")
+            for name in namen:
+                with archiv.open(name) as datei:
+                    lies(datei)
+    else:
+        with open(dateiname, "rb") as datei:
+            lies(datei)
+    zaehle("QTI-Fragen gelesen", len(titels_pool))
+
+    anz = len(titels_pool)
+
+    def liste(name, leer):
+        return {x: [werte.get(zeile, leer) for zeile in range(anz)] for x, werte in spalten[name].items()}
+
+    minimum, maximum, stellen = liste("minimum", None), liste("maximum", None), liste("stellen", None)
+    bereiche_pool = {x: (minimum[x], maximum[x], stellen[x]) for x in minimum}
+    return erstelle_fragenpool_index(titels_pool, liste("formeln", " "), liste("toleranzen", 0),
+                                     liste("punkte", 0), anz_res, bereiche_pool)
+
+
+# Parse-Cache ##############################################################
+# Das Einlesen der EXCEL-Dateien ist der langsamste Schritt. Die eingelesenen
+# Daten werden deshalb als pickle-Datei abgelegt, Schlüssel ist der Hash über
+# den Inhalt der Datei, die Parameter des Einlesens und cache_version.
+cache_version = 7  # erhöhen, wenn sich der Aufbau der eingelesenen Daten ändert
+
+
+def datei_hash(dateiname):
+    """SHA-256 über den Inhalt einer Datei, blockweise gelesen."""
+    h = hashlib.sha256()
+    with open(dateiname, "rb") as datei:
+        for block in iter(lambda: datei.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def lade_mit_cache(funktion, dateiname, *parameter, verzeichnis=".ilias_cache", verwenden=True):
+    """Ruft funktion(dateiname, *parameter) auf oder liefert das Ergebnis eines
+    früheren Aufrufs aus dem Cache, wenn sich weder die Datei noch die
+    Parameter geändert haben.
+    Mit verwenden=False wird der Cache umgangen (weder gelesen noch geschrieben).
+    Ältere Cache-Dateien zur selben Datei werden beim Schreiben gelöscht. Dazu
+    steht im Namen der Cache-Datei ein Hash über den absoluten Pfad, damit
+    gleichnamige Dateien in verschiedenen Verzeichnissen sich nicht gegenseitig
+    aus dem Cache verdrängen.
+    """
+    if not verwenden:
+        return funktion(dateiname, *parameter)
+    h = hashlib.sha256(datei_hash(dateiname).encode())
+    h.update(repr((funktion.__name__, parameter, cache_version)).encode())
+    pfad = hashlib.sha256(os.path.abspath(dateiname).encode()).hexdigest()[:8]
+    praefix = f"{os.path.basename(dateiname)}-{pfad}-{funktion.__name__}-"
+    cache_datei = os.path.join(verzeichnis, praefix + h.hexdigest()[:16] + ".pickle")
+    if os.path.exists(cache_datei):
+        try:
+            with open(cache_datei, "rb") as datei:
+                daten = pickle.load(datei)
+            print("   ", dateiname, "aus dem Cache geladen")
+            zaehle("Parse-Cache Treffer")
+            return daten
+        except Exception as fehler:  # Defekte Cache-Datei: neu einlesen
+            print("!!! Cache-Datei", cache_datei, "nicht lesbar:", fehler)
+    zaehle("Parse-Cache Fehltreffer")
+    daten = funktion(dateiname, *parameter)
+    os.makedirs(verzeichnis, exist_ok=True)
+    for alt in os.listdir(verzeichnis):
+        if alt.startswith(praefix):
+            os.remove(os.path.join(verzeichnis, alt))
+    with open(cache_datei + ".tmp", "wb") as datei:
+        pickle.dump(daten, datei, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_datei + ".tmp", cache_datei)
+    return daten
+
+
+def leere_cache(verzeichnis=".ilias_cache"):
+    """Löscht alle Dateien im Cache-Verzeichnis."""
+    if not os.path.isdir(verzeichnis):
+        return
+    for datei in os.listdir(verzeichnis):
+        os.remove(os.path.join(verzeichnis, datei))
+    print("Cache", verzeichnis, "geleert")
+
+
+# Nachbewertung ############################################################
+# Nach der Bewertung wird der Versuchsspeicher zusammen mit einem Fingerabdruck
+# der Poolzeile jeder gestellten frage gespeichert (bewertung_datei). Wird danach
+# nur der Fragenpool korrigiert (Formel, toleranz, punkte), werden beim nächsten
+# Lauf nur die Versuche zu den geänderten Fragen neu bewertet.
+
+
+def fingerabdruecke_fragen(speicher, fragenpool):
+    """Liefert zu jedem titel der geöffneten Versuche einen Hash über
+    Formeln, Toleranzen und punkte der zugehörigen zeile im Fragenpool,
+    None wenn die frage nicht im Pool ist.
+    """
+    fingerabdruecke = {}
+    for titel in set(speicher["titel"][speicher["geoeffnet"]]):
+        fid = finde_fragenindex(titel, fragenpool)
+        if fid is None:
+            fingerabdruecke[titel] = None
+        else:
+            zeile = (fragenpool["formeln"][fid], fragenpool["toleranzen"][fid], fragenpool["punkte"][fid])
+            fingerabdruecke[titel] = hashlib.sha256(repr(zeile).encode()).hexdigest()
+    return fingerabdruecke
+
+
+def bewertung_schluessel(ergebnis_datei):
+    """Kennung der eingelesenen Testergebnisse und der Bewertungsart, zu der
+    eine gespeicherte Bewertung passen muss.
+    """
+    return (datei_hash(ergebnis_datei), name_marker, fragentitel_marker, anz_res, cache_version,
+            folgefehler_bewerten, durchlauf_wertung)
+
+
+def speichere_bewertung(speicher, fragenpool, dateiname, ergebnis_datei, notenschema):
+    """Speichert den bewerteten Versuchsspeicher mit den Fingerabdrücken des
+    Fragenpools für eine spätere Nachbewertung.
+    """
+    daten = {"schluessel": bewertung_schluessel(ergebnis_datei), "notenschema": notenschema,
+             "fingerabdruecke": fingerabdruecke_fragen(speicher, fragenpool), "speicher": speicher}
+    with open(dateiname + ".tmp", "wb") as datei:
+        pickle.dump(daten, datei, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(dateiname + ".tmp", dateiname)
+
+
+def lade_bewertung(dateiname, ergebnis_datei):
+    """Lädt eine mit speichere_bewertung() gespeicherte Bewertung. Liefert None,
+    wenn es keine gibt oder sie nicht zu den aktuellen Testergebnissen passt.
+    """
+    if not os.path.exists(dateiname):
+        return None
+    try:
+        with open(dateiname, "rb") as datei:
+            daten = pickle.load(datei)
+    except Exception as fehler:  # Defekte Datei: komplett neu bewerten
+        print("!!! Gespeicherte Bewertung", dateiname, "nicht lesbar:", fehler)
+        return None
+    if daten.get("schluessel") != bewertung_schluessel(ergebnis_datei):
+        print("   ", ergebnis_datei, "oder die Einstellungen der Bewertung haben sich geändert,",
+              "es wird komplett neu bewertet")
+        return None
+    return daten
+
+
+def nachbewerten(speicher, fragenpool, fingerabdruecke, notenschema=None, alle_noten=False, folgefehler=None):
+    """Bewertet nur die Versuche zu Fragen neu, deren zeile im Fragenpool sich
+    gegenüber fingerabdruecke geändert hat, und aktualisiert ges_pkt und noten
+    der betroffenen teilnehmer. Mit alle_noten=True werden die noten aller
+    teilnehmer neu berechnet (z.B. bei geändertem Notenschema).
+    folgefehler wie bei bewerte_versuche.
+    Gibt die Änderungen aus und liefert sie als Liste von Tupeln
+    (teilnehmer, pkt_alt, pkt_neu, note_alt, note_neu).
+    """
+    if notenschema is None:
+        notenschema = (max_pkt, schema_proz, schema_note)
+    if folgefehler is None:
+        folgefehler = folgefehler_bewerten
+    gleiche_breite_an(speicher, fragenpool)
+    neu = fingerabdruecke_fragen(speicher, fragenpool)
+    geaendert = sorted(titel for titel, h in neu.items() if h != fingerabdruecke.get(titel))
+    print("Nachbewertung:", len(geaendert), "von", len(neu), "Fragen geändert")
+    for titel in geaendert:
+        print("   ", titel)
+
+    # Poolzeilen neu zuordnen, falls sich die Reihenfolge im Pool geändert hat
+    speicher["pool_index"][:] = -1
+    verknuepfe_fragenpool(speicher, fragenpool)
+    betroffen = np.flatnonzero(np.isin(speicher["titel"], np.array(geaendert, dtype=object)))
+    fehler = {}
+    res_ref, pkt, folge = bewerte_gruppen(speicher["var"][betroffen], speicher["res"][betroffen],
+                                          speicher["pool_index"][betroffen], fragenpool, fehler, folgefehler)
+    speicher["res_ref"][betroffen] = res_ref
+    speicher["pkt"][betroffen] = pkt
+    speicher["folgefehler"][betroffen] = folge
+    melde_formelfehler(fehler)
+
+    pkt_alt = speicher["ges_pkt"]
+    waehle_durchlauf(speicher)
+    noten_alt = list(speicher["noten"])
+    if alle_noten:
+        speicher["noten"] = notenberechnung_vektor(speicher["ges_pkt"], *notenschema)
+    else:
+        neu_berechnen = np.unique(speicher["teilnehmer"][betroffen])
+        for uid, note in zip(neu_berechnen.tolist(),
+                             notenberechnung_vektor(speicher["ges_pkt"][neu_berechnen], *notenschema)):
+            speicher["noten"][uid] = note
+
+    aenderungen = []
+    for uid in range(len(speicher["name"])):
+        if not np.isclose(pkt_alt[uid], speicher["ges_pkt"][uid]) or noten_alt[uid] != speicher["noten"][uid]:
+            aenderungen.append((uid, pkt_alt[uid], speicher["ges_pkt"][uid], noten_alt[uid], speicher["noten"][uid]))
+    print(len(aenderungen), "Teilnehmer mit geänderter Bewertung")
+    for uid, alt, neu_pkt, note_alt, note_neu in aenderungen:
+        print("    Nr.", speicher["nr"][uid], speicher["name"][uid], ": %g -> %g pkt (%+g)" % (alt, neu_pkt, neu_pkt - alt),
+              ", Note", note_alt, "->", note_neu)
+    return aenderungen
+
+
+# IRT ######################################################################
+# Antwortmatrix teilnehmer x Items für die Item-Response-Theorie. Ein Item ist
+# eine Unteraufgabe einer frage, Name "titel.unteraufgabe" (ab 0 gezählt).
+# Die Matrix wird dünn besetzt als Liste der Beobachtungen gehalten, denn jeder
+# teilnehmer bekommt nur einen kleinen Teil der Fragen aus dem Pool.
+IRT_NICHT_GESTELLT = 0
+IRT_FALSCH = -1
+IRT_RICHTIG = 1
+
+
+@gemessen("IRT-Matrix")
+def erstelle_irt_matrix(speicher, fragenpool):
+    """Baut die dünn besetzte Antwortmatrix auf. Ergebnis ist ein dict mit
+      items:         Liste der Itemnamen (sortiert nach titel und Unteraufgabe)
+      anz_teilnehmer
+      teilnehmer, item, code: pro Beobachtung zeile, Spalte und IRT-Code
+    Unteraufgaben ohne Formel im Pool, nicht bewertete Versuche und Versuche
+    aus nicht gewerteten Testdurchläufen gelten als nicht gestellt und tauchen nicht auf.
+    """
+    pkt = speicher["pkt"]
+    leer = np.array([[ist_leere_formel(g) for g in formeln] for formeln in fragenpool["formeln"]], dtype=bool)
+    leer = np.vstack([leer.reshape(-1, pkt.shape[1]), np.ones((1, pkt.shape[1]), dtype=bool)])
+    gestellt = ~np.isnan(pkt) & ~leer[speicher["pool_index"]]  # pool_index -1 -> letzte zeile, alles leer
+    gestellt &= speicher["gewertet"][:, None]
+    versuch, unteraufgabe = np.nonzero(gestellt)
+    titel, titel_nr = np.unique(speicher["titel"][versuch].astype(str), return_inverse=True)
+    schluessel, item = np.unique(titel_nr * pkt.shape[1] + unteraufgabe, return_inverse=True)
+    items = [f"{titel[k // pkt.shape[1]]}.{k % pkt.shape[1]}" for k in schluessel.tolist()]
+    code = np.where(pkt[versuch, unteraufgabe] > 0, IRT_RICHTIG, IRT_FALSCH).astype(np.int8)
+    return {"items": items, "anz_teilnehmer": len(speicher["name"]),
+            "teilnehmer": speicher["teilnehmer"][versuch], "item": item.ravel(), "code": code}
+
+
+def irt_matrix_dicht(matrix):
+    """Antwortmatrix als dichtes Array teilnehmer x Items mit IRT_NICHT_GESTELLT
+    für alle nicht gestellten Items.
+    """
+    dicht = np.full((matrix["anz_teilnehmer"], len(matrix["items"])), IRT_NICHT_GESTELLT, dtype=np.int8)
+    dicht[matrix["teilnehmer"], matrix["item"]] = matrix["code"]
+    return dicht
+
+
+@gemessen("IRT schreiben")
+def schreibe_irt_tabelle(matrix, dateiname):
+    """Schreibt die Antwortmatrix für ein externes IRT-Tool nach EXCEL:
+    Kopfzeile mit den Itemnamen, dann eine zeile pro teilnehmer in der
+    Reihenfolge des Exports, Codes IRT_RICHTIG, IRT_FALSCH, IRT_NICHT_GESTELLT.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(matrix["items"])
+    for zeile in irt_matrix_dicht(matrix).tolist():
+        ws.append(zeile)
+    wb.save(dateiname)
+
+
+@gemessen("IRT-Schätzung")
+def schaetze_irt(matrix, modell="rasch", max_iter=200, toleranz=1e-4, prior_sd=3.0):
+    """Schätzt ein Rasch- oder 2PL-Modell (modell="rasch" / "2pl") für die
+    Antwortmatrix, P(richtig) = 1 / (1 + exp(-a_i * (theta_n - b_i))).
+    Abwechselnd werden die Personenfähigkeiten theta und die Itemparameter
+    mit Newton-Schritten geschätzt, beim 2PL a und b gemeinsam (über den
+    Achsenabschnitt c = -a * b). Alle Summen laufen mit np.bincount direkt über
+    die Beobachtungen, der Aufwand wächst also nur mit der Anzahl gestellter Items.
+    Eine schwache Normalverteilung (prior_sd) hält die Schätzwerte auch bei
+    teilnehmern oder Items ganz ohne Fehler bzw. ganz ohne Treffer endlich.
+    Liefert ein dict mit theta, b, a und der Anzahl Iterationen.
+    """
+    if modell not in ("rasch", "2pl"):
+        raise ValueError(f"Unbekanntes IRT-Modell: {modell}")
+    n, i = matrix["teilnehmer"], matrix["item"]
+    y = (matrix["code"] == IRT_RICHTIG).astype(float)
+    anz_n, anz_i = matrix["anz_teilnehmer"], len(matrix["items"])
+    theta, a = np.zeros(anz_n), np.ones(anz_i)
+    anteil = (np.bincount(i, y, anz_i) + 0.5) / (np.bincount(i, minlength=anz_i) + 1)
+    c = np.log(anteil / (1 - anteil))  # Startwerte aus dem Anteil richtiger Antworten
+    gewicht = 1 / prior_sd ** 2
+
+    def wahrscheinlichkeit():
+        p = 1 / (1 + np.exp(-np.clip(a[i] * theta[n] + c[i], -30, 30)))
+        return y - p, p * (1 - p)
+
+    for iteration in range(1, max_iter + 1):
+        vorher = np.concatenate([theta, a, c])
+        rest, w = wahrscheinlichkeit()
+        schritt_theta = np.clip((np.bincount(n, a[i] * rest, anz_n) - gewicht * theta)
+                                / (np.bincount(n, a[i] ** 2 * w, anz_n) + gewicht), -1, 1)
+        theta += schritt_theta
+        rest, w = wahrscheinlichkeit()
+        g_c = np.bincount(i, rest, anz_i) - gewicht * c
+        h_cc = np.bincount(i, w, anz_i) + gewicht
+        if modell == "rasch":
+            schritt_a, schritt_c = np.zeros(anz_i), g_c / h_cc
+        else:
+            t = theta[n]
+            g_a = np.bincount(i, t * rest, anz_i) - gewicht * (a - 1)
+            h_aa = np.bincount(i, t * t * w, anz_i) + gewicht
+            h_ac = np.bincount(i, t * w, anz_i)
+            det = h_aa * h_cc - h_ac ** 2
+            schritt_a = (h_cc * g_a - h_ac * g_c) / det
+            schritt_c = (h_aa * g_c - h_ac * g_a) / det
+        schritt_a, schritt_c = np.clip(schritt_a, -0.5, 0.5), np.clip(schritt_c, -1, 1)
+        a, c = np.clip(a + schritt_a, 0.05, 5), c + schritt_c
+        if modell == "2pl" and anz_n > 1 and theta.std() > 0:
+            # Beim 2PL ist die Skala von theta nicht festgelegt: theta standardisieren
+            mittel, sd = theta.mean(), theta.std()
+            theta, c, a = (theta - mittel) / sd, c + a * mittel, a * sd
+        if np.abs(np.concatenate([theta, a, c]) - vorher).max(initial=0) < toleranz:
+            break
+    b = -c / a
+    if modell == "rasch":  # Skala festlegen: mittlere Itemschwierigkeit 0
+        verschiebung = b.mean() if anz_i else 0.0
+        theta, b = theta - verschiebung, b - verschiebung
+    return {"modell": modell, "theta": theta, "b": b, "a": a, "iterationen": iteration}
+
+
+@gemessen("IRT schreiben")
+def schreibe_irt_parameter(matrix, parameter, speicher, dateiname):
+    """Schreibt die geschätzten Itemparameter (Blatt "Items") und
+    Personenfähigkeiten (Blatt "Personen") nach EXCEL.
+    """
+    import pandas as pd
+
+    anz_i = len(matrix["items"])
+    richtig = (matrix["code"] == IRT_RICHTIG).astype(float)
+    gestellt_item = np.bincount(matrix["item"], minlength=anz_i)
+    gestellt_person = np.bincount(matrix["teilnehmer"], minlength=matrix["anz_teilnehmer"])
+    items = pd.DataFrame({"Item": matrix["items"], "Schwierigkeit b": parameter["b"],
+                          "Trennschärfe a": parameter["a"], "Anzahl": gestellt_item,
+                          "Anteil richtig": np.bincount(matrix["item"], richtig, anz_i) / np.maximum(gestellt_item, 1)})
+    personen = pd.DataFrame({"Nr": speicher["nr"], "Name": speicher["name"], "Fähigkeit theta": parameter["theta"],
+                             "Anzahl Items": gestellt_person,
+                             "Richtig": np.bincount(matrix["teilnehmer"], richtig, matrix["anz_teilnehmer"])})
+    with pd.ExcelWriter(dateiname) as writer:
+        items.to_excel(writer, sheet_name="Items", index=False)
+        personen.to_excel(writer, sheet_name="Personen", index=False)
+
+
+# Itemanalyse ##############################################################
+# Kennzahlen pro frage im Pool aus den bewerteten Versuchen. Pro Klausur werden
+# mit np.bincount Summen pro Fragentitel gebildet (itemstatistik). Summen
+# mehrerer Klausuren, z.B. mehrerer Semester, lassen sich einfach addieren
+# (fasse_itemstatistik_zusammen), die Kennzahlen werden erst am Ende daraus
+# berechnet (itemanalyse_tabelle).
+# x = erreichte punkte / maximale punkte der frage, y = z-Wert der Gesamtpunkte
+# in der Klausur (damit Klausuren mit verschiedener Punktzahl vergleichbar sind).
+ITEM_SUMMEN = ("gestellt", "nicht geoeffnet", "unbeantwortet", "formelfehler", "voll richtig",
+               "x", "xx", "y", "yy", "xy", "oben", "x oben", "unten", "x unten")
+ITEM_GRUPPE = 0.27  # Anteil der teilnehmer in der oberen und unteren Gruppe für den Trennschärfeindex
+
+
+@gemessen("Itemanalyse")
+def itemstatistik(speicher, fragenpool):
+    """Bildet die Summen ITEM_SUMMEN pro frage im Pool für eine bewertete Klausur.
+    Liefert ein dict mit titel (Liste der Fragentitel im Pool) und summen
+    (Array Anzahl Fragen x len(ITEM_SUMMEN)).
+    Versuche zu Fragen, die nicht im Pool stehen, und Versuche aus nicht
+    gewerteten Testdurchläufen werden nicht gezählt.
+    """
+    anz_fragen = len(fragenpool["titel"])
+    leer = np.array([[ist_leere_formel(g) for g in formeln] for formeln in fragenpool["formeln"]],
+                    dtype=bool).reshape(anz_fragen, -1)
+    punkte_pool = np.array([[als_zahl(p) for p in punkte] for punkte in fragenpool["punkte"]]).reshape(anz_fragen, -1)
+    max_frage = np.where(leer, 0.0, np.nan_to_num(punkte_pool)).sum(axis=1)
+
+    ges_pkt = np.asarray(speicher["ges_pkt"], dtype=float)
+    streuung = ges_pkt.std()
+    z = (ges_pkt - ges_pkt.mean()) / streuung if streuung > 0 else np.zeros_like(ges_pkt)
+    if len(ges_pkt):
+        oben = ges_pkt >= np.quantile(ges_pkt, 1 - ITEM_GRUPPE)
+        unten = ges_pkt <= np.quantile(ges_pkt, ITEM_GRUPPE)
+    else:
+        oben = unten = np.zeros(0, dtype=bool)
+
+    # speicher["pool_index"] ist nur für geöffnete Versuche gesetzt, die nicht
+    # geöffneten gehören aber zu "gestellt" und "nicht geoeffnet"
+    titel, titel_nr = np.unique(speicher["titel"].astype(str), return_inverse=True)
+    zeilen = [finde_fragenindex(t, fragenpool) for t in titel.tolist()]
+    pool_index = np.array([-1 if z is None else z for z in zeilen], dtype=np.int64)[titel_nr.ravel()]
+
+    v = np.flatnonzero((pool_index >= 0) & speicher["gewertet"])
+    fid = pool_index[v]
+    uid = speicher["teilnehmer"][v]
+    geoeffnet = speicher["geoeffnet"][v]
+    beantwortet = ~np.isnan(speicher["res"][v]).all(axis=1)
+    formelfehler = geoeffnet & (np.isnan(speicher["res_ref"][v]) & ~leer[fid]).any(axis=1)
+    erreicht = np.nansum(speicher["pkt"][v], axis=1)
+    mit_punkten = max_frage[fid] > 0
+    x = np.where(mit_punkten, erreicht / np.where(mit_punkten, max_frage[fid], 1.0), 0.0)
+    y = z[uid]
+
+    werte = [np.ones(len(v)), ~geoeffnet, geoeffnet & ~beantwortet, formelfehler,
+             mit_punkten & (erreicht >= max_frage[fid]),
+             x, x * x, y, y * y, x * y, oben[uid], x * oben[uid], unten[uid], x * unten[uid]]
+    summen = np.column_stack([np.bincount(fid, gewicht.astype(float), anz_fragen) for gewicht in werte])
+    return {"titel": list(fragenpool["titel"]), "summen": summen}
+
+
+def fasse_itemstatistik_zusammen(statistiken):
+    """Addiert die Summen mehrerer Klausuren pro Fragentitel, z.B. über mehrere
+    Semester. Fragen, die nur in einem Teil der Pools stehen, bleiben erhalten.
+    """
+    titel_nr = {}
+    for statistik in statistiken:
+        for titel in statistik["titel"]:
+            titel_nr.setdefault(titel, len(titel_nr))
+    summen = np.zeros((len(titel_nr), len(ITEM_SUMMEN)))
+    for statistik in statistiken:
+        zeilen = np.array([titel_nr[titel] for titel in statistik["titel"]], dtype=np.int64)
+        np.add.at(summen, zeilen, statistik["summen"])
+    return {"titel": list(titel_nr), "summen": summen}
+
+
+def itemanalyse_tabelle(statistik):
+    """Berechnet aus den Summen die Kennzahlen pro frage als DataFrame:
+    Lösungsquote (mittlerer Anteil der punkte), Anteil voll richtig,
+    Trennschärfeindex (Lösungsquote obere minus untere Gruppe),
+    punktbiseriale Korrelation mit den Gesamtpunkten und die Anteile nicht
+    geöffneter, unbeantworteter und nicht berechenbarer Versuche.
+    Kennzahlen von Fragen, die nie gestellt wurden, sind NaN.
+    """
+    import pandas as pd
+
+    s = dict(zip(ITEM_SUMMEN, statistik["summen"].T))
+    n = s["gestellt"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kovarianz = n * s["xy"] - s["x"] * s["y"]
+        nenner = np.sqrt((n * s["xx"] - s["x"] ** 2) * (n * s["yy"] - s["y"] ** 2))
+        return pd.DataFrame({"Frage": statistik["titel"], "Gestellt": n.astype(int),
+                             "Lösungsquote": s["x"] / n,
+                             "Anteil voll richtig": s["voll richtig"] / n,
+                             "Trennschärfeindex": s["x oben"] / s["oben"] - s["x unten"] / s["unten"],
+                             "Punktbiserial r": np.where(nenner > 0, kovarianz / nenner, np.nan),
+                             "Anteil unbeantwortet": s["unbeantwortet"] / n,
+                             "Anteil nicht geöffnet": s["nicht geoeffnet"] / n,
+                             "Anteil Formelfehler": s["formelfehler"] / n})
+
+
+def schreibe_itemanalyse(statistik, dateiname):
+    """Schreibt die Itemanalyse nach EXCEL oder, bei Endung .csv, als CSV."""
+    tabelle = itemanalyse_tabelle(statistik)
+    if dateiname.lower().endswith(".csv"):
+        tabelle.to_csv(dateiname, index=False, sep=";", encoding="utf-8-sig")
+    else:
+        tabelle.to_excel(dateiname, sheet_name="Itemanalyse", index=False)
+
+
+# Abschreibverdacht ########################################################
+# Jeder teilnehmer bekommt eigene Variablen $v. Passt eine falsche Eingabe zur
+# Musterlösung eines anderen Teilnehmers für dieselbe frage, ist das ein
+# starker Hinweis auf Abschreiben. Statt alle Paare zu vergleichen, werden die
+# Musterlösungen pro frage und Unteraufgabe sortiert, und jede falsche Eingabe
+# sucht mit searchsorted den Bereich der Musterlösungen, für die sie innerhalb
+# der toleranz richtig wäre: O(n log n) statt O(n²).
+
+
+@gemessen("Abschreibverdacht")
+def finde_abschreibverdacht(speicher, fragenpool, max_treffer=10):
+    """Sucht falsche Eingaben, die zur Musterlösung eines anderen Teilnehmers
+    passen. Eingaben, die zu mehr als max_treffer Musterlösungen passen, sagen
+    nichts aus und werden übergangen. Jeder Treffer zählt 1 / Anzahl passender
+    Musterlösungen, seltene Übereinstimmungen wiegen also mehr.
+    Liefert einen DataFrame mit einer zeile pro Paar (teilnehmer, Quelle),
+    absteigend sortiert nach dem Verdacht.
+    """
+    import pandas as pd
+
+    anz_fragen = len(fragenpool["titel"])
+    spalten = speicher["res_ref"].shape[1]
+    tol = np.array([[als_zahl(t) for t in toleranzen] for toleranzen in fragenpool["toleranzen"]]).reshape(anz_fragen, -1)
+    tol = np.clip(np.nan_to_num(tol[:, :spalten]) / 100, 0.0, 0.5)
+
+    # Alle Musterlösungen, sortiert nach frage, Unteraufgabe und Wert
+    versuch, unteraufgabe = np.nonzero(np.isfinite(speicher["res_ref"]) & (speicher["pool_index"] >= 0)[:, None])
+    gruppe = speicher["pool_index"][versuch].astype(np.int64) * spalten + unteraufgabe
+    ref = speicher["res_ref"][versuch, unteraufgabe]
+    reihenfolge = np.lexsort((ref, gruppe))
+    versuch, unteraufgabe, gruppe, ref = (a[reihenfolge] for a in (versuch, unteraufgabe, gruppe, ref))
+
+    # Falsche Eingaben: Bereich der Musterlösungen r mit |eingabe - r| <= tol * |r|
+    eingabe = speicher["res"][versuch, unteraufgabe]
+    falsch = np.isfinite(eingabe) & (speicher["pkt"][versuch, unteraufgabe] == 0)
+    t = tol[gruppe // spalten, unteraufgabe]
+    grenze_a, grenze_b = eingabe / (1 + t), eingabe / (1 - t)
+    von = np.zeros(len(ref), dtype=np.int64)
+    bis = np.zeros(len(ref), dtype=np.int64)
+    anfang = np.concatenate([[0], np.flatnonzero(np.diff(gruppe)) + 1, [len(gruppe)]])
+    for a, b in zip(anfang[:-1].tolist(), anfang[1:].tolist()):
+        proben = np.flatnonzero(falsch[a:b]) + a
+        von[proben] = a + np.searchsorted(ref[a:b], np.minimum(grenze_a[proben], grenze_b[proben]), side="left")
+        bis[proben] = a + np.searchsorted(ref[a:b], np.maximum(grenze_a[proben], grenze_b[proben]), side="right")
+    anzahl = bis - von
+    proben = np.flatnonzero(falsch & (anzahl > 0) & (anzahl <= max_treffer))
+
+    # Paare (Probe, Treffer) ohne Schleife aufzählen
+    probe = np.repeat(proben, anzahl[proben])
+    versatz = np.arange(len(probe)) - np.repeat(np.cumsum(anzahl[proben]) - anzahl[proben], anzahl[proben])
+    treffer = von[probe] + versatz
+    wer = speicher["teilnehmer"][versuch[probe]].astype(np.int64)
+    quelle = speicher["teilnehmer"][versuch[treffer]].astype(np.int64)
+    andere = wer != quelle
+    probe, wer, quelle = probe[andere], wer[andere], quelle[andere]
+
+    anz_teilnehmer = len(speicher["name"])
+    paar, paar_nr = np.unique(wer * anz_teilnehmer + quelle, return_inverse=True)
+    paar_nr = paar_nr.ravel()
+    anz_falsch = np.bincount(speicher["teilnehmer"][versuch[falsch]], minlength=anz_teilnehmer)
+    fragen = [set() for _ in paar]
+    for nr, titel in zip(paar_nr.tolist(), speicher["titel"][versuch[probe]].tolist()):
+        fragen[nr].add(titel)
+    wer, quelle = paar // anz_teilnehmer, paar % anz_teilnehmer
+    bericht = pd.DataFrame({"Nr": speicher["nr"][wer], "Name": [speicher["name"][i] for i in wer.tolist()],
+                            "Quelle Nr": speicher["nr"][quelle],
+                            "Quelle Name": [speicher["name"][i] for i in quelle.tolist()],
+                            "Treffer": np.bincount(paar_nr, minlength=len(paar)),
+                            "Falsche Eingaben": anz_falsch[wer],
+                            "Verdacht": np.bincount(paar_nr, 1.0 / anzahl[probe], len(paar)),
+                            "Fragen": [", ".join(sorted(f)) for f in fragen]})
+    zaehle("Verdachtsfälle", len(bericht))
+    return bericht.sort_values(["Verdacht", "Treffer"], ascending=False, ignore_index=True)
+
+
+# Prüfung des Fragenpools #################################################
+# Vor der Klausur wird jede Formel des Pools mit vielen zufälligen
+# Variablensätzen aus den Wertebereichen varN_min ... varN_max berechnet,
+# vektorisiert wie bei der Bewertung. So fallen Syntaxfehler, Division durch
+# Null, sqrt oder ln negativer Zahlen und fehlerhafte $r-Bezüge auf, bevor
+# sie bei der Bewertung für jeden teilnehmer gemeldet werden. Fragen mit
+# denselben Formeln und Wertebereichen werden nur einmal geprüft.
+
+
+def ziehe_variablen(bereiche, anz, rng):
+    """Zieht anz Variablensätze gleichverteilt aus den Wertebereichen
+    (Minimum, Maximum, Nachkommastellen) einer frage. Die ersten beiden
+    Sätze sind alle Minima und alle Maxima. Ergebnis ist ein Array der Form
+    (Anzahl Variablen, anz), NaN für Variablen ohne gültigen Wertebereich.
+    """
+    v = np.full((len(bereiche), anz), np.nan)
+    for x, (minimum, maximum, stellen) in enumerate(bereiche):
+        if not minimum <= maximum:
+            continue
+        v[x] = rng.uniform(minimum, maximum, anz)
+        v[x, :2] = (minimum, maximum)[:anz]
+        if np.isfinite(stellen):
+            v[x] = np.clip(np.round(v[x], int(stellen)), minimum, maximum)
+    return v
+
+
+def pruefe_formeln(gleichungen, bereiche, anz, rng):
+    """Prüft die Formeln einer frage: erst Syntax, $r-Bezüge und
+    Wertebereiche, dann die Berechnung mit anz zufälligen Variablensätzen.
+    Ohne Wertebereiche (eigene Tabelle statt ILIAS-Export) entfällt die
+    Berechnung. Liefert eine Liste von Problemen
+    (Unteraufgabe ab 0, Problem, Anzahl betroffener Stichproben, Hinweis).
+    """
+    formeln = [kompiliere_ilias_formel(gleichung_ilias) for gleichung_ilias in gleichungen]
+    reihenfolge, _ = _ermittle_reihenfolge(gleichungen)
+    probleme = []
+    gescheitert = set()
+    for id, formel in enumerate(formeln):
+        if formel is None:
+            continue
+        if formel["fehler"] is not None:
+            probleme.append((id, "Syntaxfehler", anz, formel["fehler"]))
+            gescheitert.add(id)
+            continue
+        for j in sorted(formel["ergebnisse"]):
+            if j >= len(formeln) or formeln[j] is None:
+                probleme.append((id, "Bezug", anz, f"verwendet $r{j + 1}, das nicht definiert ist"))
+                gescheitert.add(id)
+        for x in (sorted(formel["variablen"]) if bereiche else ()):
+            minimum, maximum = bereiche[x][:2] if x < len(bereiche) else (np.nan, np.nan)
+            if np.isnan(minimum) or np.isnan(maximum):
+                probleme.append((id, "Wertebereich", anz, f"$v{x + 1} hat keinen Wertebereich (var{x + 1}_min, var{x + 1}_max)"))
+            elif minimum > maximum:
+                probleme.append((id, "Wertebereich", anz, f"$v{x + 1}: Minimum {minimum:g} größer als Maximum {maximum:g}"))
+            else:
+                continue
+            gescheitert.add(id)
+
+    def folgt_aus_gescheitert(id):
+        """Meldet eine Unteraufgabe, die ein nicht berechenbares $r verwendet."""
+        if formeln[id]["ergebnisse"] & gescheitert:
+            probleme.append((id, "Bezug", anz, f"kann nicht berechnet werden, weil "
+                                               f"$r{min(formeln[id]['ergebnisse'] & gescheitert) + 1} nicht berechenbar ist"))
+            gescheitert.add(id)
+        return id in gescheitert
+
+    # Berechnung in der Reihenfolge der $r-Abhängigkeiten
+    v = ziehe_variablen(bereiche, anz, rng) if bereiche else None
+    r = np.full((len(formeln), anz), np.nan)
+    for id in reihenfolge:
+        formel = formeln[id]
+        if id in gescheitert or folgt_aus_gescheitert(id):
+            continue
+        if v is None:
+            continue
+        arten = set()
+        try:
+            with np.errstate(all="call", under="ignore", call=lambda art, flag: arten.add(art)):
+                ergebnis = eval(formel["code"], numpy_namensraum, {"v": v, "r": r})
+                ergebnis = np.broadcast_to(np.asarray(ergebnis, dtype=float), (anz,)).copy()
+        except ZeroDivisionError:
+            probleme.append((id, "Division durch Null", anz, "bei allen Variablenwerten"))
+        except OverflowError:
+            probleme.append((id, "Überlauf", anz, "bei allen Variablenwerten"))
+        except Exception as fehler:
+            probleme.append((id, "Berechnung", anz, f"{type(fehler).__name__}: {fehler}"))
+        else:
+            # Nicht berechenbare Eingaben $r gehören zur Unteraufgabe, aus der sie kommen
+            eingaben_ok = np.isfinite(r[sorted(formel["ergebnisse"])]).all(axis=0)
+            unendlich = np.isinf(ergebnis)
+            ungueltig = np.isnan(ergebnis)
+            anzahl = int(((unendlich | ungueltig) & ~eingaben_ok).sum())
+            if anzahl:
+                probleme.append((id, "Bezug", anzahl, "nicht berechenbar, wo "
+                                 + ", ".join(f"$r{j + 1}" for j in sorted(formel["ergebnisse"]))
+                                 + " nicht berechenbar ist"))
+            anzahl = int((unendlich & eingaben_ok).sum())
+            if anzahl:
+                art = "Überlauf" if "overflow" in arten and "divide by zero" not in arten else "Division durch Null"
+                probleme.append((id, art, anzahl, "Ergebnis unendlich (inf)"))
+            anzahl = int((ungueltig & eingaben_ok).sum())
+            if anzahl:
+                probleme.append((id, "Definitionsbereich", anzahl,
+                                 "Ergebnis NaN, z.B. sqrt oder ln einer negativen Zahl oder 0/0"))
+            ergebnis[unendlich] = np.nan
+            r[id] = ergebnis
+            continue
+        gescheitert.add(id)
+
+    # Nicht in der Reihenfolge: Abhängige gescheiterter Unteraufgaben, übrig bleiben Zirkelbezüge
+    offen = [id for id, formel in enumerate(formeln)
+             if formel is not None and id not in gescheitert and id not in reihenfolge]
+    while offen and any([folgt_aus_gescheitert(id) for id in offen]):
+        offen = [id for id in offen if id not in gescheitert]
+    for id in offen:
+        probleme.append((id, "Bezug", anz, "Zirkelbezug zwischen den Unteraufgaben "
+                         + ", ".join(str(j + 1) for j in offen)))
+    return sorted(probleme, key=lambda problem: problem[0])
+
+
+@gemessen("Pool-Prüfung")
+def pruefe_fragenpool(fragenpool, anz_stichproben=2000, startwert=0):
+    """Prüft alle Formeln des Fragenpools mit pruefe_formeln(), jede frage
+    mit anz_stichproben Variablensätzen. startwert macht die Stichproben
+    wiederholbar. Liefert einen DataFrame mit einer zeile pro Problem
+    (frage, zeile im Pool, Unteraufgabe, Formel, Problem, Anzahl und Anteil
+    der betroffenen Stichproben, Hinweis), leer wenn alles in Ordnung ist.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(startwert)
+    gruppen = {}  # (Formeln, Wertebereiche) -> Zeilen im Pool
+    for zeile, (formeln, bereiche) in enumerate(zip(fragenpool["formeln"], fragenpool["bereiche"])):
+        schluessel = (tuple("" if ist_leere_formel(g) else str(g) for g in formeln), repr(bereiche))
+        gruppen.setdefault(schluessel, []).append(zeile)
+
+    zeilen = []
+    for (formeln, _), pool_zeilen in gruppen.items():
+        probleme = pruefe_formeln(formeln, fragenpool["bereiche"][pool_zeilen[0]], anz_stichproben, rng)
+        zaehle("Formeln geprüft", sum(1 for g in formeln if g) * len(pool_zeilen))
+        for zeile in pool_zeilen:
+            for id, problem, anzahl, hinweis in probleme:
+                zeilen.append((fragenpool["titel"][zeile], zeile + 2, id + 1, formeln[id], problem, anzahl, hinweis))
+    bericht = pd.DataFrame(zeilen, columns=["Frage", "Zeile", "Unteraufgabe", "Formel", "Problem",
+                                            "Stichproben", "Hinweis"])
+    bericht.insert(6, "Anteil", bericht["Stichproben"] / max(anz_stichproben, 1))
+    zaehle("Pool-Probleme", len(bericht))
+    return bericht.sort_values(["Zeile", "Unteraufgabe"], ignore_index=True)
+
+
+def schreibe_poolpruefung(bericht, dateiname):
+    """Schreibt den Bericht der Pool-Prüfung nach EXCEL oder, bei Endung .csv, als CSV."""
+    if dateiname.lower().endswith(".csv"):
+        bericht.to_csv(dateiname, index=False, sep=";", encoding="utf-8-sig")
+    else:
+        bericht.to_excel(dateiname, sheet_name="Poolprüfung", index=False)
+
+
+# Stapel-Auswertung ########################################################
+# Mehrere Klausuren werden in einem Aufruf ausgewertet. Welche, steht in einer
+# Manifest-Datei (JSON), z.B.:
+# {
+#   "standard": {"schema_note": ["5,0", "4,0", ...], "schema_proz": [0, 50, ...]},
+#   "klausuren": [
+#     {"name": "GE2", "ergebnis_datei": "ILIAS_TestergebnisseGE2.xlsx",
+#      "fragen_datei": "ILIAS_FragenpoolGE2.xlsx", "max_pkt": 58,
+#      "export": "TestergebnisseGE2.xlsx", "irt": "irt_frame_ge2.xlsx",
+#      "itemanalyse": "Itemanalyse_GE2.xlsx"},
+#     ...
+#   ],
+#   "zusammenfassung": "Stapel_Zusammenfassung.xlsx",
+#   "itemanalyse": "Itemanalyse_alle.xlsx"
+# }
+# Das "itemanalyse" außerhalb der Klausuren fasst die Itemanalyse aller
+# Klausuren zusammen, z.B. über mehrere Semester (optional).
+# Fehlende Angaben kommen aus "standard" bzw. aus den Konstanten am Anfang des
+# Skripts, z.B. auch "folgefehler": true. Relative Pfade beziehen sich auf das Verzeichnis des Manifests.
+_worker_fragenpools = {}  # fragen_datei -> Fragenpool in den Worker-Prozessen
+
+
+def lade_manifest(dateiname):
+    """Liest das Manifest für die Stapel-Auswertung und ergänzt jede Klausur
+    um die Standardwerte. Liefert die Liste der Klausuren, den Dateinamen
+    für die Zusammenfassung und den für die gemeinsame Itemanalyse (None = keine).
+    """
+    with open(dateiname, encoding="utf-8") as datei:
+        manifest = json.load(datei)
+    verzeichnis = os.path.dirname(os.path.abspath(dateiname))
+    standard = {"max_pkt": max_pkt, "schema_proz": schema_proz, "schema_note": schema_note}
+    standard.update(manifest.get("standard", {}))
+    klausuren = []
+    for nr, eintrag in enumerate(manifest["klausuren"], start=1):
+        klausur = dict(standard)
+        klausur.update(eintrag)
+        for pflicht in ("ergebnis_datei", "fragen_datei"):
+            if pflicht not in klausur:
+                raise ValueError(f"Klausur {nr} im Manifest {dateiname}: Angabe '{pflicht}' fehlt")
+        basis = os.path.splitext(os.path.basename(klausur["ergebnis_datei"]))[0]
+        klausur.setdefault("name", basis)
+        klausur.setdefault("export", f"Testergebnisse_{klausur['name']}.xlsx")
+        klausur.setdefault("irt", f"irt_frame_{klausur['name']}.xlsx")
+        klausur.setdefault("itemanalyse", f"Itemanalyse_{klausur['name']}.xlsx")
+        for schluessel in ("ergebnis_datei", "fragen_datei", "export", "irt", "itemanalyse"):
+            klausur[schluessel] = os.path.join(verzeichnis, klausur[schluessel])
+        klausuren.append(klausur)
+    zusammenfassung = os.path.join(verzeichnis, manifest.get("zusammenfassung", "Stapel_Zusammenfassung.xlsx"))
+    itemanalyse = manifest.get("itemanalyse")
+    if itemanalyse:
+        itemanalyse = os.path.join(verzeichnis, itemanalyse)
+    return klausuren, zusammenfassung, itemanalyse
+
+
+def werte_klausur_aus(klausur, fragenpool):
+    """Wertet eine Klausur aus dem Manifest vollständig aus: Einlesen,
+    Bewertung, Export, IRT-Tabelle und Itemanalyse. Liefert eine Zusammenfassung
+    mit Kennzahlen und den Zeiten der einzelnen Schritte in Sekunden sowie die
+    Itemstatistik für die gemeinsame Itemanalyse.
+    """
+    zeiten = {}
+    start = time.perf_counter()
+    speicher = lade_mit_cache(lade_testergebnisse, klausur["ergebnis_datei"], name_marker,
+                              fragentitel_marker, anz_res, verzeichnis=cache_verzeichnis, verwenden=cache_verwenden)
+    zeiten["Einlesen"] = time.perf_counter() - start
+    start = time.perf_counter()
+    notenschema = (klausur["max_pkt"], klausur["schema_proz"], klausur["schema_note"])
+    bewerte_versuche(speicher, fragenpool, 1, notenschema, klausur.get("folgefehler"))
+    zeiten["Bewertung"] = time.perf_counter() - start
+    start = time.perf_counter()
+    schreibe_export(erstelle_export_spalten(speicher, fragenpool), klausur["export"], export_formate)
+    schreibe_irt_tabelle(erstelle_irt_matrix(speicher, fragenpool), klausur["irt"])
+    statistik = itemstatistik(speicher, fragenpool)
+    schreibe_itemanalyse(statistik, klausur["itemanalyse"])
+    zeiten["Export"] = time.perf_counter() - start
+    anz_teilnehmer = len(speicher["name"])
+    zusammenfassung = {"Klausur": klausur["name"], "Teilnehmer": anz_teilnehmer,
+                       "Mittelwert Punkte": float(np.mean(speicher["ges_pkt"])) if anz_teilnehmer else None,
+                       "Bestanden": sum(note != klausur["schema_note"][0] for note in speicher["noten"])}
+    for note in klausur["schema_note"]:
+        zusammenfassung["Note " + note] = speicher["noten"].count(note)
+    for schritt, zeit in zeiten.items():
+        zusammenfassung["Zeit " + schritt + " [s]"] = round(zeit, 3)
+    zusammenfassung["Zeit gesamt [s]"] = round(sum(zeiten.values()), 3)
+    return zusammenfassung, statistik
+
+
+def _starte_stapel_worker(fragenpools, einstellungen):
+    """Initialisiert einen Worker-Prozess der Stapel-Auswertung: Die
+    Einstellungen des Hauptprozesses werden übernommen (nötig bei "spawn"),
+    alle Fragenpools werden einmal pro Prozess übergeben und kompiliert.
+    """
+    global _worker_fragenpools, formelprobleme_melden
+    konfiguriere(**einstellungen)
+    _worker_fragenpools = fragenpools
+    formelprobleme_melden = False
+    for fragenpool in fragenpools.values():
+        for formeln in fragenpool["formeln"]:
+            ordne_unteraufgaben(formeln)
+
+
+def _werte_klausur_im_worker_aus(klausur):
+    """Wertet eine Klausur in einem Worker-Prozess aus. Die Ausgaben auf der
+    Console werden gesammelt und an den Hauptprozess zurückgegeben, damit sie
+    nicht mit denen anderer Klausuren vermischt werden.
+    """
+    ausgabe = io.StringIO()
+    with contextlib.redirect_stdout(ausgabe):
+        zusammenfassung, statistik = werte_klausur_aus(klausur, _worker_fragenpools[klausur["fragen_datei"]])
+    return zusammenfassung, statistik, ausgabe.getvalue()
+
+
+def bewerte_stapel(manifest_datei, anz_prozesse=None):
+    """Wertet alle Klausuren aus dem Manifest aus.
+    Jeder Fragenpool wird nur einmal eingelesen und seine Formeln nur einmal
+    kompiliert, auch wenn ihn mehrere Klausuren verwenden. Die Klausuren
+    werden parallel in einem ProcessPoolExecutor ausgewertet
+    (anz_prozesse, None = alle Prozessorkerne, 1 = nacheinander).
+    Am Ende wird eine Zusammenfassung mit den Zeiten pro Klausur ausgegeben
+    und als EXCEL-Datei gespeichert, auf Wunsch auch die gemeinsame
+    Itemanalyse aller Klausuren.
+    """
+    import pandas as pd
+
+    start = time.perf_counter()
+    klausuren, zusammenfassung_datei, itemanalyse_gesamt = lade_manifest(manifest_datei)
+    print("Stapel-Auswertung von", len(klausuren), "Klausuren aus", manifest_datei)
+    fragenpools = {}
+    for klausur in klausuren:
+        if klausur["fragen_datei"] not in fragenpools:
+            print("Fragenpool", klausur["fragen_datei"], "wird eingelesen...")
+            fragenpool = lade_mit_cache(lade_fragenpool, klausur["fragen_datei"], FRAGEN_AUS_ILIAS_EXPORT, anz_res,
+                                        verzeichnis=cache_verzeichnis, verwenden=cache_verwenden)
+            melde_doppelte_titel(fragenpool)
+            for fid, formeln in enumerate(fragenpool["formeln"]):
+                ordne_unteraufgaben(formeln, fragenpool["titel"][fid])
+            fragenpools[klausur["fragen_datei"]] = fragenpool
+
+    if anz_prozesse is None:
+        anz_prozesse = os.cpu_count() or 1
+    anz_prozesse = min(anz_prozesse, len(klausuren))
+    if anz_prozesse > 1:
+        methoden = multiprocessing.get_all_start_methods()
+        kontext = multiprocessing.get_context("fork" if "fork" in methoden else None)
+        with ProcessPoolExecutor(max_workers=anz_prozesse, mp_context=kontext,
+                                 initializer=_starte_stapel_worker,
+                                 initargs=(fragenpools, aktuelle_einstellungen())) as executor:
+            ergebnisse = list(executor.map(_werte_klausur_im_worker_aus, klausuren))
+    else:
+        _starte_stapel_worker(fragenpools, aktuelle_einstellungen())
+        ergebnisse = [_werte_klausur_im_worker_aus(klausur) for klausur in klausuren]
+
+    zusammenfassung = []
+    for klausur, (ergebnis, _, ausgabe) in zip(klausuren, ergebnisse):
+        print("---", klausur["name"], "---")
+        print(ausgabe, end="")
+        zusammenfassung.append(ergebnis)
+    df_zusammenfassung = pd.DataFrame(zusammenfassung)
+    print()
+    print(df_zusammenfassung.to_string(index=False))
+    print("Gesamtzeit: %.2f s" % (time.perf_counter() - start))
+    df_zusammenfassung.to_excel(zusammenfassung_datei, index=False)
+    print("Zusammenfassung geschrieben:", zusammenfassung_datei)
+    if itemanalyse_gesamt:
+        schreibe_itemanalyse(fasse_itemstatistik_zusammen([statistik for _, statistik, _ in ergebnisse]),
+                             itemanalyse_gesamt)
+        print("Itemanalyse aller Klausuren geschrieben:", itemanalyse_gesamt)
+    return df_zusammenfassung
+
+
+########################################################################
+## HAUPTPROGRAMM ##############################################################
+########################################################################
+def hauptprogramm():
+    """Wertet die Klausur aus den Einstellungen komplett aus: Einlesen,
+    Bewertung bzw. Nachbewertung, Export, IRT und Laufbericht.
+    Liefert den Versuchsspeicher und den Fragenpool.
+    """
+    print("Tool zur externen Bewertung von ILIAS Formelfragen-Tests")
+    print("Version 1.5, 4.9.2020")
+    print("(c) by Eberhard Waffenschmidt, TH-Köln")
+    leere_laufbericht()
+    start_gesamt = time.perf_counter()
+
+    # Daten aus EXCEL-File einlesen:
+    # Manche ILIAS-Exporte haben je einen Reiter pro Student. lies_ilias_zeilen()
+    # liest beide Varianten zeilenweise, die Zeilen gehen direkt in den Parser.
+    # Haben sich die Dateien seit dem letzten Lauf nicht geändert, kommen die
+    # eingelesenen Daten aus dem Cache und EXCEL wird gar nicht gelesen.
+    if cache_leeren:
+        leere_cache(cache_verzeichnis)
+
+    ########################################################################
+    ### Testergebnisse verarbeiten: ########################################
+    ########################################################################
+    # Daten der teilnehmer analysieren
+    print("Testergebnisse werden analysiert...")
+    # Alle Daten der Versuche liegen spaltenweise in "versuche",
+    # Zugriff z.B. mit: V = versuche["var"][versuch][variable]
+    # Gibt es eine gespeicherte Bewertung zu denselben Testergebnissen,
+    # wird sie verwendet und später nur nachbewertet.
+    gespeichert = lade_bewertung(bewertung_datei, ergebnis_datei) if bewertung_datei else None
+    if gespeichert is not None:
+        print("   ", "Gespeicherte Bewertung aus", bewertung_datei, "geladen")
+        versuche = gespeichert["speicher"]
+    else:
+        versuche = lade_mit_cache(lade_testergebnisse, ergebnis_datei, name_marker, fragentitel_marker, anz_res,
+                                  verzeichnis=cache_verzeichnis, verwenden=cache_verwenden)
+    anz_teilnehmer = len(versuche["name"])
+
+    ########################################################################
+    ### Fragenpool verarbeiten #############################################
+    ########################################################################
+    print("Fragenpool wird eingelesen...")
+    fragenpool = lade_mit_cache(lade_fragenpool, fragen_datei, FRAGEN_AUS_ILIAS_EXPORT, anz_res,
+                                verzeichnis=cache_verzeichnis, verwenden=cache_verwenden)
+    melde_doppelte_titel(fragenpool)
+    
+    ########################################################################
+    ### Testergebnisse und Fragenpool verknüpfen ###########################
+    ########################################################################
+
+    # Formeln zu den Ergebnissen der teilnehmer zuordnen,
+    # Richtiges Ergebnis berechnen 
+    # Mit den Ergebnis des Studenten vergleichen 
+    # und punkte vergeben
+    print("Testergebnisse werden mit Fragenpool verknüpft...")
+    notenschema = (max_pkt, schema_proz, schema_note)
+    if gespeichert is not None:
+        start = time.perf_counter()
+        nachbewerten(versuche, fragenpool, gespeichert["fingerabdruecke"], notenschema,
+                     alle_noten=gespeichert["notenschema"] != notenschema)
+        print("Nachbewertung in %.1f ms" % (1000 * (time.perf_counter() - start)))
+    else:
+        bewerte_versuche(versuche, fragenpool, anz_prozesse, notenschema)
+    if bewertung_datei:
+        speichere_bewertung(versuche, fragenpool, bewertung_datei, ergebnis_datei, notenschema)
+    ges_pkt = versuche["ges_pkt"]
+
+    """
+    for teilnehmer in range(0,anz_teilnehmer):
+        # print ("Nr.",teilnehmer,namen[teilnehmer],":")
+        ges_punkte = 0
+        for frage in range(0,anz_fragen):
+    #        print("Teiln.",teilnehmer,"frage:",frage,"ID:",fragen_id[teilnehmer][frage])
+    #        print("Variablen:",var[teilnehmer][frage])
+    #        print("Stud.res.:",res[teilnehmer][frage])
+
+            # print("")
+            fragen_punkte_student = 0
+            # print ("Teiln.",teilnehmer,", frage",frage,",",fragen_id[teilnehmer][frage])
+            # Index der frage im Fragenpool finden
+            i = finde_fragenindex(fragen_id[teilnehmer][frage], fragen_id_pool)
+            Musterlösung = [None for _ in range(anz_res)]
+            for res_range in range(anz_res):
+
+                print(fragen_id_pool[i])
+
+                if i==None: #Falls frage nicht im Pool gefunden wird
+                    r = -999999
+                    Formel = "Formel Nicht gefunden"
+                    toleranz = None
+                    print("!!! Teiln.",teilnehmer,", frage",frage,",",fragen_id[teilnehmer][frage]," existiert nicht im Pool!")
+                else:
+                    # print ("Fragenindex i =",i)
+                    # Passende Formel usw. aus dem Fragenpool auslesen
+                    # Derzeit wird nur Ergebnis 1 ausgewertet
+                    Formel = gleichungen_pool[res_range][i]
+                    toleranz = toleranzen_pool[res_range][i]
+                    punkte = punkte_pool[res_range][i]
+                    if Formel == " " or Formel is np.nan:
+                        continue
+                    # Formel mit den Variablen des Studenten anwenden:
+                    v = var[teilnehmer][frage]
+
+                    # Ergebnisse der Studierenden für Folgefehler-Berechnung auskommentieren
+                    # r = res[teilnehmer][frage]
+                    if v[0] == None: # Wenn der Student die Aufgabe gar nicht angeschaut hat, sind alle Variablen None, insbesondere die erste.
+                        r = None
+                    else:  # Der Student hat wenigstens die frage angeschaut und Werte bekommen
+                        r = eval_ilias_single(Formel, v, Musterlösung)
+                        if r is None:
+                            apa = {"T": toleranz}
+                        Musterlösung[res_range] = r
+                        # print ("Formel =",Formel,"=",r,"toleranz:",toleranz,"%")
+                        # print ("Typ von r = ",type(r))
+
+                        # Maximale und minimale Grenze mit toleranz bestimmen.
+                        # ACHTUNG: Bei negativem Vorzeichen drehen sich min und max rum,
+                        # das gibt dann Ärger beim nachfolgenden Vergleich
+                        # Daher hier die Verwendung von "min" und "max"
+                        r_min = min(r*(1+toleranz/100), r*(1-toleranz/100))
+                        r_max = max(r*(1+toleranz/100), r*(1-toleranz/100))
+                        # print("Min =",r_min,", Max =",r_max)
+
+                        # Ergebnis des Studierenden:
+                        r_student = res[teilnehmer][frage][res_range]  # Es wird in dieser version nur ein Ergebnis, das erste, ausgewertet
+                        # print("Stud. Ergebnis: Teiln.",teilnehmer,"frage:",frage,"R_stud =",r_student)
+
+                        # Ist das Ergebnis vorhanden und innerhalb der toleranz?
+                        # Dann gibt's die punkte für die Aufgabe, sonst 0 pkt.
+                        if r_student != None: #Wenn der Student keine Lösung angegeben hat ist r_student = None
+                            # Dann kann es noch sein, dass die Lösung als Bruch, z.B. 1/300 angegebn ist.
+                            # Dann muss der Bruch mit eval ausgerechnet werden
+                            if type(r_student)==str:
+                                r_student = eval(r_student)
+                            if (r_student >= r_min) and (r_student <= r_max):
+                                fragen_punkte_student += punkte
+                                ges_punkte = ges_punkte + punkte
+                                # print("punkte =",Punkte_Student)
+                
+            # Jetzt noch die Ergebnisse in den Listen abspeichern:
+            # print ("frage",frage,",",fragen_id[teilnehmer][frage],"pkt =",fragen_punkte_student)
+            fragen_formel[teilnehmer][frage] = Formel
+            fragen_tol[teilnehmer][frage] = toleranz
+            res_ref[teilnehmer][frage][0] = r
+            pkt[teilnehmer][frage][0] = fragen_punkte_student
+        ges_pkt[teilnehmer] = ges_punkte
+        noten[teilnehmer] = notenberechnung (ges_punkte, max_pkt, schema_proz, schema_note)
+        print ("Nr.",nr_teilnehmer[teilnehmer],namen[teilnehmer],", Ges.pkt =",ges_pkt[teilnehmer],", Note =",noten[teilnehmer])
+    """
+    print("Anzahl Teilnehmer = ", anz_teilnehmer)
+    if versuche["durchlauf_pkt"].shape[1] > 1:
+        print("Testdurchläufe:", versuche["durchlauf_pkt"].shape[1], "- gewertet nach der Regel", repr(durchlauf_wertung))
+    if bestehensgrenzen:
+        varianten = [{"name": f"4,0 ab {grenze}%", "max_pkt": max_pkt,
+                      "schema_proz": verschiebe_bestehensgrenze(grenze, schema_proz)} for grenze in bestehensgrenzen]
+        print("Notenverteilung bei anderen Bestehensgrenzen:")
+        print(notenverteilung_varianten(ges_pkt, varianten, schema_note).to_string(index=False))
+    print("Formel-Cache:", formel_cache_zaehler["treffer"], "Treffer,",
+          formel_cache_zaehler["fehltreffer"], "Fehltreffer,", len(formel_cache), "Formeln")
+
+    ########################################################################
+    ### Daten in EXCEL-Sheet exportieren  ##################################
+    ########################################################################
+    # Dazu die Spalten der Export-Tabelle zusammenbauen:
+    # Zeilentitel generieren:
+    #  Nr name Vorname Familienname mat_nr Note GesPkt A1Pkt ... A40Pkt ...
+    #  ... A1_ID A01_Formel A01_Tol A1_ResRef A1_Res  A1_v1 A1_v2...A1_v10 ...
+    #  ...
+    #  ... A40_ID A01_Formel A40_Tol A40_ResRef A40_Res  A40_v1 A40_v2...A40_v10
+    
+    print('Daten werden nach EXCEL exportiert...')
+
+    spalten_ex = erstelle_export_spalten(versuche, fragenpool)
+    schreibe_export(spalten_ex, filename_export, export_formate)
+
+    print('Fertig!')
+
+    # Antwortmatrix für die Item-Response-Theorie, optional mit Schätzung der
+    # Itemschwierigkeiten und Personenfähigkeiten
+    irt_matrix = erstelle_irt_matrix(versuche, fragenpool)
+    schreibe_irt_tabelle(irt_matrix, irtf_name)
+    if irt_modell:
+        print("IRT-Modell", irt_modell, "wird geschätzt...")
+        irt_parameter = schaetze_irt(irt_matrix, irt_modell)
+        schreibe_irt_parameter(irt_matrix, irt_parameter, versuche, irt_parameter_datei)
+        print("IRT-Parameter nach", irt_parameter["iterationen"], "Iterationen geschrieben:", irt_parameter_datei)
+
+    # Kennzahlen pro frage: Lösungsquote, Trennschärfe, Formelfehler ...
+    if itemanalyse_datei:
+        schreibe_itemanalyse(itemstatistik(versuche, fragenpool), itemanalyse_datei)
+        print("Itemanalyse geschrieben:", itemanalyse_datei)
+
+    # Falsche Eingaben, die zur Musterlösung eines anderen Teilnehmers passen
+    if verdacht_datei:
+        verdacht = finde_abschreibverdacht(versuche, fragenpool)
+        verdacht.to_excel(verdacht_datei, index=False)
+        print("Abschreibverdacht:", len(verdacht), "Paare, geschrieben:", verdacht_datei)
+        if len(verdacht):
+            print(verdacht.head(10).to_string(index=False))
+
+    # Wo ist die Zeit geblieben?
+    addiere_zeit("Gesamt", time.perf_counter() - start_gesamt)
+    print()
+    drucke_laufbericht()
+    if laufbericht_datei:
+        schreibe_laufbericht(laufbericht_datei)
+        print("Laufbericht geschrieben:", laufbericht_datei)
+    return versuche, fragenpool
+
+
+def poolpruefung():
+    """Prüft den Fragenpool aus den Einstellungen vor der Klausur
+    (pool_pruefen): Einlesen, pruefe_fragenpool(), Ausgabe der Probleme und
+    Bericht in poolpruefung_datei. Eine Ergebnisdatei wird nicht gebraucht.
+    Liefert den Bericht als DataFrame.
+    """
+    print("Tool zur externen Bewertung von ILIAS Formelfragen-Tests")
+    print("Prüfung des Fragenpools", fragen_datei)
+    leere_laufbericht()
+    start_gesamt = time.perf_counter()
+    if cache_leeren:
+        leere_cache(cache_verzeichnis)
+    fragenpool = lade_mit_cache(lade_fragenpool, fragen_datei, FRAGEN_AUS_ILIAS_EXPORT, anz_res,
+                                verzeichnis=cache_verzeichnis, verwenden=cache_verwenden)
+    melde_doppelte_titel(fragenpool)
+    if not any(fragenpool["bereiche"]):
+        print("!!! Der Fragenpool enthält keine Wertebereiche (varN_min, varN_max), "
+              "geprüft werden nur Syntax und $r-Bezüge")
+
+    bericht = pruefe_fragenpool(fragenpool, pool_stichproben)
+    print(len(fragenpool["titel"]), "Fragen mit je", pool_stichproben, "Variablensätzen geprüft:",
+          len(bericht), "Probleme in", bericht["Frage"].nunique(), "Fragen")
+    if len(bericht):
+        print(bericht.head(30).to_string(index=False))
+    if poolpruefung_datei:
+        schreibe_poolpruefung(bericht, poolpruefung_datei)
+        print("Bericht der Pool-Prüfung geschrieben:", poolpruefung_datei)
+
+    addiere_zeit("Gesamt", time.perf_counter() - start_gesamt)
+    print()
+    drucke_laufbericht()
+    if laufbericht_datei:
+        schreibe_laufbericht(laufbericht_datei)
+        print("Laufbericht geschrieben:", laufbericht_datei)
+    return bericht
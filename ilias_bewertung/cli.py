@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Kommandozeile für die Bewertung von ILIAS-Formelfragen-Tests.
+
+Argumente und Eingabedateien werden geprüft, bevor NumPy, openpyxl und pandas
+geladen werden. --help und Fehler in den Argumenten kommen deshalb sofort.
+Nicht angegebene Einstellungen behalten die Defaults aus ilias_bewertung.bewertung.
+
+Aufruf z.B.:
+  python -m ilias_bewertung ILIAS_TestergebnisseGE2.xlsx ILIAS_FragenpoolGE2.xlsx --max-pkt 58 --export TestergebnisseGE2.xlsx
+  python -m ilias_bewertung --stapel Klausuren.json --prozesse 4
+  python -m ilias_bewertung --pruefe-pool ILIAS_FragenpoolGE2.xlsx
+
+Bei --pruefe-pool ist der Rückgabewert 1, wenn der Pool Probleme enthält.
+"""
+
+import argparse
+import os
+
+# Dateien aus EXCEL (xlsx) sind ZIP-Archive und beginnen mit dieser Signatur
+ZIP_SIGNATUR = b"PK\x03\x04"
+
+
+def erstelle_parser():
+    """Baut den ArgumentParser. Die Ziele (dest) heißen wie die Einstellungen
+    in ilias_bewertung.bewertung.
+    """
+    parser = argparse.ArgumentParser(prog="python -m ilias_bewertung", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("ergebnis_datei", nargs="?", help="ILIAS-Ergebnisdatei (xlsx)")
+    parser.add_argument("fragen_datei", nargs="?", help="Fragenpool (xlsx oder QTI-Export aus ILIAS: zip, xml)")
+    parser.add_argument("--stapel", dest="stapel_manifest", metavar="MANIFEST",
+                        help="mehrere Klausuren laut Manifest (JSON) auswerten")
+    parser.add_argument("--pruefe-pool", metavar="FRAGENPOOL",
+                        help="nur den Fragenpool vor der Klausur prüfen, ohne Ergebnisdatei")
+    parser.add_argument("--poolpruefung", dest="poolpruefung_datei", metavar="DATEI",
+                        help="Bericht der Pool-Prüfung (.xlsx oder .csv)")
+    parser.add_argument("--stichproben", dest="pool_stichproben", type=int,
+                        help="Variablensätze pro frage bei der Pool-Prüfung (Default: 2000)")
+    parser.add_argument("--export", dest="filename_export", metavar="DATEI", help="Export-Tabelle")
+    parser.add_argument("--formate", dest="export_formate", nargs="+", choices=["xlsx", "csv", "parquet"])
+    parser.add_argument("--irt", dest="irtf_name", metavar="DATEI", help="IRT-Antwortmatrix")
+    parser.add_argument("--irt-modell", choices=["rasch", "2pl", "keins"])
+    parser.add_argument("--irt-parameter", dest="irt_parameter_datei", metavar="DATEI")
+    parser.add_argument("--itemanalyse", dest="itemanalyse_datei", metavar="DATEI",
+                        help="Kennzahlen pro frage (.xlsx oder .csv)")
+    parser.add_argument("--verdacht", dest="verdacht_datei", metavar="DATEI",
+                        help="Bericht über falsche Eingaben, die zur Musterlösung anderer passen")
+    parser.add_argument("--max-pkt", type=float, help="maximale Punktzahl im Test")
+    parser.add_argument("--schema-proz", type=float, nargs="+", help="Mindestprozentzahlen, aufsteigend")
+    parser.add_argument("--schema-note", nargs="+", help="noten zu den Mindestprozentzahlen")
+    parser.add_argument("--anz-res", type=int, help="maximale Anzahl Ergebnisse pro frage (Default: aus den Dateien)")
+    parser.add_argument("--prozesse", dest="anz_prozesse", type=int, help="Anzahl Prozesse, 0 = alle Prozessorkerne")
+    parser.add_argument("--durchlauf", dest="durchlauf_wertung", choices=["bester", "letzter", "erster"],
+                        help="welcher Testdurchlauf zählt (Default: bester)")
+    parser.add_argument("--folgefehler", dest="folgefehler_bewerten", action="store_true", default=None,
+                        help="abhängige Unteraufgaben auch mit den eigenen Ergebnissen bewerten")
+    parser.add_argument("--titel-normiert", dest="titel_normiert_suchen", action="store_true", default=None,
+                        help="Fragen auch finden, wenn sich der titel nur in Leerzeichen oder Groß-/Kleinschreibung unterscheidet")
+    parser.add_argument("--bestehensgrenzen", type=float, nargs="+",
+                        help="zusätzlich die Notenverteilung für diese Bestehensgrenzen in %% ausgeben")
+    parser.add_argument("--bewertung-datei", metavar="DATEI", help="gespeicherte Bewertung für die Nachbewertung")
+    parser.add_argument("--ohne-nachbewertung", action="store_true",
+                        help="immer komplett neu bewerten, keine Bewertung speichern")
+    parser.add_argument("--laufbericht", dest="laufbericht_datei", metavar="DATEI", help="Laufbericht (.json oder .csv)")
+    parser.add_argument("--kein-cache", action="store_true", help="EXCEL-Dateien immer neu einlesen")
+    parser.add_argument("--cache-leeren", action="store_true", help="Cache vor dem Einlesen löschen")
+    parser.add_argument("--cache-verzeichnis", metavar="VERZEICHNIS")
+    return parser
+
+
+def pruefe_datei(parser, dateiname, beschreibung, excel=True):
+    """Bricht mit einer Fehlermeldung ab, wenn die Datei fehlt oder keine
+    EXCEL-Datei (xlsx) ist. Der QTI-Export als .zip hat dieselbe Signatur.
+    """
+    if not os.path.isfile(dateiname):
+        parser.error(f"{beschreibung} {dateiname} nicht gefunden")
+    if excel:
+        with open(dateiname, "rb") as datei:
+            if datei.read(4) != ZIP_SIGNATUR:
+                parser.error(f"{beschreibung} {dateiname} ist keine EXCEL-Datei (xlsx)")
+
+
+def pruefe_argumente(parser, args):
+    """Prüft die Argumente und Eingabedateien, ohne die Bibliothek zu laden.
+    Liefert die Einstellungen für bewertung.konfiguriere().
+    """
+    if args.pruefe_pool:
+        if args.ergebnis_datei or args.fragen_datei or args.stapel_manifest:
+            parser.error("--pruefe-pool prüft nur den angegebenen Fragenpool")
+        pruefe_datei(parser, args.pruefe_pool, "Fragenpool", excel=not args.pruefe_pool.lower().endswith(".xml"))
+    elif args.stapel_manifest:
+        if args.ergebnis_datei or args.fragen_datei:
+            parser.error("bei --stapel stehen die Dateien im Manifest")
+        pruefe_datei(parser, args.stapel_manifest, "Manifest", excel=False)
+    else:
+        if not (args.ergebnis_datei and args.fragen_datei):
+            parser.error("Ergebnisdatei und Fragenpool angeben (oder --stapel MANIFEST)")
+        pruefe_datei(parser, args.ergebnis_datei, "Ergebnisdatei")
+        pruefe_datei(parser, args.fragen_datei, "Fragenpool", excel=not args.fragen_datei.lower().endswith(".xml"))
+    if args.max_pkt is not None and args.max_pkt <= 0:
+        parser.error("--max-pkt muss größer 0 sein")
+    if args.schema_proz and sorted(args.schema_proz) != args.schema_proz:
+        parser.error("--schema-proz muss aufsteigend sortiert sein")
+    if args.schema_proz and args.schema_note and len(args.schema_proz) != len(args.schema_note):
+        parser.error("--schema-proz und --schema-note müssen gleich viele Einträge haben")
+    if args.anz_res is not None and args.anz_res < 1:
+        parser.error("--anz-res muss mindestens 1 sein")
+    if args.anz_prozesse is not None and args.anz_prozesse < 0:
+        parser.error("--prozesse darf nicht negativ sein")
+    if args.pool_stichproben is not None and args.pool_stichproben < 1:
+        parser.error("--stichproben muss mindestens 1 sein")
+
+    einstellungen = {name: wert for name, wert in vars(args).items()
+                     if wert is not None and name not in ("irt_modell", "anz_prozesse", "ohne_nachbewertung",
+                                                          "kein_cache", "cache_leeren", "pruefe_pool")}
+    if args.irt_modell:
+        einstellungen["irt_modell"] = None if args.irt_modell == "keins" else args.irt_modell
+    if args.anz_prozesse is not None:
+        einstellungen["anz_prozesse"] = args.anz_prozesse or None
+    if args.ohne_nachbewertung:
+        einstellungen["bewertung_datei"] = None
+    if args.kein_cache:
+        einstellungen["cache_verwenden"] = False
+    if args.cache_leeren:
+        einstellungen["cache_leeren"] = True
+    if args.pruefe_pool:
+        einstellungen["fragen_datei"] = args.pruefe_pool
+        einstellungen["pool_pruefen"] = True
+    return einstellungen
+
+
+def main(argv=None):
+    """Einstiegspunkt der Kommandozeile."""
+    parser = erstelle_parser()
+    args = parser.parse_args(argv)
+    einstellungen = pruefe_argumente(parser, args)
+
+    from . import bewertung  # erst jetzt NumPy und openpyxl laden
+
+    bewertung.konfiguriere(**einstellungen)
+    if bewertung.pool_pruefen:
+        return 1 if len(bewertung.poolpruefung()) else 0
+    if bewertung.stapel_manifest:
+        bewertung.bewerte_stapel(bewertung.stapel_manifest, bewertung.anz_prozesse)
+    else:
+        bewertung.hauptprogramm()
+    return 0